@@ -1,11 +1,135 @@
-from flask import Flask, request, send_file
+from flask import Flask, Response, request, stream_with_context
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 import requests
+import threading
+import subprocess
+import tempfile
+import shlex
+import shutil
+import uuid
 import os
 
 app = Flask(__name__)
 
 LOCAL_TRIPOSR_URL = os.environ.get('LOCAL_TRIPOSR_URL')
 LOCAL_TRIPOSR_CMD = os.environ.get('LOCAL_TRIPOSR_CMD')
+# "http" forwards to LOCAL_TRIPOSR_URL, "cmd" runs LOCAL_TRIPOSR_CMD locally.
+# Defaults to http when a URL is configured, otherwise cmd.
+TRIPOSR_MODE = os.environ.get('TRIPOSR_MODE') or ('http' if LOCAL_TRIPOSR_URL or not LOCAL_TRIPOSR_CMD else 'cmd')
+TRIPOSR_TIMEOUT = float(os.environ.get('TRIPOSR_TIMEOUT', '300'))
+TRIPOSR_WORKERS = int(os.environ.get('TRIPOSR_WORKERS', '2'))
+# Jobs allowed to wait for a free worker before new requests get a 503
+TRIPOSR_QUEUE_SIZE = int(os.environ.get('TRIPOSR_QUEUE_SIZE', '4'))
+
+CHUNK_SIZE = 64 * 1024
+GLB_HEADERS = {'Content-Disposition': 'attachment; filename="character.glb"'}
+
+# One pooled session for all requests to the TripoSR server (keep-alive instead of a new TCP connection per call)
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Bounded worker pool for LOCAL_TRIPOSR_CMD
+cmd_executor = ThreadPoolExecutor(max_workers=TRIPOSR_WORKERS, thread_name_prefix='triposr')
+cmd_slots = threading.BoundedSemaphore(TRIPOSR_WORKERS + TRIPOSR_QUEUE_SIZE)
+
+
+def _multipart_stream(field, upload, boundary):
+    """Yield a multipart/form-data body for one file without reading it into memory"""
+    filename = (upload.filename or 'image.png').replace('"', '')
+    content_type = upload.mimetype or 'application/octet-stream'
+    yield (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        f'Content-Type: {content_type}\r\n\r\n'
+    ).encode()
+    while True:
+        chunk = upload.stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+    yield f'\r\n--{boundary}--\r\n'.encode()
+
+
+def _proxy_to_http(image):
+    boundary = uuid.uuid4().hex
+    response = session.post(
+        LOCAL_TRIPOSR_URL,
+        data=_multipart_stream('image', image, boundary),
+        headers={'Content-Type': f'multipart/form-data; boundary={boundary}'},
+        stream=True,
+        timeout=(10, TRIPOSR_TIMEOUT),
+    )
+    if response.status_code != 200:
+        response.close()
+        return {'error': 'Failed to process image'}, 500
+
+    def generate():
+        try:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                yield chunk
+        finally:
+            response.close()
+
+    headers = dict(GLB_HEADERS)
+    if 'Content-Length' in response.headers and 'Content-Encoding' not in response.headers:
+        headers['Content-Length'] = response.headers['Content-Length']
+    return Response(stream_with_context(generate()), mimetype='model/gltf-binary', headers=headers)
+
+
+def _run_cmd(input_path, output_path):
+    """Run LOCAL_TRIPOSR_CMD; the template may use {input} and {output} placeholders"""
+    try:
+        args = [arg.format(input=input_path, output=output_path) for arg in shlex.split(LOCAL_TRIPOSR_CMD)]
+    except (KeyError, IndexError, ValueError) as e:
+        # Unknown placeholders, stray braces or unbalanced quotes
+        raise ValueError(f'LOCAL_TRIPOSR_CMD is not a valid template: {e!r}')
+    subprocess.run(args, check=True, timeout=TRIPOSR_TIMEOUT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+def _run_local_cmd(image):
+    if not cmd_slots.acquire(blocking=False):
+        return {'error': 'TripoSR workers are busy, try again later'}, 503
+
+    # Per-request working directory so concurrent jobs never share output paths
+    workdir = tempfile.mkdtemp(prefix='triposr_')
+    try:
+        input_path = os.path.join(workdir, 'input' + os.path.splitext(image.filename or '')[1])
+        output_path = os.path.join(workdir, 'output.glb')
+        image.save(input_path)
+        try:
+            cmd_executor.submit(_run_cmd, input_path, output_path).result()
+        except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired):
+            shutil.rmtree(workdir, ignore_errors=True)
+            return {'error': 'Failed to process image'}, 500
+        except ValueError:
+            shutil.rmtree(workdir, ignore_errors=True)
+            return {'error': 'LOCAL_TRIPOSR_CMD is not a valid template'}, 500
+    except BaseException:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise
+    finally:
+        cmd_slots.release()
+
+    if not os.path.exists(output_path):
+        shutil.rmtree(workdir, ignore_errors=True)
+        return {'error': 'TripoSR produced no output'}, 500
+
+    def generate():
+        try:
+            with open(output_path, 'rb') as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    headers = dict(GLB_HEADERS, **{'Content-Length': str(os.path.getsize(output_path))})
+    return Response(generate(), mimetype='model/gltf-binary', headers=headers)
+
 
 @app.route('/generate-3d-from-image', methods=['POST'])
 def generate_3d_from_image():
@@ -13,17 +137,17 @@ def generate_3d_from_image():
     if not image:
         return {'error': 'No image provided'}, 400
 
-    # Assuming the image is being sent to the Triposr HTTP endpoint
-    response = requests.post(LOCAL_TRIPOSR_URL, files={'image': image.read()})
-    if response.status_code != 200:
-        return {'error': 'Failed to process image'}, 500
-
-    # Save the .glb file locally before sending it back if needed
-    glb_path = 'character.glb'
-    with open(glb_path, 'wb') as f:
-        f.write(response.content)
+    if TRIPOSR_MODE == 'cmd':
+        if not LOCAL_TRIPOSR_CMD:
+            return {'error': 'LOCAL_TRIPOSR_CMD is not configured'}, 503
+        return _run_local_cmd(image)
 
-    return send_file(glb_path, as_attachment=True)
+    if not LOCAL_TRIPOSR_URL:
+        return {'error': 'LOCAL_TRIPOSR_URL is not configured'}, 503
+    try:
+        return _proxy_to_http(image)
+    except requests.RequestException:
+        return {'error': 'Failed to process image'}, 500
 
 if __name__ == '__main__':
-    app.run()
+    app.run(threaded=True)
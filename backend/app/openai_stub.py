@@ -0,0 +1,107 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Implements enough of POST /v1/chat/completions (streaming and non-streaming) for the official SDK to talk to
+it, so the AI endpoints and content scripts can be exercised offline:
+
+    uvicorn app.openai_stub:app --port 8100
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=test uvicorn main:app
+
+Replies echo the prompt and are padded with filler words up to max_tokens; one word counts as one token.
+
+Environment variables:
+  MOCK_OPENAI_FIRST_TOKEN_DELAY — seconds before the first token (default 0.05)
+  MOCK_OPENAI_TOKEN_DELAY — seconds between streamed tokens (default 0.005)
+  MOCK_OPENAI_ERROR_RATE — fraction of requests answered with 429 + Retry-After (default 0)
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FIRST_TOKEN_DELAY = float(os.getenv("MOCK_OPENAI_FIRST_TOKEN_DELAY", "0.05"))
+TOKEN_DELAY = float(os.getenv("MOCK_OPENAI_TOKEN_DELAY", "0.005"))
+ERROR_RATE = float(os.getenv("MOCK_OPENAI_ERROR_RATE", "0"))
+
+app = FastAPI(title="OpenAI stub")
+
+
+def _reply_tokens(messages: list, max_tokens: int) -> list:
+    prompt = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    words = f"Mock reply to: {prompt}".split()
+    filler = ["lorem", "ipsum", "dolor", "sit", "amet"]
+    while len(words) < max_tokens:
+        words.append(filler[len(words) % len(filler)])
+    words = words[:max_tokens]
+    return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+
+def _usage(messages: list, completion_tokens: int) -> dict:
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if ERROR_RATE and random.random() < ERROR_RATE:
+        return JSONResponse(
+            {"error": {"message": "Rate limit reached (stub)", "type": "requests", "code": "rate_limit_exceeded"}},
+            status_code=429,
+            headers={"Retry-After": "0.2"},
+        )
+    model = body.get("model", "gpt-stub")
+    messages = body.get("messages", [])
+    tokens = _reply_tokens(messages, int(body.get("max_tokens") or 64))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    created = int(time.time())
+
+    if not body.get("stream"):
+        await asyncio.sleep(FIRST_TOKEN_DELAY + TOKEN_DELAY * len(tokens))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(messages, len(tokens)),
+        }
+
+    include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+    def chunk(delta: dict, finish_reason=None, usage=None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        if usage:
+            payload["usage"] = usage
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def events():
+        await asyncio.sleep(FIRST_TOKEN_DELAY)
+        yield chunk({"role": "assistant", "content": ""})
+        for token in tokens:
+            yield chunk({"content": token})
+            await asyncio.sleep(TOKEN_DELAY)
+        yield chunk({}, finish_reason="stop")
+        if include_usage:
+            yield chunk({}, usage=_usage(messages, len(tokens)))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
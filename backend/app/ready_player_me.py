@@ -2,7 +2,11 @@
 
 Endpoints:
 - POST /rpm-from-image-url {"image_url": "..."}
-    Create an avatar from a public image URL, poll until ready, download the GLB and return it.
+    Create an avatar from a public image URL, poll until ready and stream the GLB back (cached on disk).
+
+- GET /rpm-avatar/{avatar_id}
+    Return the GLB for an avatar id created through this server, served from the on-disk cache with ETag/304
+    support. Unknown ids get a 404.
 
 - POST /rpm-from-upload (multipart form field "file")
     Accept an uploaded image file. If IMGBB_API_KEY is provided it will upload the image to imgbb and use that public URL
@@ -20,17 +24,25 @@ Notes:
   READY_PLAYER_ME_API_URL (required) — base API URL, e.g. https://api.readyplayer.me
   READY_PLAYER_ME_API_KEY (optional) — if RPM requires a Bearer token
   IMGBB_API_KEY (optional) — if you want the upload-from-file helper to host images for RPM via imgbb.com
+  READY_PLAYER_ME_BATCH_STATUS_PATH (optional) — multi-avatar status endpoint used by the shared poller
+  RPM_CACHE_DIR (optional) — where downloaded avatar GLBs are cached (defaults to a folder in the temp dir)
 
 """
 
 import os
+import re
 import asyncio
+import hashlib
+import random
 import tempfile
-import shutil
+import uuid
+from collections import OrderedDict, deque
+from pathlib import Path
 import httpx
-from fastapi import APIRouter, UploadFile, File, HTTPException
-from fastapi.responses import StreamingResponse, JSONResponse
-from typing import Optional
+import http_pool
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException
+from fastapi.responses import FileResponse, Response, StreamingResponse, JSONResponse
+from typing import Dict, List, Optional
 
 router = APIRouter()
 
@@ -41,6 +53,8 @@ IMGBB_API_KEY = os.getenv("IMGBB_API_KEY", "")
 # Default paths — these may need to be adjusted depending on RPM's current API surface.
 RPM_CREATE_PATH = "/v1/avatars"  # POST to create an avatar job (query params may be supported)
 RPM_GET_AVATAR_PATH = "/v1/avatars/{id}"
+# Optional multi-avatar status endpoint (GET with ?ids=a,b,c); leave empty if the API has none
+RPM_BATCH_STATUS_PATH = os.getenv("READY_PLAYER_ME_BATCH_STATUS_PATH", "")
 
 if not READY_PLAYER_ME_API_URL:
     # Router will still import, but endpoints will error with clear message at runtime if not configured.
@@ -55,18 +69,18 @@ async def _upload_to_imgbb(image_bytes: bytes) -> str:
 
     url = "https://api.imgbb.com/1/upload"
     data = {"key": IMGBB_API_KEY}
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        files = {"image": image_bytes}
-        resp = await client.post(url, data=data, files=files)
-        resp.raise_for_status()
-        j = resp.json()
-        # imgbb returns data.url for the non-base64 image: check structure
-        # Example: {"data": {"url": "https://..."}, "success": true}
-        data_obj = j.get("data") or {}
-        img_url = data_obj.get("url") or data_obj.get("display_url")
-        if not img_url:
-            raise RuntimeError(f"imgbb did not return an image url: {j}")
-        return img_url
+    client = http_pool.get_client("imgbb")
+    files = {"image": image_bytes}
+    resp = await client.post(url, data=data, files=files)
+    resp.raise_for_status()
+    j = resp.json()
+    # imgbb returns data.url for the non-base64 image: check structure
+    # Example: {"data": {"url": "https://..."}, "success": true}
+    data_obj = j.get("data") or {}
+    img_url = data_obj.get("url") or data_obj.get("display_url")
+    if not img_url:
+        raise RuntimeError(f"imgbb did not return an image url: {j}")
+    return img_url
 
 async def _rpm_create_from_image_url(image_url: str) -> dict:
     if not READY_PLAYER_ME_API_URL:
@@ -77,24 +91,24 @@ async def _rpm_create_from_image_url(image_url: str) -> dict:
         headers["Authorization"] = f"Bearer {READY_PLAYER_ME_API_KEY}"
 
     payload = {"imageUrl": image_url}
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # Try POST to create avatar job. Some RPM endpoints accept query param platform=web — include common variants.
-        resp = await client.post(f"{READY_PLAYER_ME_API_URL}{RPM_CREATE_PATH}?platform=web", json=payload, headers=headers)
-        if resp.status_code >= 400:
-            # fallback without queryparam
-            resp = await client.post(f"{READY_PLAYER_ME_API_URL}{RPM_CREATE_PATH}", json=payload, headers=headers)
-        resp.raise_for_status()
-        return resp.json()
+    client = http_pool.get_client("rpm")
+    # Try POST to create avatar job. Some RPM endpoints accept query param platform=web — include common variants.
+    resp = await client.post(f"{READY_PLAYER_ME_API_URL}{RPM_CREATE_PATH}?platform=web", json=payload, headers=headers)
+    if resp.status_code >= 400:
+        # fallback without queryparam
+        resp = await client.post(f"{READY_PLAYER_ME_API_URL}{RPM_CREATE_PATH}", json=payload, headers=headers)
+    resp.raise_for_status()
+    return resp.json()
 
 async def _rpm_get_avatar_info(avatar_id: str) -> dict:
     headers = {}
     if READY_PLAYER_ME_API_KEY:
         headers["Authorization"] = f"Bearer {READY_PLAYER_ME_API_KEY}"
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        resp = await client.get(f"{READY_PLAYER_ME_API_URL}{RPM_GET_AVATAR_PATH.format(id=avatar_id)}", headers=headers)
-        resp.raise_for_status()
-        return resp.json()
+    client = http_pool.get_client("rpm")
+    resp = await client.get(f"{READY_PLAYER_ME_API_URL}{RPM_GET_AVATAR_PATH.format(id=avatar_id)}", headers=headers)
+    resp.raise_for_status()
+    return resp.json()
 
 async def _extract_avatar_id(create_resp: dict) -> Optional[str]:
     # Try multiple common keys that RPM might return
@@ -159,19 +173,377 @@ async def _find_glb_url_from_info(info: dict) -> Optional[str]:
         return None
     return find_url(info)
 
+# Status values that mean the avatar is still being generated; the full URL walk is skipped for these
+RPM_PENDING_STATUSES = ("pending", "queued", "processing", "in_progress", "inprogress", "running")
+RPM_FAILED_STATUSES = ("failed", "error")
+
+
+def _avatar_status(info: dict) -> Optional[str]:
+    if not isinstance(info, dict):
+        return None
+    status = info.get("status") or info.get("processingStatus") or (info.get("data") or {}).get("status")
+    return str(status).lower() if status else None
+
+
+async def _rpm_get_avatar_infos(avatar_ids: List[str]) -> Dict[str, dict]:
+    """Fetch status for several avatars in one call via RPM_BATCH_STATUS_PATH.
+
+    The response may be a list of avatar objects or {"data": [...]}; each object must carry its id.
+    """
+    headers = {}
+    if READY_PLAYER_ME_API_KEY:
+        headers["Authorization"] = f"Bearer {READY_PLAYER_ME_API_KEY}"
+
+    client = http_pool.get_client("rpm")
+    resp = await client.get(f"{READY_PLAYER_ME_API_URL}{RPM_BATCH_STATUS_PATH}",
+                            params={"ids": ",".join(avatar_ids)}, headers=headers)
+    resp.raise_for_status()
+    j = resp.json()
+    items = j.get("data") if isinstance(j, dict) else j
+    infos = {}
+    for item in items or []:
+        if isinstance(item, dict):
+            item_id = item.get("id") or item.get("avatar_id")
+            if item_id:
+                infos[item_id] = item
+    return infos
+
+
+class _PollJob:
+    def __init__(self, avatar_id: str, first_check: float, deadline: float):
+        self.avatar_id = avatar_id
+        self.future = asyncio.get_running_loop().create_future()
+        self.created = asyncio.get_running_loop().time()
+        self.next_check = first_check
+        self.deadline = deadline
+        self.attempts = 0
+        self.last_info = None
+
+
+class AvatarPoller:
+    """Polls all outstanding RPM avatar jobs from a single background task.
+
+    Callers register an avatar id and await a future that resolves to the GLB URL. Check times follow
+    exponential backoff with jitter, seeded from the completion times observed for earlier avatars, so
+    jobs that typically take 20s are not polled every 1.5s from the start. When RPM_BATCH_STATUS_PATH
+    is configured, all due jobs are checked with one request; otherwise they are checked concurrently
+    (bounded by max_concurrency) over the shared "rpm" client.
+
+    The GLB URLs of the last max_known finished avatars are remembered, so ids created by this
+    server can still be looked up after their job is done.
+    """
+
+    def __init__(self, timeout: float = 120.0, min_interval: float = 0.5, max_interval: float = 10.0,
+                 default_interval: float = 1.5, max_concurrency: int = 8, max_known: int = 1000):
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.max_concurrency = max_concurrency
+        self._jobs: Dict[str, _PollJob] = {}
+        self._known: "OrderedDict[str, str]" = OrderedDict()
+        self.max_known = max_known
+        self._durations = deque(maxlen=200)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.status_requests = 0
+        self.completed = 0
+        self.failed = 0
+
+    def _percentile(self, q: float) -> Optional[float]:
+        if not self._durations:
+            return None
+        ordered = sorted(self._durations)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def _first_delay(self) -> float:
+        # Nothing is likely to be ready before the fastest ~10% of past jobs finished
+        p10 = self._percentile(0.1)
+        delay = p10 if p10 is not None else self.default_interval
+        return min(max(delay, self.min_interval), self.max_interval)
+
+    def _next_delay(self, job: _PollJob) -> float:
+        p50 = self._percentile(0.5)
+        base = p50 / 8 if p50 is not None else self.default_interval
+        base = max(base, self.min_interval)
+        delay = min(base * (1.6 ** job.attempts), self.max_interval)
+        # Equal jitter: keep at least half the delay so polls stay spread out but bounded
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def knows(self, avatar_id: str) -> bool:
+        """Whether the avatar is being polled or finished recently"""
+        return avatar_id in self._jobs or avatar_id in self._known
+
+    async def wait_for(self, avatar_id: str) -> str:
+        """Wait until the avatar's GLB URL is available and return it"""
+        if avatar_id in self._known:
+            return self._known[avatar_id]
+        self._ensure_running()
+        job = self._jobs.get(avatar_id)
+        if job is None:
+            now = asyncio.get_running_loop().time()
+            job = _PollJob(avatar_id, now + self._first_delay(), now + self.timeout)
+            self._jobs[avatar_id] = job
+            self._wakeup.set()
+        # Shield so one disconnected caller does not cancel the job for other waiters
+        return await asyncio.shield(job.future)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for job in self._jobs.values():
+            if not job.future.done():
+                job.future.set_exception(RuntimeError("RPM avatar poller stopped"))
+        self._jobs.clear()
+
+    def stats(self) -> dict:
+        p50 = self._percentile(0.5)
+        p90 = self._percentile(0.9)
+        return {
+            "outstanding_jobs": len(self._jobs),
+            "status_requests": self.status_requests,
+            "completed": self.completed,
+            "failed": self.failed,
+            "completion_p50_seconds": round(p50, 2) if p50 is not None else None,
+            "completion_p90_seconds": round(p90, 2) if p90 is not None else None,
+            "batch_status": bool(RPM_BATCH_STATUS_PATH),
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            due = [job for job in self._jobs.values() if job.next_check <= now]
+            if not due:
+                wait = min((job.next_check for job in self._jobs.values()), default=now + 60.0) - now
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=max(wait, 0.0))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._check(due)
+            except Exception as e:
+                # Never let one bad round kill the poller and strand every other waiter
+                for job in due:
+                    self._finish(job, error=e)
+
+    async def _check(self, jobs: List[_PollJob]):
+        if RPM_BATCH_STATUS_PATH and len(jobs) > 1:
+            self.status_requests += 1
+            try:
+                infos = await _rpm_get_avatar_infos([job.avatar_id for job in jobs])
+            except Exception as e:
+                for job in jobs:
+                    self._handle_error(job, e)
+                return
+            for job in jobs:
+                if job.avatar_id in infos:
+                    await self._handle_info_safely(job, infos[job.avatar_id])
+                else:
+                    self._reschedule(job)
+            return
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def check_one(job: _PollJob):
+            async with semaphore:
+                self.status_requests += 1
+                try:
+                    info = await _rpm_get_avatar_info(job.avatar_id)
+                except Exception as e:
+                    self._handle_error(job, e)
+                    return
+                await self._handle_info_safely(job, info)
+
+        await asyncio.gather(*(check_one(job) for job in jobs))
+
+    async def _handle_info(self, job: _PollJob, info: dict):
+        job.last_info = info
+        status = _avatar_status(info)
+        if status in RPM_FAILED_STATUSES:
+            self._finish(job, error=RuntimeError(f"Avatar generation failed: {info}"))
+            return
+        glb_url = None
+        if status not in RPM_PENDING_STATUSES:
+            glb_url = await _find_glb_url_from_info(info)
+        if glb_url:
+            self._finish(job, glb_url=glb_url)
+        else:
+            self._reschedule(job)
+
+    async def _handle_info_safely(self, job: _PollJob, info: dict):
+        # A malformed response fails only its own job; the others keep polling
+        try:
+            await self._handle_info(job, info)
+        except Exception as e:
+            self._finish(job, error=RuntimeError(f"Unreadable RPM avatar status: {e!r}"))
+
+    def _handle_error(self, job: _PollJob, error: Exception):
+        # Client errors other than rate limiting will not fix themselves; everything else is retried
+        if isinstance(error, httpx.HTTPStatusError):
+            code = error.response.status_code
+            if 400 <= code < 500 and code != 429:
+                self._finish(job, error=error)
+                return
+        self._reschedule(job)
+
+    def _reschedule(self, job: _PollJob):
+        now = asyncio.get_running_loop().time()
+        if now >= job.deadline:
+            self._finish(job, error=RuntimeError(f"Timed out waiting for RPM avatar. Last info: {job.last_info}"))
+            return
+        job.attempts += 1
+        job.next_check = min(now + self._next_delay(job), job.deadline)
+
+    def _finish(self, job: _PollJob, glb_url: Optional[str] = None, error: Optional[Exception] = None):
+        self._jobs.pop(job.avatar_id, None)
+        if job.future.done():
+            return
+        if error is not None:
+            self.failed += 1
+            job.future.set_exception(error)
+        else:
+            self.completed += 1
+            self._durations.append(asyncio.get_running_loop().time() - job.created)
+            self._known[job.avatar_id] = glb_url
+            if len(self._known) > self.max_known:
+                self._known.popitem(last=False)
+            job.future.set_result(glb_url)
+
+
+avatar_poller = AvatarPoller()
+
+
+# On-disk GLB cache. Avatars are immutable once generated, so the cache key doubles as a strong ETag.
+RPM_CACHE_DIR = Path(os.getenv("RPM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "rpm_avatar_cache")))
+GLB_HEADERS = {"Content-Disposition": 'attachment; filename="avatar.glb"', "Cache-Control": "public, max-age=31536000, immutable"}
+
+
+def _avatar_cache_key(avatar_id: Optional[str], glb_url: str) -> str:
+    if avatar_id:
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "", avatar_id)
+        if safe_id:
+            return safe_id
+    return hashlib.sha256(glb_url.encode()).hexdigest()[:32]
+
+
+def _image_alias_path(image_url: str) -> Path:
+    return RPM_CACHE_DIR / "by-image" / hashlib.sha256(image_url.encode()).hexdigest()[:32]
+
+
+def _cached_glb_path(key: str) -> Path:
+    return RPM_CACHE_DIR / f"{key}.glb"
+
+
+def _cached_key_for_image(image_url: str) -> Optional[str]:
+    alias = _image_alias_path(image_url)
+    if alias.exists():
+        key = alias.read_text(encoding="utf-8").strip()
+        if key and _cached_glb_path(key).exists():
+            return key
+    return None
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def _serve_cached_glb(key: str, if_none_match: Optional[str]):
+    etag = f'"{key}"'
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": GLB_HEADERS["Cache-Control"]})
+    return FileResponse(_cached_glb_path(key), media_type="model/gltf-binary", headers={**GLB_HEADERS, "ETag": etag})
+
+
+class _CleanupStreamingResponse(StreamingResponse):
+    """StreamingResponse that always runs its cleanup once the response is over.
+
+    A BackgroundTask is not enough: Starlette skips it when the client disconnects, and the body
+    iterator is never started (or closed) if that happens before the first chunk.
+    """
+
+    def __init__(self, content, cleanup, **kwargs):
+        super().__init__(content, **kwargs)
+        self._cleanup = cleanup
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self._cleanup()
+
+
+async def _stream_glb(glb_url: str, key: str, image_url: Optional[str] = None) -> StreamingResponse:
+    """Stream the upstream GLB straight to the caller while teeing it into the cache"""
+    client = http_pool.get_client("rpm_assets")
+    upstream = await client.send(client.build_request("GET", glb_url), stream=True)
+    if upstream.status_code >= 400:
+        await upstream.aclose()
+        upstream.raise_for_status()
+
+    RPM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    final_path = _cached_glb_path(key)
+    part_path = RPM_CACHE_DIR / f"{key}.{uuid.uuid4().hex}.part"
+
+    async def body():
+        with open(part_path, "wb") as fh:
+            async for chunk in upstream.aiter_bytes():
+                fh.write(chunk)
+                yield chunk
+        # Atomic rename so concurrent readers never see a half-written GLB
+        os.replace(part_path, final_path)
+        if image_url:
+            alias = _image_alias_path(image_url)
+            alias.parent.mkdir(parents=True, exist_ok=True)
+            alias.write_text(key, encoding="utf-8")
+
+    body_iter = body()
+
+    async def cleanup():
+        await body_iter.aclose()
+        await upstream.aclose()
+        # Only left behind when the body did not finish
+        part_path.unlink(missing_ok=True)
+
+    headers = {**GLB_HEADERS, "ETag": f'"{key}"'}
+    # Only forward the length when the body is not transfer-encoded, otherwise it would not match
+    if "content-length" in upstream.headers and "content-encoding" not in upstream.headers:
+        headers["Content-Length"] = upstream.headers["content-length"]
+    return _CleanupStreamingResponse(body_iter, cleanup, media_type="model/gltf-binary", headers=headers)
+
 @router.post("/rpm-from-image-url")
-async def rpm_from_image_url(image_url: str):
+async def rpm_from_image_url(image_url: str, if_none_match: Optional[str] = Header(None)):
     """Create an RPM avatar from a public image URL and return the generated GLB bytes.
 
     Flow:
+      - Serve from the avatar cache if this image was already converted (304 when the ETag matches)
       - POST create job to RPM with image_url
       - Extract job id (or possibly a direct glb URL)
-      - Poll for completion and extract final GLB URL
-      - Download GLB and stream back to caller
+      - Wait on the shared avatar poller for the final GLB URL
+      - Stream the GLB to the caller, teeing it into the cache
     """
     if not image_url:
         raise HTTPException(status_code=400, detail="image_url is required")
     try:
+        cached_key = _cached_key_for_image(image_url)
+        if cached_key:
+            return _serve_cached_glb(cached_key, if_none_match)
+
         create_resp = await _rpm_create_from_image_url(image_url)
         avatar_id = await _extract_avatar_id(create_resp)
         if not avatar_id:
@@ -180,49 +552,38 @@ async def rpm_from_image_url(image_url: str):
         # If avatar_id is actually a URL marker, short-circuit
         if isinstance(avatar_id, str) and avatar_id.startswith("__url__:"):
             glb_url = avatar_id.split("__url__:", 1)[1]
+            avatar_id = None
         else:
-            # poll until ready
-            glb_url = None
-            # Poll loop
-            start = asyncio.get_event_loop().time()
-            timeout = 120.0
-            while True:
-                info = await _rpm_get_avatar_info(avatar_id)
-                # Try to extract glb url
-                glb_url = await _find_glb_url_from_info(info)
-                status = None
-                if isinstance(info, dict):
-                    status = info.get("status") or info.get("processingStatus") or (info.get("data") or {}).get("status")
-                if glb_url:
-                    break
-                if status and str(status).lower() in ("failed", "error"):
-                    raise RuntimeError(f"Avatar generation failed: {info}")
-                if asyncio.get_event_loop().time() - start > timeout:
-                    raise RuntimeError(f"Timed out waiting for RPM avatar. Last info: {info}")
-                await asyncio.sleep(1.5)
-
-        # Download GLB and stream back
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            r = await client.get(glb_url)
-            r.raise_for_status()
-            tmpdir = tempfile.mkdtemp(prefix="rpm_")
-            out_path = tmpdir + "/avatar.glb"
-            with open(out_path, "wb") as f:
-                f.write(r.content)
-
-            async def file_iter():
-                try:
-                    with open(out_path, "rb") as fh:
-                        while True:
-                            chunk = fh.read(8192)
-                            if not chunk:
-                                break
-                            yield chunk
-                finally:
-                    shutil.rmtree(tmpdir, ignore_errors=True)
-
-            return StreamingResponse(file_iter(), media_type="model/gltf-binary",
-                                     headers={"Content-Disposition": 'attachment; filename="avatar.glb"'})
+            # wait for the shared poller to report the GLB url
+            glb_url = await avatar_poller.wait_for(avatar_id)
+
+        key = _avatar_cache_key(avatar_id, glb_url)
+        if _cached_glb_path(key).exists():
+            return _serve_cached_glb(key, if_none_match)
+        return await _stream_glb(glb_url, key, image_url=image_url)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/rpm-avatar/{avatar_id}")
+async def rpm_avatar(avatar_id: str, if_none_match: Optional[str] = Header(None)):
+    """Return the GLB for a known avatar id, from the cache when possible.
+
+    Only avatars already cached or created through this server are served; other ids get a 404
+    rather than tying up a request (and the poller) for the full timeout.
+    Supports If-None-Match so clients that already hold the avatar get a 304.
+    """
+    key = _avatar_cache_key(avatar_id, avatar_id)
+    if key != avatar_id:
+        raise HTTPException(status_code=400, detail="Invalid avatar id")
+    if _cached_glb_path(key).exists():
+        return _serve_cached_glb(key, if_none_match)
+    if not avatar_poller.knows(avatar_id):
+        raise HTTPException(status_code=404, detail="Unknown avatar id")
+    try:
+        glb_url = await avatar_poller.wait_for(avatar_id)
+        return await _stream_glb(glb_url, key)
     except HTTPException:
         raise
     except Exception as e:
@@ -242,7 +603,7 @@ async def rpm_from_upload(file: UploadFile = File(...)):
     try:
         contents = await file.read()
         image_url = await _upload_to_imgbb(contents)
-        return await rpm_from_image_url(image_url)
+        return await rpm_from_image_url(image_url, if_none_match=None)
     except HTTPException:
         raise
     except Exception as e:
@@ -253,4 +614,5 @@ def rpm_health():
     return JSONResponse({
         "ready_player_me_configured": bool(READY_PLAYER_ME_API_URL),
         "imggb_configured": bool(IMGBB_API_KEY),
+        "poller": avatar_poller.stats(),
     })
\ No newline at end of file
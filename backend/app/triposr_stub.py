@@ -0,0 +1,77 @@
+"""Local stand-in for a TripoSR HTTP server.
+
+Accepts a multipart "image" upload like the real server and answers with a small, valid GLB (a single
+triangle), so the bridge in app/main.py can be exercised without a GPU:
+
+    python -m app.triposr_stub --port 5001
+    LOCAL_TRIPOSR_URL=http://127.0.0.1:5001/generate python -m app.main
+
+Flags:
+  --delay seconds to sleep before answering (simulates inference time)
+  --fail  answer every request with a 500
+"""
+
+import argparse
+import json
+import struct
+import time
+from flask import Flask, Response, request
+
+
+def build_stub_glb() -> bytes:
+    """Build a minimal glTF 2.0 binary containing one triangle"""
+    positions = struct.pack('<9f', 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+    indices = struct.pack('<3H', 0, 1, 2) + b'\x00\x00'  # pad to 4 bytes
+    bin_chunk = positions + indices
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'triposr-stub'},
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{'mesh': 0}],
+        'meshes': [{'primitives': [{'attributes': {'POSITION': 0}, 'indices': 1}]}],
+        'buffers': [{'byteLength': len(bin_chunk)}],
+        'bufferViews': [
+            {'buffer': 0, 'byteOffset': 0, 'byteLength': len(positions), 'target': 34962},
+            {'buffer': 0, 'byteOffset': len(positions), 'byteLength': 6, 'target': 34963},
+        ],
+        'accessors': [
+            {'bufferView': 0, 'componentType': 5126, 'count': 3, 'type': 'VEC3',
+             'min': [0.0, 0.0, 0.0], 'max': [1.0, 1.0, 0.0]},
+            {'bufferView': 1, 'componentType': 5123, 'count': 3, 'type': 'SCALAR'},
+        ],
+    }
+    json_chunk = json.dumps(gltf, separators=(',', ':')).encode()
+    json_chunk += b' ' * (-len(json_chunk) % 4)
+    total = 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)
+    return b''.join([
+        struct.pack('<4sII', b'glTF', 2, total),
+        struct.pack('<I4s', len(json_chunk), b'JSON'), json_chunk,
+        struct.pack('<I4s', len(bin_chunk), b'BIN\x00'), bin_chunk,
+    ])
+
+
+def create_app(delay: float = 0.0, fail: bool = False) -> Flask:
+    stub = Flask(__name__)
+    glb = build_stub_glb()
+
+    @stub.route('/generate', methods=['POST'])
+    def generate():
+        image = request.files.get('image')
+        if not image or not image.read():
+            return {'error': 'No image provided'}, 400
+        if delay:
+            time.sleep(delay)
+        if fail:
+            return {'error': 'stub failure'}, 500
+        return Response(glb, mimetype='model/gltf-binary')
+
+    return stub
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stub TripoSR server')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--delay', type=float, default=0.0)
+    parser.add_argument('--fail', action='store_true')
+    args = parser.parse_args()
+    create_app(args.delay, args.fail).run(port=args.port, threaded=True)
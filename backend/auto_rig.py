@@ -0,0 +1,294 @@
+"""
+Procedural auto-rigging for generated characters
+
+Fits a 19-bone humanoid skeleton to a T-pose mesh and writes a skinned GLB:
+
+1. The mesh is sliced along its height. Cross-section widths locate the
+   arms (widest upper-body slice), the neck (narrowest slice above the
+   arms) and the crotch (highest slice with a gap between the legs); the
+   remaining joints follow from those landmarks and the mesh bounds.
+2. Every vertex gets weights for its four closest bones. Distance to each
+   bone segment is scaled by the bone's radius and passed through a heat
+   falloff, all vectorised over vertices x bones with NumPy.
+3. Joint nodes, a skin per mesh node and JOINTS_0/WEIGHTS_0 attributes are
+   appended to the original GLB. Skinned meshes ignore their node transform,
+   so each node's world matrix is folded into its skin's inverse bind
+   matrices instead of being baked into the vertices: existing attributes
+   (including quantized ones from glb_optimize) and the rest of the BIN
+   chunk are carried over untouched.
+
+Assumes the glTF convention of +Y up with the character facing +Z, so the
+character's left side is +X.
+"""
+import copy
+import time
+from typing import Dict, List, Tuple
+import numpy as np
+from glb import GLB, GLBError, BinWriter, pack_glb, world_matrices, ARRAY_BUFFER, MODE_TRIANGLES
+
+# (bone, parent) in hierarchy order
+BONES: List[Tuple[str, str]] = [
+    ("root", None), ("spine", "root"), ("chest", "spine"), ("neck", "chest"), ("head", "neck"),
+    ("shoulder_l", "chest"), ("arm_l", "shoulder_l"), ("forearm_l", "arm_l"), ("hand_l", "forearm_l"),
+    ("shoulder_r", "chest"), ("arm_r", "shoulder_r"), ("forearm_r", "arm_r"), ("hand_r", "forearm_r"),
+    ("thigh_l", "root"), ("shin_l", "thigh_l"), ("foot_l", "shin_l"),
+    ("thigh_r", "root"), ("shin_r", "thigh_r"), ("foot_r", "shin_r"),
+]
+BONE_NAMES = [name for name, _ in BONES]
+
+# Height slices used for cross-section analysis
+SLICES = 64
+# Bones that influence each vertex (JOINTS_0/WEIGHTS_0 hold four)
+INFLUENCES = 4
+# Exponent of the heat falloff; higher gives tighter, less blended weights
+FALLOFF = 2.0
+
+
+def fit_skeleton(positions: np.ndarray) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray], Dict[str, float]]:
+    """
+    Place the joints from mesh bounds and cross-sections
+
+    Returns:
+        (joint heads, bone tails, bone radii) keyed by bone name
+    """
+    low, high = positions.min(axis=0), positions.max(axis=0)
+    height = float(high[1] - low[1])
+    if height <= 0:
+        raise GLBError("Mesh has no height")
+    x, y, z = positions[:, 0], positions[:, 1], positions[:, 2]
+    cx, cz = float(np.median(x)), float(np.median(z))
+
+    # Per-slice X extent either side of the centre line
+    slice_of = np.minimum(((y - low[1]) / height * SLICES).astype(np.int32), SLICES - 1)
+    right_extent = np.full(SLICES, 0.0)
+    left_extent = np.full(SLICES, 0.0)
+    np.maximum.at(left_extent, slice_of, np.maximum(x - cx, 0))
+    np.maximum.at(right_extent, slice_of, np.maximum(cx - x, 0))
+    width = left_extent + right_extent
+    heights = low[1] + (np.arange(SLICES) + 0.5) / SLICES * height
+
+    def band(lo: float, hi: float) -> np.ndarray:
+        return np.arange(int(lo * SLICES), max(int(hi * SLICES), int(lo * SLICES) + 1))
+
+    # Arms: the widest slice in the upper body
+    upper = band(0.6, 0.9)
+    arm_slice = int(upper[np.argmax(width[upper])])
+    shoulder_y = float(heights[arm_slice])
+    span_left = float(left_extent[arm_slice])
+    span_right = float(right_extent[arm_slice])
+
+    # Neck: the narrowest slice between the arms and the top of the head
+    above = np.arange(arm_slice + 1, SLICES - 1)
+    neck_slice = int(above[np.argmin(width[above])]) if len(above) else min(arm_slice + 3, SLICES - 1)
+    neck_y = float(heights[neck_slice])
+
+    # Torso: width just below the armpits
+    torso_slice = max(arm_slice - max(SLICES // 16, 1), 0)
+    torso_half = max(float(min(left_extent[torso_slice], right_extent[torso_slice])), height * 0.05)
+
+    # Crotch: highest slice in the lower body with no vertices near the centre line
+    crotch_y = low[1] + 0.47 * height
+    near_centre = np.abs(x - cx) < torso_half * 0.15
+    centre_counts = np.bincount(slice_of[near_centre], minlength=SLICES)
+    side_counts = np.bincount(slice_of[~near_centre], minlength=SLICES)
+    for s in band(0.2, 0.6)[::-1]:
+        if centre_counts[s] == 0 and side_counts[s] > 0:
+            crotch_y = float(heights[s])
+            break
+
+    # Leg centre: mean |x| of vertices in the thighs
+    thigh_band = (y > low[1] + 0.3 * (crotch_y - low[1])) & (y < crotch_y)
+    leg_offset = float(np.mean(np.abs(x[thigh_band] - cx))) if thigh_band.any() else torso_half * 0.5
+    leg_offset = min(max(leg_offset, torso_half * 0.3), torso_half)
+
+    ankle_y = low[1] + 0.05 * height
+    hip_y = crotch_y + 0.04 * height
+    knee_y = ankle_y + 0.5 * (hip_y - ankle_y)
+    toe_z = float(high[2]) if high[2] - cz > 0.02 * height else cz + 0.08 * height
+
+    def p(px, py, pz=cz):
+        return np.array([px, py, pz], dtype=np.float64)
+
+    heads = {
+        "root": p(cx, hip_y),
+        "spine": p(cx, hip_y + 0.3 * (shoulder_y - hip_y)),
+        "chest": p(cx, hip_y + 0.65 * (shoulder_y - hip_y)),
+        "neck": p(cx, neck_y),
+        "head": p(cx, neck_y + 0.25 * (high[1] - neck_y)),
+    }
+    tails = {"head": p(cx, high[1])}
+    for side, sign, span in (("l", 1, span_left), ("r", -1, span_right)):
+        span = max(span, torso_half * 1.5)
+        heads[f"shoulder_{side}"] = p(cx + sign * torso_half * 0.3, shoulder_y)
+        heads[f"arm_{side}"] = p(cx + sign * torso_half, shoulder_y)
+        wrist = torso_half + 0.8 * (span - torso_half)
+        heads[f"forearm_{side}"] = p(cx + sign * (torso_half + 0.5 * (wrist - torso_half)), shoulder_y)
+        heads[f"hand_{side}"] = p(cx + sign * wrist, shoulder_y)
+        tails[f"hand_{side}"] = p(cx + sign * span, shoulder_y)
+        heads[f"thigh_{side}"] = p(cx + sign * leg_offset, hip_y)
+        heads[f"shin_{side}"] = p(cx + sign * leg_offset, knee_y)
+        heads[f"foot_{side}"] = p(cx + sign * leg_offset, ankle_y)
+        tails[f"foot_{side}"] = p(cx + sign * leg_offset, low[1], toe_z)
+
+    # Bones without an explicit tail end at their first child
+    for name, parent in BONES:
+        if parent and parent not in tails:
+            tails[parent] = heads[name]
+
+    limb = 0.045 * height
+    radii = {name: limb for name in BONE_NAMES}
+    radii.update(root=torso_half, spine=torso_half, chest=torso_half, neck=limb, head=0.6 * (high[1] - neck_y))
+    for side in ("l", "r"):
+        radii[f"thigh_{side}"] = radii[f"shin_{side}"] = max(leg_offset * 0.8, limb)
+    return heads, tails, radii
+
+
+def skin_weights(positions: np.ndarray, heads: Dict, tails: Dict, radii: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Four bone influences per vertex from distance to each bone segment
+
+    Returns:
+        (joints uint8 (n, 4), weights float32 (n, 4))
+    """
+    a = np.array([heads[name] for name in BONE_NAMES], dtype=np.float32)
+    b = np.array([tails[name] for name in BONE_NAMES], dtype=np.float32)
+    r = np.array([radii[name] for name in BONE_NAMES], dtype=np.float32)
+    d = b - a
+    length_sq = np.maximum(np.einsum("ij,ij->i", d, d), 1e-12)
+
+    p = positions.astype(np.float32, copy=False)
+    # Projection of each vertex onto each segment, clamped to the segment: (n, bones)
+    t = np.clip((p @ d.T - np.einsum("ij,ij->i", a, d)) / length_sq, 0.0, 1.0)
+    # |p - (a + t d)|^2 expanded so no (n, bones, 3) temporary is needed
+    dist_sq = (np.einsum("ij,ij->i", p, p)[:, None]
+               - 2 * (p @ a.T + t * (p @ d.T))
+               + np.einsum("ij,ij->i", a, a) + 2 * t * np.einsum("ij,ij->i", a, d) + t * t * length_sq)
+    np.maximum(dist_sq, 0, out=dist_sq)
+
+    # Heat falloff, scaled by each bone's radius so thick and thin bones compete fairly
+    heat = (1.0 + dist_sq / (r * r)) ** -FALLOFF
+    joints = np.argpartition(-heat, INFLUENCES - 1, axis=1)[:, :INFLUENCES]
+    weights = np.take_along_axis(heat, joints, axis=1)
+    weights /= np.maximum(weights.sum(axis=1, keepdims=True), 1e-12)
+    order = np.argsort(-weights, axis=1)
+    return (np.take_along_axis(joints, order, axis=1).astype(np.uint8),
+            np.take_along_axis(weights, order, axis=1).astype(np.float32))
+
+
+def quantize_weights(weights: np.ndarray) -> np.ndarray:
+    """Normalized uint8 weights that still sum to exactly 1 per vertex"""
+    quantized = np.rint(weights * 255).astype(np.int16)
+    # Rounding can leave a vertex a step or two off; the strongest influence absorbs it
+    quantized[:, 0] += 255 - quantized.sum(axis=1)
+    return quantized.astype(np.uint8)
+
+
+def rig_glb(data: bytes) -> Tuple[bytes, Dict]:
+    """
+    Rig every mesh in a GLB with one procedural humanoid skeleton
+
+    Returns:
+        (skinned GLB bytes, rigging metadata)
+    """
+    started = time.perf_counter()
+    glb = GLB(data)
+    gltf = glb.json
+    if gltf.get("skins"):
+        raise GLBError("Model is already skinned")
+    world = world_matrices(gltf)
+    nodes = gltf.get("nodes", [])
+    mesh_nodes = [i for i, n in enumerate(nodes) if "mesh" in n and i in world]
+    if not mesh_nodes:
+        raise GLBError("Model has no meshes in its scene")
+
+    # Weights depend on where an instance sits, so a mesh drawn by several nodes gets a copy per extra node
+    meshes = gltf["meshes"]
+    seen = set()
+    for node_index in mesh_nodes:
+        node = nodes[node_index]
+        if node["mesh"] in seen:
+            meshes.append(copy.deepcopy(meshes[node["mesh"]]))
+            node["mesh"] = len(meshes) - 1
+        seen.add(node["mesh"])
+
+    # World-space positions of every primitive; only triangles are used to fit the skeleton
+    placed = []
+    for node_index in mesh_nodes:
+        matrix = world[node_index]
+        for primitive in meshes[nodes[node_index]["mesh"]].get("primitives", []):
+            if "POSITION" not in primitive.get("attributes", {}):
+                continue
+            positions = glb.accessor(primitive["attributes"]["POSITION"]).astype(np.float64) @ matrix[:3, :3].T + matrix[:3, 3]
+            placed.append((primitive, positions, primitive.get("mode", MODE_TRIANGLES) == MODE_TRIANGLES))
+    triangle_positions = [positions for _, positions, is_triangles in placed if is_triangles and len(positions)]
+    if not triangle_positions:
+        raise GLBError("Model has no triangle geometry")
+
+    heads, tails, radii = fit_skeleton(np.concatenate(triangle_positions))
+
+    # Appended data goes after the original BIN chunk in buffer 0
+    gltf.setdefault("buffers", [{"byteLength": 0}])
+    original_bin = bytes(glb.buffer(0)) if gltf["buffers"][0].get("uri") or glb.bin is not None else b""
+    writer = BinWriter(original_bin, gltf.setdefault("bufferViews", []), gltf.setdefault("accessors", []))
+
+    # A skinned mesh needs skin attributes on every primitive, points and lines included
+    vertex_count = 0
+    for primitive, positions, _ in placed:
+        joints, weights = skin_weights(positions, heads, tails, radii)
+        primitive["attributes"]["JOINTS_0"] = writer.accessor(joints, ARRAY_BUFFER)
+        primitive["attributes"]["WEIGHTS_0"] = writer.accessor(quantize_weights(weights), ARRAY_BUFFER, normalized=True)
+        vertex_count += len(positions)
+
+    # Joint nodes in rest pose: translation only, relative to the parent joint
+    joint_nodes = {}
+    for name, parent in BONES:
+        translation = heads[name] - (heads[parent] if parent else 0)
+        joint_nodes[name] = len(nodes)
+        nodes.append({"name": name, "translation": [round(float(v), 6) for v in translation]})
+        if parent:
+            nodes[joint_nodes[parent]].setdefault("children", []).append(joint_nodes[name])
+
+    inverse_bind = np.tile(np.eye(4), (len(BONES), 1, 1))
+    for i, name in enumerate(BONE_NAMES):
+        inverse_bind[i, :3, 3] = -heads[name]
+    skins = gltf["skins"] = []
+    for node_index in mesh_nodes:
+        # The mesh node's world transform moves into the inverse bind matrices; glTF matrices are column-major
+        node_bind = (inverse_bind @ world[node_index]).astype(np.float32)
+        skins.append({
+            "name": "auto_rig",
+            "joints": [joint_nodes[name] for name in BONE_NAMES],
+            "inverseBindMatrices": writer.accessor(node_bind.transpose(0, 2, 1).reshape(len(BONES), 16), accessor_type="MAT4"),
+            "skeleton": joint_nodes["root"],
+        })
+        node = nodes[node_index]
+        node["skin"] = len(skins) - 1
+        for key in ("matrix", "translation", "rotation", "scale"):
+            node.pop(key, None)
+    scene = gltf.setdefault("scenes", [{"nodes": []}])[gltf.get("scene", 0)]
+    scene.setdefault("nodes", []).append(joint_nodes["root"])
+    # Mesh nodes nested under transformed parents would still inherit them, so lift them to the scene root
+    for parent_node in nodes[:joint_nodes["root"]]:
+        children = parent_node.get("children", [])
+        lifted = [c for c in mesh_nodes if c in children]
+        if lifted:
+            parent_node["children"] = [c for c in children if c not in lifted]
+            if not parent_node["children"]:
+                parent_node.pop("children")
+            scene["nodes"].extend(c for c in lifted if c not in scene["nodes"])
+
+    binary = writer.binary()
+    gltf["buffers"][0] = {k: v for k, v in gltf["buffers"][0].items() if k != "uri"}
+    gltf["buffers"][0]["byteLength"] = len(binary)
+    gltf.setdefault("asset", {"version": "2.0"})
+
+    metadata = {
+        "rigged": True,
+        "method": "procedural",
+        "bones": BONE_NAMES,
+        "skeleton": {name: [round(float(v), 4) for v in heads[name]] for name in BONE_NAMES},
+        "vertices": vertex_count,
+        "rig_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    glb.release()
+    return pack_glb(gltf, binary), metadata
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark procedural rigging on a synthetic T-pose character
+
+Builds a humanoid from ellipsoids (torso, head, arms, legs) with roughly the
+requested vertex count, rigs it and reports the time, the fitted joint
+positions and where the dominant bone of a few probe points landed.
+
+Usage:
+    python benchmarks/auto_rig_bench.py [--vertices 100000] [--runs 5]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from glb import GLB, pack_glb
+from auto_rig import BONE_NAMES, rig_glb
+
+# (centre, radii) of each body part for a 1.8 m character facing +Z
+PARTS = [
+    ((0, 1.25, 0), (0.17, 0.3, 0.11)),      # torso
+    ((0, 1.66, 0), (0.1, 0.12, 0.1)),       # head
+    ((0, 1.52, 0), (0.045, 0.06, 0.045)),   # neck
+    ((0.37, 1.45, 0), (0.2, 0.05, 0.05)),   # upper arm l
+    ((0.72, 1.45, 0), (0.17, 0.04, 0.04)),  # forearm + hand l
+    ((-0.37, 1.45, 0), (0.2, 0.05, 0.05)),  # upper arm r
+    ((-0.72, 1.45, 0), (0.17, 0.04, 0.04)), # forearm + hand r
+    ((0.1, 0.72, 0), (0.07, 0.24, 0.07)),   # thigh l
+    ((0.1, 0.27, 0), (0.055, 0.24, 0.055)), # shin l
+    ((-0.1, 0.72, 0), (0.07, 0.24, 0.07)),  # thigh r
+    ((-0.1, 0.27, 0), (0.055, 0.24, 0.055)),# shin r
+    ((0.1, 0.03, 0.05), (0.05, 0.03, 0.1)), # foot l
+    ((-0.1, 0.03, 0.05), (0.05, 0.03, 0.1)),# foot r
+]
+
+
+def build_humanoid_glb(vertices: int) -> bytes:
+    """A watertight-enough T-pose humanoid as one indexed triangle mesh"""
+    per_part = max(vertices // len(PARTS), 16)
+    rings = max(int(np.sqrt(per_part / 2)), 3)
+    segments = max(per_part // rings, 3)
+    theta = np.linspace(0, np.pi, rings)
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    t, p = np.meshgrid(theta, phi, indexing="ij")
+    unit = np.stack([np.sin(t) * np.cos(p), np.cos(t), np.sin(t) * np.sin(p)], axis=-1).reshape(-1, 3)
+    # sin(pi) is not exactly 0; snap so the bottom pole welds shut
+    unit[np.abs(unit) < 1e-9] = 0
+
+    r, s = np.meshgrid(np.arange(rings - 1), np.arange(segments), indexing="ij")
+    a = r * segments + s
+    b = r * segments + (s + 1) % segments
+    c = a + segments
+    d = b + segments
+    grid = np.stack([a, c, b, b, c, d], axis=-1).reshape(-1, 3)
+
+    positions, normals, indices = [], [], []
+    for i, (centre, radii) in enumerate(PARTS):
+        positions.append(unit * radii + centre)
+        n = unit / radii
+        normals.append(n / np.maximum(np.linalg.norm(n, axis=1, keepdims=True), 1e-12))
+        indices.append(grid + i * len(unit))
+    positions = np.concatenate(positions).astype("<f4")
+    normals = np.concatenate(normals).astype("<f4")
+    indices = np.concatenate(indices).astype("<u4").ravel()
+
+    blobs = [positions.tobytes(), normals.tobytes(), indices.tobytes()]
+    views, offset = [], 0
+    for blob in blobs:
+        views.append({"buffer": 0, "byteOffset": offset, "byteLength": len(blob)})
+        offset += len(blob)
+    gltf = {
+        "asset": {"version": "2.0", "generator": "auto_rig_bench"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0, "NORMAL": 1}, "indices": 2}]}],
+        "buffers": [{"byteLength": offset}],
+        "bufferViews": views,
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": len(positions), "type": "VEC3",
+             "min": positions.min(axis=0).tolist(), "max": positions.max(axis=0).tolist()},
+            {"bufferView": 1, "componentType": 5126, "count": len(normals), "type": "VEC3"},
+            {"bufferView": 2, "componentType": 5125, "count": len(indices), "type": "SCALAR"},
+        ],
+    }
+    return pack_glb(gltf, b"".join(blobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vertices", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    data = build_humanoid_glb(args.vertices)
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        rigged, metadata = rig_glb(data)
+        timings.append(time.perf_counter() - started)
+    print(f"rig: {metadata['vertices']} vertices, best {min(timings) * 1000:.1f} ms, "
+          f"{len(data) / 1e6:.1f} MB -> {len(rigged) / 1e6:.1f} MB")
+    for name, position in metadata["skeleton"].items():
+        print(f"  {name:11} {position}")
+
+    glb = GLB(rigged)
+    primitive = glb.json["meshes"][0]["primitives"][0]
+    positions = glb.accessor(primitive["attributes"]["POSITION"])
+    joints = glb.accessor(primitive["attributes"]["JOINTS_0"])
+    print("dominant bone at probe points:")
+    for label, probe in (("head top", (0, 1.78, 0)), ("left hand", (0.85, 1.45, 0)), ("right knee", (-0.1, 0.5, 0.05)),
+                         ("left foot", (0.1, 0.02, 0.12)), ("belly", (0, 1.05, 0.11))):
+        nearest = np.argmin(np.linalg.norm(positions - probe, axis=1))
+        print(f"  {label:10} -> {BONE_NAMES[joints[nearest, 0]]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark how long payload work blocks the event loop, inline vs offloaded
+
+A ticker task sleeps 1 ms at a time while the payload is processed; its
+worst oversleep is the longest stretch the loop could not serve anything
+else. Latency is the wall time of the call itself.
+
+Usage:
+    python benchmarks/cpu_offload_bench.py [--sizes 0.1,1,5,20] [--paragraphs 4000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import cpu_pool
+from seo_extractor import summarize_seo
+from benchmarks.seo_extractor_bench import build_page
+
+
+async def measure(func, *args, min_bytes: int):
+    lag = 0.0
+
+    async def ticker():
+        nonlocal lag
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lag = max(lag, time.perf_counter() - start - 0.001)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await cpu_pool.offload(func, len(args[0]), *args, min_bytes=min_bytes)
+    latency = time.perf_counter() - start
+    # Let the ticker wake once more to see a stall that lasted until the call returned
+    await asyncio.sleep(0.01)
+    task.cancel()
+    return latency, lag
+
+
+async def run(sizes, paragraphs: int):
+    # Start the workers before timing anything
+    await cpu_pool.run(len, b"")
+    cases = [(f"base64 {mb:g} MB", cpu_pool._b64encode, os.urandom(int(mb * 1024 * 1024))) for mb in sizes]
+    page = build_page(paragraphs)
+    cases.append((f"SEO parse {len(page) // 1024} KB", summarize_seo, page))
+    print(f"{'payload':<20} {'inline ms':>10} {'lag ms':>8} {'pool ms':>9} {'lag ms':>8}")
+    for name, func, payload in cases:
+        inline, inline_lag = await measure(func, payload, min_bytes=float("inf"))
+        pooled, pooled_lag = await measure(func, payload, min_bytes=0)
+        print(f"{name:<20} {inline * 1e3:>10.1f} {inline_lag * 1e3:>8.1f} {pooled * 1e3:>9.1f} {pooled_lag * 1e3:>8.1f}")
+    cpu_pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark inline vs process-pool payload work")
+    parser.add_argument("--sizes", default="0.1,1,5,20", help="base64 payload sizes in MB")
+    parser.add_argument("--paragraphs", type=int, default=4000)
+    args = parser.parse_args()
+    asyncio.run(run([float(size) for size in args.sizes.split(",")], args.paragraphs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark GLB inspection on a large synthetic model
+
+Builds a mesh with positions, normals, UVs and indices (about 55 MB with the
+defaults), writes it to a temp file and times open_glb + inspect, reporting
+peak Python memory allocated while inspecting.
+
+Usage:
+    python benchmarks/glb_inspect_bench.py [--vertices 1000000] [--runs 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from glb import open_glb, pack_glb
+
+
+def build_mesh_glb(vertices: int) -> bytes:
+    rng = np.random.default_rng(0)
+    positions = rng.standard_normal((vertices, 3)).astype("<f4")
+    normals = positions / np.linalg.norm(positions, axis=1, keepdims=True)
+    uvs = rng.random((vertices, 2)).astype("<f4")
+    indices = rng.integers(0, vertices, size=vertices * 6, dtype="<u4")
+    blobs = [positions.tobytes(), normals.tobytes(), uvs.tobytes(), indices.tobytes()]
+    views, offset = [], 0
+    for blob in blobs:
+        views.append({"buffer": 0, "byteOffset": offset, "byteLength": len(blob)})
+        offset += len(blob)
+    gltf = {
+        "asset": {"version": "2.0", "generator": "glb_inspect_bench"},
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0, "NORMAL": 1, "TEXCOORD_0": 2}, "indices": 3}]}],
+        "buffers": [{"byteLength": offset}],
+        "bufferViews": views,
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": vertices, "type": "VEC3",
+             "min": positions.min(axis=0).tolist(), "max": positions.max(axis=0).tolist()},
+            {"bufferView": 1, "componentType": 5126, "count": vertices, "type": "VEC3"},
+            {"bufferView": 2, "componentType": 5126, "count": vertices, "type": "VEC2"},
+            {"bufferView": 3, "componentType": 5125, "count": len(indices), "type": "SCALAR"},
+        ],
+    }
+    return pack_glb(gltf, b"".join(blobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vertices", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    data = build_mesh_glb(args.vertices)
+    fd, path = tempfile.mkstemp(suffix=".glb")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    print(f"GLB size: {len(data) / 1e6:.1f} MB")
+
+    try:
+        timings = []
+        for _ in range(args.runs):
+            tracemalloc.start()
+            started = time.perf_counter()
+            with open_glb(path) as glb:
+                report = glb.inspect()
+            timings.append(time.perf_counter() - started)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        print(f"inspect: best {min(timings) * 1000:.2f} ms, peak allocations {peak / 1024:.0f} KiB")
+        print(f"  {report['vertex_count']} vertices, {report['triangle_count']} triangles")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    main()
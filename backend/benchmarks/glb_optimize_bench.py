@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark GLB optimisation on a TripoSR-style export
+
+Unwelds the synthetic humanoid from auto_rig_bench into a float32 triangle
+soup with UVs and an embedded 4096px PNG (the shape of a marching-cubes
+export), then times optimize_glb and prints its size report.
+
+Usage:
+    python benchmarks/glb_optimize_bench.py [--vertices 100000] [--texture 4096]
+"""
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from glb import GLB, pack_glb
+from glb_optimize import optimize_glb
+from auto_rig_bench import build_humanoid_glb
+
+
+def build_soup_glb(vertices: int, texture: int) -> bytes:
+    mesh = GLB(build_humanoid_glb(vertices))
+    corners = mesh.accessor(2)
+    positions = np.ascontiguousarray(mesh.accessor(0)[corners], dtype="<f4")
+    normals = np.ascontiguousarray(mesh.accessor(1)[corners], dtype="<f4")
+    uvs = ((positions[:, :2] - positions[:, :2].min(axis=0)) / np.ptp(positions[:, :2], axis=0)).astype("<f4")
+    rng = np.random.default_rng(0)
+    pixels = (rng.random((texture, texture, 3)) * 40 + 100).astype(np.uint8)
+    png = io.BytesIO()
+    Image.fromarray(pixels).save(png, "PNG")
+
+    blobs = [positions.tobytes(), normals.tobytes(), uvs.tobytes(), png.getvalue()]
+    views, offset = [], 0
+    for blob in blobs:
+        views.append({"buffer": 0, "byteOffset": offset, "byteLength": len(blob)})
+        offset += len(blob) + (-len(blob) % 4)
+    gltf = {
+        "asset": {"version": "2.0", "generator": "glb_optimize_bench"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [{"attributes": {"POSITION": 0, "NORMAL": 1, "TEXCOORD_0": 2}, "material": 0}]}],
+        "materials": [{"pbrMetallicRoughness": {"baseColorTexture": {"index": 0}}}],
+        "textures": [{"source": 0}],
+        "images": [{"bufferView": 3, "mimeType": "image/png"}],
+        "buffers": [{"byteLength": offset}],
+        "bufferViews": views,
+        "accessors": [
+            {"bufferView": 0, "componentType": 5126, "count": len(positions), "type": "VEC3",
+             "min": positions.min(axis=0).tolist(), "max": positions.max(axis=0).tolist()},
+            {"bufferView": 1, "componentType": 5126, "count": len(normals), "type": "VEC3"},
+            {"bufferView": 2, "componentType": 5126, "count": len(uvs), "type": "VEC2"},
+        ],
+    }
+    return pack_glb(gltf, b"".join(blob + b"\x00" * (-len(blob) % 4) for blob in blobs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vertices", type=int, default=100_000)
+    parser.add_argument("--texture", type=int, default=4096)
+    args = parser.parse_args()
+
+    data = build_soup_glb(args.vertices, args.texture)
+    for label, max_texture_size in (("geometry only", 0), ("with 2048px textures", 2048)):
+        started = time.perf_counter()
+        optimized, report = optimize_glb(data, max_texture_size=max_texture_size)
+        elapsed = time.perf_counter() - started
+        print(f"{label}: {len(data) / 1e6:.1f} MB -> {len(optimized) / 1e6:.1f} MB "
+              f"({report.get('ratio', 1)}x) in {elapsed * 1000:.0f} ms")
+        print(f"  vertices {report['vertices_before']} -> {report['vertices_after']}, "
+              f"textures {report['texture_bytes_before'] / 1e6:.1f} MB -> {report['texture_bytes_after'] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Benchmark software thumbnail rendering on a synthetic character
+
+Renders the auto_rig_bench humanoid (untextured) and the glb_optimize_bench
+soup (textured, quantized by optimize_glb) as turntables, reports the time
+per frame and the encoded sizes, and writes the thumbnails next to --out.
+
+Usage:
+    python benchmarks/glb_thumbnail_bench.py [--vertices 100000] [--size 256] [--out /tmp/thumbnail]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+from glb import GLB
+from glb_optimize import optimize_glb
+from glb_thumbnail import TURNTABLE_FRAMES, thumbnails
+from auto_rig_bench import build_humanoid_glb
+from glb_optimize_bench import build_soup_glb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vertices", type=int, default=100_000)
+    parser.add_argument("--size", type=int, default=256)
+    parser.add_argument("--out", default="/tmp/thumbnail")
+    args = parser.parse_args()
+
+    models = {
+        "humanoid": build_humanoid_glb(args.vertices),
+        "textured": optimize_glb(build_soup_glb(args.vertices, 1024))[0],
+    }
+    for name, data in models.items():
+        triangles = GLB(data).inspect()["triangle_count"]
+        started = time.perf_counter()
+        files = thumbnails(data, size=args.size)
+        elapsed = time.perf_counter() - started
+        print(f"{name}: {triangles} triangles, {elapsed * 1000:.0f} ms "
+              f"({elapsed * 1000 / TURNTABLE_FRAMES:.0f} ms/frame)")
+        for image_format, image in files.items():
+            path = f"{args.out}-{name}.{image_format}"
+            Path(path).write_bytes(image)
+            print(f"  {image_format}: {len(image) / 1e3:.1f} KB -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark the streaming SEO extractor against the previous BeautifulSoup path
+
+Usage:
+    python benchmarks/seo_extractor_bench.py [--paragraphs 20000] [--runs 5]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from seo_extractor import extract_seo
+
+
+def analyze_with_bs4(html: str):
+    """The original /api/analyze-content implementation"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    meta_data = {
+        "title": soup.find('title').text if soup.find('title') else "",
+        "description": soup.find('meta', {'name': 'description'})['content'] if soup.find('meta', {'name': 'description'}) else "",
+        "keywords": soup.find('meta', {'name': 'keywords'})['content'] if soup.find('meta', {'name': 'keywords'}) else "",
+        "h1_tags": [h1.text for h1 in soup.find_all('h1')],
+        "h2_tags": [h2.text for h2 in soup.find_all('h2')][:5]
+    }
+    return meta_data, len(soup.get_text().split())
+
+
+def build_page(paragraphs: int) -> str:
+    head = (
+        "<html><head><title>Benchmark page</title>"
+        '<meta name="description" content="A large synthetic page">'
+        '<meta name="keywords" content="bench, seo"></head><body><h1>Main heading</h1>'
+    )
+    body = []
+    for i in range(paragraphs):
+        if i % 50 == 0:
+            body.append(f"<h2>Section {i // 50}</h2>")
+        body.append(f"<p>Paragraph {i} with <a href='/p/{i}'>a link</a> and <b>some bold</b> filler text here.</p>")
+    return head + "".join(body) + "</body></html>"
+
+
+def timed(fn, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SEO extraction")
+    parser.add_argument("--paragraphs", type=int, default=20000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    html = build_page(args.paragraphs)
+    print(f"Page size: {len(html) / 1024 / 1024:.1f} MB")
+
+    bs4_meta, bs4_words = analyze_with_bs4(html)
+    ext = extract_seo(html)
+    assert ext.meta_data() == bs4_meta, "extractor disagrees with BeautifulSoup"
+    print(f"Word count: bs4={bs4_words} extractor={ext.word_count}")
+
+    results = {
+        "beautifulsoup": timed(lambda: analyze_with_bs4(html), args.runs),
+        "extractor": timed(lambda: extract_seo(html), args.runs),
+        "extractor (meta only)": timed(lambda: extract_seo(html, meta_only=True), args.runs),
+    }
+    baseline = results["beautifulsoup"]
+    for name, seconds in results.items():
+        print(f"  {name:<24} {seconds * 1000:9.1f} ms  ({baseline / seconds:6.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,20 +3,34 @@ Character Generation Pipeline with SDXL, Theme Analysis, and Rigging
 """
 from fastapi import HTTPException
 from pydantic import BaseModel
-from typing import Optional, Dict, List, Literal
-import base64
-import httpx
+from typing import Optional, Dict, List, Literal, Tuple
 import re
 from gradio_client import Client
-import tempfile
 import os
 import json
+import asyncio
+import binascii
+import httpx
+import http_pool
+import cpu_pool
+from scratch import scratch_space
+from glb import GLBError
+from auto_rig import BONE_NAMES, rig_glb
+from glb_optimize import optimize_glb
+from image_prep import MODEL_INPUT_SIZES, prepare_image
+from image_codec import sniff_mime_type, transcode_image
+from model_store import describe, store_model
+
+# Scratch reservation for one generated image download
+IMAGE_SCRATCH_BYTES = 16 * 1024 * 1024
 
 class CharacterGenerationRequest(BaseModel):
     prompt: str
     enhance_prompt: Optional[bool] = True
     generate_t_pose: Optional[bool] = True
     analyze_theme: Optional[bool] = True
+    # Encoding of the returned image (AVIF falls back to WebP where the server cannot encode it)
+    image_format: Optional[Literal["webp", "avif"]] = "webp"
 
 class RigModelRequest(BaseModel):
     glb_base64: str
@@ -213,24 +227,23 @@ async def generate_with_prodia(prompt: str) -> str:
     """Generate using Prodia's SDXL API (free tier)"""
     try:
         # Prodia offers free SDXL generation
-        client = Client("prodia/sdxl-stable-diffusion-xl")
-        result = client.predict(
-            prompt,  # prompt
-            "blurry, low quality, distorted",  # negative prompt
-            20,  # steps
-            7,  # cfg scale
-            512,  # width
-            512,  # height
-            -1,  # seed
-            api_name="/predict"
-        )
-        
-        if result and isinstance(result, str):
-            with open(result, "rb") as f:
-                img_bytes = f.read()
-            if os.path.exists(result):
-                os.unlink(result)
-            return base64.b64encode(img_bytes).decode('utf-8')
+        async with scratch_space.directory(IMAGE_SCRATCH_BYTES) as scratch:
+            client = Client("prodia/sdxl-stable-diffusion-xl", download_files=str(scratch))
+            result = client.predict(
+                prompt,  # prompt
+                "blurry, low quality, distorted",  # negative prompt
+                20,  # steps
+                7,  # cfg scale
+                512,  # width
+                512,  # height
+                -1,  # seed
+                api_name="/predict"
+            )
+            
+            if result and isinstance(result, str):
+                with open(result, "rb") as f:
+                    img_bytes = f.read()
+                return await cpu_pool.encode_base64(img_bytes)
     except:
         raise
 
@@ -238,22 +251,21 @@ async def generate_with_stable_diffusion_xl(prompt: str) -> str:
     """Try alternative SDXL spaces"""
     try:
         # Try alternative SDXL space
-        client = Client("hysts/SDXL")
-        result = client.predict(
-            prompt,
-            "blurry, low quality",
-            7.5,  # guidance
-            25,  # steps
-            api_name="/run"
-        )
-        
-        if result and len(result) > 0:
-            img_path = result[0] if isinstance(result, tuple) else result
-            with open(img_path, "rb") as f:
-                img_bytes = f.read()
-            if os.path.exists(img_path):
-                os.unlink(img_path)
-            return base64.b64encode(img_bytes).decode('utf-8')
+        async with scratch_space.directory(IMAGE_SCRATCH_BYTES) as scratch:
+            client = Client("hysts/SDXL", download_files=str(scratch))
+            result = client.predict(
+                prompt,
+                "blurry, low quality",
+                7.5,  # guidance
+                25,  # steps
+                api_name="/run"
+            )
+            
+            if result and len(result) > 0:
+                img_path = result[0] if isinstance(result, tuple) else result
+                with open(img_path, "rb") as f:
+                    img_bytes = f.read()
+                return await cpu_pool.encode_base64(img_bytes)
     except:
         raise
 
@@ -262,173 +274,212 @@ async def generate_with_pollinations(prompt: str) -> str:
     import urllib.parse
     encoded_prompt = urllib.parse.quote(prompt)
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # Try with different model parameters
-        urls_to_try = [
-            f"https://image.pollinations.ai/prompt/{encoded_prompt}?width=512&height=512&model=flux&nologo=true",
-            f"https://image.pollinations.ai/prompt/{encoded_prompt}?width=512&height=512&nologo=true",
-            f"https://pollinations.ai/p/{encoded_prompt}?width=512&height=512"
-        ]
-        
-        for url in urls_to_try:
-            try:
-                response = await client.get(url)
-                if response.status_code == 200 and response.content:
-                    return base64.b64encode(response.content).decode('utf-8')
-            except:
-                continue
+    client = http_pool.get_client("pollinations")
+    # Try with different model parameters
+    urls_to_try = [
+        f"https://image.pollinations.ai/prompt/{encoded_prompt}?width=512&height=512&model=flux&nologo=true",
+        f"https://image.pollinations.ai/prompt/{encoded_prompt}?width=512&height=512&nologo=true",
+        f"https://pollinations.ai/p/{encoded_prompt}?width=512&height=512"
+    ]
+    
+    for url in urls_to_try:
+        try:
+            response = await client.get(url)
+            if response.status_code == 200 and response.content:
+                return await cpu_pool.encode_base64(response.content)
+        except:
+            continue
     
     raise Exception("Pollinations generation failed")
 
 async def generate_with_playground(prompt: str) -> str:
     """Try Playground v2 model"""
     try:
-        client = Client("playgroundai/playground-v2.5-1024px-aesthetic")
-        result = client.predict(
-            prompt,
-            "ugly, blurry, low quality",
-            True,  # randomize seed
-            512,  # width
-            512,  # height
-            3,  # guidance scale
-            api_name="/predict"
-        )
-        
-        if result:
-            img_path = result[0] if isinstance(result, tuple) else result
-            with open(img_path, "rb") as f:
-                img_bytes = f.read()
-            if os.path.exists(img_path):
-                os.unlink(img_path)
-            return base64.b64encode(img_bytes).decode('utf-8')
+        async with scratch_space.directory(IMAGE_SCRATCH_BYTES) as scratch:
+            client = Client("playgroundai/playground-v2.5-1024px-aesthetic", download_files=str(scratch))
+            result = client.predict(
+                prompt,
+                "ugly, blurry, low quality",
+                True,  # randomize seed
+                512,  # width
+                512,  # height
+                3,  # guidance scale
+                api_name="/predict"
+            )
+            
+            if result:
+                img_path = result[0] if isinstance(result, tuple) else result
+                with open(img_path, "rb") as f:
+                    img_bytes = f.read()
+                return await cpu_pool.encode_base64(img_bytes)
     except:
         raise
 
+async def encode_generated_image(image_base64: str, image_format: str = "webp") -> Dict:
+    """Re-encode a generated image and its preview compactly; on failure it is returned as generated"""
+    try:
+        return await cpu_pool.run(transcode_image, await cpu_pool.decode_base64(image_base64), image_format)
+    except Exception as e:
+        # Providers differ (Pollinations returns JPEG), so label the untouched image by its own header
+        try:
+            mime_type = sniff_mime_type(await cpu_pool.decode_base64(image_base64))
+        except ValueError:
+            mime_type = "image/png"
+        return {"image_base64": image_base64, "mime_type": mime_type, "preview_base64": image_base64,
+                "preview_mime_type": mime_type, "report": {"error": str(e)}}
+
+async def prepare_model_input(image_bytes: bytes, model: str) -> Tuple[bytes, Dict]:
+    """Crop and shrink an image to what an image-to-3D model consumes; on failure the original is sent"""
+    try:
+        return await asyncio.to_thread(prepare_image, image_bytes, MODEL_INPUT_SIZES[model])
+    except Exception as e:
+        return image_bytes, {"error": str(e), "transparent": False, "bytes_before": len(image_bytes),
+                             "bytes_after": len(image_bytes), "format": "png"}
+
+async def optimize_model(glb_bytes: bytes) -> Tuple[bytes, Dict]:
+    """Weld, reorder and quantize a generated GLB; on failure the original is kept"""
+    try:
+        return await asyncio.to_thread(optimize_glb, glb_bytes)
+    except Exception as e:
+        return glb_bytes, {"error": str(e), "bytes_before": len(glb_bytes), "bytes_after": len(glb_bytes)}
+
+async def store_model_lods(source: bytes, optimized: bytes) -> Dict:
+    """Store a generated model with its LOD chain and return the client manifest"""
+    try:
+        return describe(await asyncio.to_thread(store_model, source, optimized))
+    except Exception as e:
+        return {"error": str(e), "levels": []}
+
 async def convert_to_3d_hunyuan(image_base64: str) -> Dict:
     """Convert image to 3D using Hunyuan3D or similar free service"""
     try:
-        # Try Hunyuan3D-1 space
-        client = Client("Tencent/Hunyuan3D-1")
-        
-        # Save image temporarily
-        img_bytes = base64.b64decode(image_base64)
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            tmp.write(img_bytes)
-            tmp_path = tmp.name
-        
-        # Generate 3D model
-        result = client.predict(
-            tmp_path,  # input image
-            30,  # number of steps
-            3,  # seed
-            "std",  # guidance type
-            api_name="/image_to_3d"
-        )
-        
-        # Clean up temp file
-        os.unlink(tmp_path)
+        image_bytes = await cpu_pool.decode_base64(image_base64, validate=True)
+    except binascii.Error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid base64 image: {e}")
+    
+    try:
+        img_bytes, preprocessing = await prepare_model_input(image_bytes, "hunyuan3d")
         
-        # Result should contain paths to generated files
-        if result and len(result) > 0:
-            # Find the GLB file
-            glb_path = None
-            for item in result:
-                if isinstance(item, str) and item.endswith('.glb'):
-                    glb_path = item
-                    break
+        # The input image and everything the Space returns are removed with the scratch directory
+        glb_bytes = None
+        async with scratch_space.directory() as scratch:
+            # Try Hunyuan3D-1 space
+            client = Client("Tencent/Hunyuan3D-1", download_files=str(scratch))
+            
+            img_path = scratch / f"input.{preprocessing['format']}"
+            img_path.write_bytes(img_bytes)
+            
+            # Generate 3D model
+            result = client.predict(
+                str(img_path),  # input image
+                30,  # number of steps
+                3,  # seed
+                "std",  # guidance type
+                api_name="/image_to_3d"
+            )
             
-            if glb_path and os.path.exists(glb_path):
-                with open(glb_path, "rb") as f:
-                    glb_bytes = f.read()
-                glb_base64 = base64.b64encode(glb_bytes).decode('utf-8')
+            # Result should contain paths to generated files
+            if result and len(result) > 0:
+                # Find the GLB file
+                glb_path = None
+                for item in result:
+                    if isinstance(item, str) and item.endswith('.glb'):
+                        glb_path = item
+                        break
                 
-                return {
-                    "success": True,
-                    "glb_base64": glb_base64,
-                    "method": "hunyuan3d"
-                }
+                if glb_path and os.path.exists(glb_path):
+                    with open(glb_path, "rb") as f:
+                        glb_bytes = f.read()
+        
+        if glb_bytes:
+            optimized, optimization = await optimize_model(glb_bytes)
+            lods = await store_model_lods(glb_bytes, optimized)
+            glb_base64 = await cpu_pool.encode_base64(optimized)
+            
+            return {
+                "success": True,
+                "glb_base64": glb_base64,
+                "method": "hunyuan3d",
+                "preprocessing": preprocessing,
+                "optimization": optimization,
+                "lods": lods
+            }
         
         raise Exception("Hunyuan3D generation failed")
         
     except Exception as e:
         # Fallback to TripoSR (already implemented)
         try:
-            client = Client("stabilityai/TripoSR")
-            
-            img_bytes = base64.b64decode(image_base64)
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                tmp.write(img_bytes)
-                tmp_path = tmp.name
-            
-            result = client.predict(
-                tmp_path,
-                True,  # remove background
-                0.5,  # foreground ratio
-                api_name="/run"
-            )
+            img_bytes, preprocessing = await prepare_model_input(image_bytes, "triposr")
             
-            os.unlink(tmp_path)
+            glb_bytes = None
+            async with scratch_space.directory() as scratch:
+                client = Client("stabilityai/TripoSR", download_files=str(scratch))
+                
+                img_path = scratch / f"input.{preprocessing['format']}"
+                img_path.write_bytes(img_bytes)
+                
+                result = client.predict(
+                    str(img_path),
+                    not preprocessing["transparent"],  # remove background unless already cut out
+                    0.5,  # foreground ratio
+                    api_name="/run"
+                )
+                
+                if result and len(result) > 1:
+                    with open(result[1], "rb") as f:
+                        glb_bytes = f.read()
             
-            if result and len(result) > 1:
-                glb_path = result[1]
-                with open(glb_path, "rb") as f:
-                    glb_bytes = f.read()
-                glb_base64 = base64.b64encode(glb_bytes).decode('utf-8')
+            if glb_bytes:
+                optimized, optimization = await optimize_model(glb_bytes)
+                lods = await store_model_lods(glb_bytes, optimized)
+                glb_base64 = await cpu_pool.encode_base64(optimized)
                 
                 return {
                     "success": True,
                     "glb_base64": glb_base64,
-                    "method": "triposr_fallback"
+                    "method": "triposr_fallback",
+                    "preprocessing": preprocessing,
+                    "optimization": optimization,
+                    "lods": lods
                 }
-        except:
-            pass
+            fallback_error = "no GLB returned"
+        # Service and file errors only (gradio_client's are ValueErrors); anything else is a bug and propagates
+        except (OSError, ValueError, httpx.HTTPError) as fallback_exc:
+            fallback_error = str(fallback_exc)
         
-        raise HTTPException(status_code=500, detail=f"3D conversion failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"3D conversion failed: {str(e)} (TripoSR fallback: {fallback_error})")
 
 async def auto_rig_model(glb_base64: str, method: str = "auto") -> Dict:
-    """Auto-rig a 3D model using Mixamo or procedural rigging"""
+    """Auto-rig a 3D model with the procedural rigger, or prepare it for Mixamo"""
     try:
-        # For now, we'll implement a basic procedural rigging approach
-        # In production, you'd integrate with Mixamo API or use Blender Python
-        
-        # Decode GLB
-        glb_bytes = base64.b64decode(glb_base64)
-        
-        # Save temporarily
-        with tempfile.NamedTemporaryFile(suffix=".glb", delete=False) as tmp:
-            tmp.write(glb_bytes)
-            input_path = tmp.name
-        
-        # Here you would normally:
-        # 1. Upload to Mixamo via their API (requires authentication)
-        # 2. Or use Blender Python API for procedural rigging
-        # 3. Or use a rigging service API
-        
-        # For demonstration, we'll add basic metadata indicating rigging is needed
-        rigging_metadata = {
-            "rigged": False,
-            "method_requested": method,
-            "bones_needed": [
-                "root", "spine", "chest", "neck", "head",
-                "shoulder_l", "arm_l", "forearm_l", "hand_l",
-                "shoulder_r", "arm_r", "forearm_r", "hand_r",
-                "thigh_l", "shin_l", "foot_l",
-                "thigh_r", "shin_r", "foot_r"
-            ],
-            "message": "Model prepared for rigging. Use Mixamo or Blender for actual rigging."
-        }
-        
-        # Clean up
-        os.unlink(input_path)
-        
-        # Return the original model with rigging metadata
+        if method == "mixamo":
+            # Mixamo has no public API; the user uploads the model themselves
+            return {
+                "success": True,
+                "glb_base64": glb_base64,
+                "rigging_metadata": {
+                    "rigged": False,
+                    "method_requested": method,
+                    "bones_needed": BONE_NAMES,
+                    "message": "Model prepared for rigging. Upload to Mixamo.com for free auto-rigging."
+                },
+                "message": "Model ready for rigging. Upload to Mixamo.com for free auto-rigging."
+            }
+
+        glb_bytes = await cpu_pool.decode_base64(glb_base64)
+        # Skin weights are NumPy-bound; keep them off the event loop
+        rigged_bytes, rigging_metadata = await asyncio.to_thread(rig_glb, glb_bytes)
+        rigging_metadata["method_requested"] = method
         return {
             "success": True,
-            "glb_base64": glb_base64,
+            "glb_base64": await cpu_pool.encode_base64(rigged_bytes),
             "rigging_metadata": rigging_metadata,
-            "message": "Model ready for rigging. Upload to Mixamo.com for free auto-rigging."
+            "message": f"Model rigged with {len(BONE_NAMES)} bones"
         }
-        
+
+    except GLBError as e:
+        raise HTTPException(status_code=400, detail=f"Rigging failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Rigging failed: {str(e)}")
 
@@ -442,11 +493,20 @@ async def full_character_pipeline(prompt: str) -> Dict:
         # Step 2: Generate image with SDXL
         image_result = await generate_image_sdxl(prompt, enhance=True, t_pose=True)
         
-        # Step 3: Convert to 3D
-        model_result = await convert_to_3d_hunyuan(image_result["image_base64"])
+        # Step 3: Convert to 3D (from the image as generated) while the response copy is re-encoded
+        model_result, encoded_image = await asyncio.gather(
+            convert_to_3d_hunyuan(image_result["image_base64"]),
+            encode_generated_image(image_result["image_base64"])
+        )
         
-        # Step 4: Prepare for rigging
-        rig_result = await auto_rig_model(model_result["glb_base64"])
+        # Step 4: Rig; a model that can't be rigged is still worth returning
+        try:
+            rig_result = await auto_rig_model(model_result["glb_base64"])
+            glb_base64 = rig_result["glb_base64"]
+            rigging = rig_result["rigging_metadata"]
+        except HTTPException as e:
+            glb_base64 = model_result["glb_base64"]
+            rigging = {"rigged": False, "error": e.detail}
         
         return {
             "success": True,
@@ -456,14 +516,21 @@ async def full_character_pipeline(prompt: str) -> Dict:
                 "suggested_enhancements": theme_analysis.suggested_enhancements
             },
             "image": {
-                "base64": image_result["image_base64"],
+                "base64": encoded_image["image_base64"],
+                "mime_type": encoded_image["mime_type"],
+                "preview_base64": encoded_image["preview_base64"],
+                "preview_mime_type": encoded_image["preview_mime_type"],
+                "encoding": encoded_image["report"],
                 "enhanced_prompt": image_result["enhanced_prompt"]
             },
             "model": {
-                "glb_base64": model_result["glb_base64"],
-                "method": model_result.get("method", "unknown")
+                "glb_base64": glb_base64,
+                "method": model_result.get("method", "unknown"),
+                "preprocessing": model_result.get("preprocessing"),
+                "optimization": model_result.get("optimization"),
+                "lods": model_result.get("lods")
             },
-            "rigging": rig_result["rigging_metadata"],
+            "rigging": rigging,
             "message": "Character pipeline completed successfully"
         }
         
@@ -0,0 +1,117 @@
+"""
+Shared process pool for CPU-bound work
+
+Image encoding and similar work holds the GIL for long stretches, so
+asyncio.to_thread would still starve the event loop under load. run() sends
+a picklable function and its arguments to a worker process instead.
+
+offload() does the same only for payloads of at least min_bytes; smaller ones
+run inline, where they cost less than the round trip (arguments and results
+are pickled across). encode_base64()/decode_base64() use it for the
+multi-MB GLBs and images returned inside JSON.
+
+The pool starts on first use with the "spawn" start method, because forking
+a process that is running an event loop and HTTP clients is not safe. It is
+shut down with the app. stats() reports calls and time per function, split
+into inline and offloaded work.
+"""
+import os
+import time
+import base64
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Smallest payload offload() sends to a worker by default. Below ~4 MB, pickling a base64
+# payload to and from the worker blocks the loop about as long as encoding it inline
+CPU_OFFLOAD_MIN_BYTES = int(os.getenv("CPU_OFFLOAD_MIN_BYTES", str(4 * 1024 * 1024)))
+
+_executor: Optional[ProcessPoolExecutor] = None
+# Function name -> call counts, seconds and bytes, inline and offloaded
+_metrics: Dict[str, Dict[str, float]] = {}
+
+
+def get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def _record(func: Callable, where: str, seconds: float, size: Optional[int]):
+    metrics = _metrics.setdefault(func.__qualname__, {
+        "inline_calls": 0, "inline_seconds": 0.0, "inline_bytes": 0,
+        "offloaded_calls": 0, "offloaded_seconds": 0.0, "offloaded_bytes": 0,
+    })
+    metrics[f"{where}_calls"] += 1
+    metrics[f"{where}_seconds"] += seconds
+    metrics[f"{where}_bytes"] += size or 0
+
+
+async def run(func: Callable, *args, size: Optional[int] = None) -> Any:
+    """Run func(*args) in a worker process; if a worker died the pool is replaced and the call retried once"""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        try:
+            return await loop.run_in_executor(get_executor(), func, *args)
+        except BrokenProcessPool:
+            shutdown()
+            return await loop.run_in_executor(get_executor(), func, *args)
+    finally:
+        _record(func, "offloaded", time.perf_counter() - started, size)
+
+
+async def offload(func: Callable, size: int, *args, min_bytes: int = CPU_OFFLOAD_MIN_BYTES) -> Any:
+    """
+    Run func(*args) in a worker process if the payload is large, inline otherwise
+
+    Args:
+        func: Module-level (picklable) function
+        size: Payload size in bytes (or characters)
+        min_bytes: Smallest size worth the round trip to a worker
+    """
+    if size >= min_bytes:
+        return await run(func, *args, size=size)
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        _record(func, "inline", time.perf_counter() - started, size)
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+async def encode_base64(data: bytes) -> str:
+    return await offload(_b64encode, len(data), data)
+
+
+def _b64decode(text: str, validate: bool) -> bytes:
+    return base64.b64decode(text, validate=validate)
+
+
+async def decode_base64(text: str, validate: bool = False) -> bytes:
+    return await offload(_b64decode, len(text), text, validate)
+
+
+def stats() -> Dict:
+    return {
+        "workers": CPU_POOL_WORKERS,
+        "running": _executor is not None,
+        "offload_min_bytes": CPU_OFFLOAD_MIN_BYTES,
+        "functions": {name: {key: round(value, 4) if isinstance(value, float) else value
+                             for key, value in metrics.items()}
+                      for name, metrics in _metrics.items()},
+    }
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
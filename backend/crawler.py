@@ -0,0 +1,174 @@
+"""
+Concurrent SEO crawler for bulk content analysis
+
+Fetches many URLs (or every URL in a sitemap) concurrently while staying
+polite to each host: a per-host concurrency limit, cached robots.txt
+rules (including Crawl-delay) and a global cap on in-flight requests.
+Results are yielded as soon as each page finishes.
+"""
+import os
+import time
+import asyncio
+import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+from typing import AsyncIterator, Dict, List, Optional
+from fastapi import HTTPException
+import http_pool
+import cpu_pool
+from page_fetcher import fetch_page, PAGE_HEADERS
+from seo_extractor import summarize_seo
+
+CRAWLER_USER_AGENT = os.getenv("CRAWLER_USER_AGENT", "SilentTrendFarmBot")
+CRAWL_MAX_URLS = int(os.getenv("CRAWL_MAX_URLS", "1000"))
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "20"))
+ROBOTS_CACHE_TTL = int(os.getenv("ROBOTS_CACHE_TTL", "3600"))
+# Nested sitemap indexes are followed up to this many files
+SITEMAP_MAX_FILES = 20
+# robots.txt content past this size is ignored, as Google does
+ROBOTS_MAX_BYTES = 500 * 1024
+# Parsing costs ~0.4 ms per KB of HTML, so pages from this size up are parsed in a worker process
+HTML_OFFLOAD_MIN_BYTES = 64 * 1024
+
+SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+
+async def analyze_url(url: str, extract_meta: bool = True, meta_only: bool = False, max_h2: int = 5,
+                      user_agent: Optional[str] = None) -> Dict:
+    """Fetch and analyze one page (shared by the single and bulk endpoints)"""
+    page = await fetch_page(url, user_agent=user_agent)
+    summary = await cpu_pool.offload(summarize_seo, len(page.text), page.text, max_h2, meta_only, extract_meta,
+                                     min_bytes=HTML_OFFLOAD_MIN_BYTES)
+    return {"url": url, **summary, "cache": page.cache}
+
+
+class RobotsCache:
+    """robots.txt rules per origin, fetched once and reused for ROBOTS_CACHE_TTL seconds"""
+
+    def __init__(self, ttl: int = ROBOTS_CACHE_TTL):
+        self.ttl = ttl
+        self._rules: Dict[str, tuple] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get(self, origin: str) -> RobotFileParser:
+        cached = self._rules.get(origin)
+        if cached and time.time() - cached[1] < self.ttl:
+            return cached[0]
+        # One fetch per origin even when many URLs for it arrive at once
+        lock = self._locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            cached = self._rules.get(origin)
+            if cached and time.time() - cached[1] < self.ttl:
+                return cached[0]
+            rules = await self._fetch(origin)
+            self._rules[origin] = (rules, time.time())
+            return rules
+
+    async def _fetch(self, origin: str) -> RobotFileParser:
+        rules = RobotFileParser(f"{origin}/robots.txt")
+        headers = dict(PAGE_HEADERS, **{"User-Agent": CRAWLER_USER_AGENT})
+        try:
+            async with http_pool.get_client("pages").stream("GET", f"{origin}/robots.txt", headers=headers) as response:
+                if response.status_code in (401, 403):
+                    rules.disallow_all = True
+                    return rules
+                if response.status_code >= 400:
+                    rules.allow_all = True
+                    return rules
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) >= ROBOTS_MAX_BYTES:
+                        break
+        except Exception:
+            # Unreachable robots.txt: treat as no restrictions
+            rules.parse([])
+            return rules
+        lines = body[:ROBOTS_MAX_BYTES].decode("utf-8", errors="replace").splitlines()
+        if len(body) >= ROBOTS_MAX_BYTES and lines:
+            # The last line was cut off mid-rule
+            lines.pop()
+        rules.parse(lines)
+        return rules
+
+
+robots_cache = RobotsCache()
+
+
+class _HostState:
+    def __init__(self, limit: int):
+        self.semaphore = asyncio.Semaphore(limit)
+        self.lock = asyncio.Lock()
+        self.last_request = 0.0
+
+
+async def load_sitemap(sitemap_url: str, limit: int = CRAWL_MAX_URLS) -> List[str]:
+    """Return page URLs from a sitemap.xml, following sitemap indexes"""
+    urls: List[str] = []
+    pending = [sitemap_url]
+    seen = set()
+    while pending and len(seen) < SITEMAP_MAX_FILES and len(urls) < limit:
+        current = pending.pop(0)
+        if current in seen:
+            continue
+        seen.add(current)
+        page = await fetch_page(current, user_agent=CRAWLER_USER_AGENT)
+        try:
+            root = ET.fromstring(page.text)
+        except ET.ParseError:
+            raise HTTPException(status_code=400, detail=f"Invalid sitemap: {current}")
+        if root.tag == f"{SITEMAP_NS}sitemapindex":
+            pending.extend(loc.text.strip() for loc in root.iter(f"{SITEMAP_NS}loc") if loc.text)
+        else:
+            urls.extend(loc.text.strip() for loc in root.iter(f"{SITEMAP_NS}loc") if loc.text)
+    return list(dict.fromkeys(urls))[:limit]
+
+
+async def crawl(urls: List[str], per_host_concurrency: int = 2, concurrency: int = CRAWL_CONCURRENCY,
+                respect_robots: bool = True, extract_meta: bool = True, meta_only: bool = False,
+                max_h2: int = 5) -> AsyncIterator[Dict]:
+    """Analyze many URLs concurrently and yield each result as soon as it is ready"""
+    global_limit = asyncio.Semaphore(concurrency)
+    hosts: Dict[str, _HostState] = {}
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def crawl_one(url: str):
+        started = time.perf_counter()
+        try:
+            parts = urlsplit(url)
+            if parts.scheme not in ("http", "https") or not parts.netloc:
+                raise HTTPException(status_code=400, detail="Only absolute http(s) URLs are supported")
+            origin = f"{parts.scheme}://{parts.netloc}"
+            crawl_delay: Optional[float] = None
+            if respect_robots:
+                rules = await robots_cache.get(origin)
+                if not rules.can_fetch(CRAWLER_USER_AGENT, url):
+                    raise HTTPException(status_code=403, detail="Disallowed by robots.txt")
+                crawl_delay = rules.crawl_delay(CRAWLER_USER_AGENT)
+
+            host = hosts.setdefault(parts.netloc, _HostState(per_host_concurrency))
+            async with host.semaphore:
+                if crawl_delay:
+                    # Space out request starts for hosts that ask for it
+                    async with host.lock:
+                        wait = host.last_request + float(crawl_delay) - time.monotonic()
+                        if wait > 0:
+                            await asyncio.sleep(wait)
+                        host.last_request = time.monotonic()
+                async with global_limit:
+                    # Fetch as the agent robots.txt was checked for
+                    result = await analyze_url(url, extract_meta, meta_only, max_h2, user_agent=CRAWLER_USER_AGENT)
+        except HTTPException as e:
+            result = {"url": url, "error": e.detail, "status_code": e.status_code}
+        except Exception as e:
+            result = {"url": url, "error": str(e), "status_code": 500}
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        await results.put(result)
+
+    tasks = [asyncio.create_task(crawl_one(url)) for url in urls]
+    try:
+        for _ in tasks:
+            yield await results.get()
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,471 @@
+"""
+Zero-copy reader for binary glTF (GLB) files
+
+The GLB container is parsed in place: the BIN chunk stays a memoryview of
+the input (bytes, bytearray or an mmap of the file) and accessors come back
+as read-only NumPy views into it, so inspecting a large model costs a JSON
+parse plus a few reductions. Only sparse accessors and data: URIs are
+materialised.
+"""
+import io
+import os
+import json
+import mmap
+import base64
+import struct
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+GLB_MAGIC = b"glTF"
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+COMPONENT_DTYPES = {
+    5120: np.dtype("<i1"),
+    5121: np.dtype("<u1"),
+    5122: np.dtype("<i2"),
+    5123: np.dtype("<u2"),
+    5125: np.dtype("<u4"),
+    5126: np.dtype("<f4"),
+}
+TYPE_SIZES = {"SCALAR": 1, "VEC2": 2, "VEC3": 3, "VEC4": 4, "MAT2": 4, "MAT3": 9, "MAT4": 16}
+
+COMPONENT_TYPES = {dtype: component_type for component_type, dtype in COMPONENT_DTYPES.items()}
+ACCESSOR_TYPES = {1: "SCALAR", 2: "VEC2", 3: "VEC3", 4: "VEC4"}
+
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+MODE_TRIANGLES = 4
+MODE_TRIANGLE_STRIP = 5
+MODE_TRIANGLE_FAN = 6
+
+
+class GLBError(ValueError):
+    """Raised for data that is not a valid GLB file"""
+
+
+class GLB:
+    """A parsed GLB file; accessors and images are views into the original buffer"""
+
+    def __init__(self, data):
+        view = memoryview(data)
+        if view.ndim != 1 or view.itemsize != 1:
+            view = view.cast("B")
+        if len(view) < 12:
+            raise GLBError("File too small for a GLB header")
+        magic, version, length = struct.unpack_from("<4sII", view, 0)
+        if magic != GLB_MAGIC:
+            raise GLBError("Not a GLB file (bad magic)")
+        if version != 2:
+            raise GLBError(f"Unsupported glTF container version {version}")
+        if length > len(view):
+            raise GLBError(f"Truncated GLB: header says {length} bytes, got {len(view)}")
+
+        self.data = view[:length]
+        self.byte_length = length
+        self.json_bytes = 0
+        self.bin: Optional[memoryview] = None
+        self.json: Dict = {}
+
+        offset = 12
+        while offset + 8 <= length:
+            chunk_length, chunk_type = struct.unpack_from("<II", view, offset)
+            start = offset + 8
+            if start + chunk_length > length:
+                raise GLBError("Chunk runs past the end of the file")
+            if chunk_type == CHUNK_JSON and not self.json:
+                try:
+                    self.json = json.loads(bytes(view[start:start + chunk_length]))
+                except ValueError as e:
+                    raise GLBError(f"Invalid JSON chunk: {e}")
+                self.json_bytes = chunk_length
+            elif chunk_type == CHUNK_BIN and self.bin is None:
+                self.bin = view[start:start + chunk_length]
+            offset = start + chunk_length + (-chunk_length % 4)
+        if not self.json:
+            raise GLBError("GLB has no JSON chunk")
+        if not isinstance(self.json, dict):
+            raise GLBError("JSON chunk is not an object")
+        self._buffers: Dict[int, memoryview] = {}
+
+    def release(self):
+        """Drop references into the source buffer so an mmap behind it can be closed"""
+        self._buffers.clear()
+        self.bin = None
+        self.data = None
+
+    def buffer(self, index: int) -> memoryview:
+        cached = self._buffers.get(index)
+        if cached is not None:
+            return cached
+        try:
+            spec = self.json["buffers"][index]
+        except (KeyError, IndexError):
+            raise GLBError(f"Buffer {index} does not exist")
+        uri = spec.get("uri")
+        if uri is None:
+            if index != 0 or self.bin is None:
+                raise GLBError(f"Buffer {index} has no data")
+            buf = self.bin
+        elif uri.startswith("data:"):
+            buf = memoryview(base64.b64decode(uri.split(",", 1)[1]))
+        else:
+            raise GLBError(f"External buffer URIs are not supported ({uri})")
+        self._buffers[index] = buf
+        return buf
+
+    def buffer_view(self, index: int) -> memoryview:
+        try:
+            spec = self.json["bufferViews"][index]
+        except (KeyError, IndexError):
+            raise GLBError(f"bufferView {index} does not exist")
+        buf = self.buffer(spec.get("buffer", 0))
+        start = spec.get("byteOffset", 0)
+        end = start + spec["byteLength"]
+        if end > len(buf):
+            raise GLBError(f"bufferView {index} runs past the end of its buffer")
+        return buf[start:end]
+
+    def accessor(self, index: int) -> np.ndarray:
+        """Accessor data as an array of shape (count,) or (count, components), without copying"""
+        try:
+            spec = self.json["accessors"][index]
+            dtype = COMPONENT_DTYPES[spec["componentType"]]
+            components = TYPE_SIZES[spec["type"]]
+        except (KeyError, IndexError):
+            raise GLBError(f"Accessor {index} is missing or invalid")
+        count = spec["count"]
+        shape = (count,) if components == 1 else (count, components)
+
+        if "bufferView" in spec:
+            view_spec = self.json["bufferViews"][spec["bufferView"]]
+            view = self.buffer_view(spec["bufferView"])
+            stride = view_spec.get("byteStride") or dtype.itemsize * components
+            strides = (stride,) if components == 1 else (stride, dtype.itemsize)
+            try:
+                array = np.ndarray(shape, dtype=dtype, buffer=view, offset=spec.get("byteOffset", 0), strides=strides)
+            except (TypeError, ValueError):
+                raise GLBError(f"Accessor {index} runs past the end of its bufferView")
+            array.flags.writeable = False
+        else:
+            array = np.zeros(shape, dtype=dtype)
+
+        sparse = spec.get("sparse")
+        if sparse:
+            array = np.array(array)
+            indices_dtype = COMPONENT_DTYPES[sparse["indices"]["componentType"]]
+            indices = np.frombuffer(self.buffer_view(sparse["indices"]["bufferView"]), dtype=indices_dtype,
+                                    count=sparse["count"], offset=sparse["indices"].get("byteOffset", 0))
+            values = np.frombuffer(self.buffer_view(sparse["values"]["bufferView"]), dtype=dtype,
+                                   count=sparse["count"] * components, offset=sparse["values"].get("byteOffset", 0))
+            array[indices] = values.reshape((-1,) + shape[1:])
+        return array
+
+    def image(self, index: int) -> Tuple[memoryview, Optional[str]]:
+        """Encoded image bytes and MIME type"""
+        try:
+            spec = self.json["images"][index]
+        except (KeyError, IndexError, TypeError):
+            raise GLBError(f"Image {index} does not exist")
+        if "bufferView" in spec:
+            return self.buffer_view(spec["bufferView"]), spec.get("mimeType")
+        uri = spec.get("uri", "")
+        if uri.startswith("data:"):
+            header, payload = uri.split(",", 1)
+            return memoryview(base64.b64decode(payload)), header[5:].split(";")[0] or None
+        raise GLBError(f"External image URIs are not supported ({uri})")
+
+    def primitives(self) -> Iterator[Tuple[int, Dict]]:
+        for mesh_index, mesh in enumerate(self.json.get("meshes", [])):
+            for primitive in mesh.get("primitives", []):
+                yield mesh_index, primitive
+
+    def inspect(self) -> Dict:
+        """Summary of geometry, materials and textures"""
+        try:
+            return self._inspect()
+        except GLBError:
+            raise
+        # Dangling indices, missing required fields or wrongly typed values in the JSON chunk
+        except (KeyError, IndexError, TypeError, AttributeError, ValueError) as e:
+            raise GLBError(f"Malformed glTF JSON ({type(e).__name__}: {e})")
+
+    def _inspect(self) -> Dict:
+        meshes = []
+        vertex_total = 0
+        triangle_total = 0
+        bounds_min = np.full(3, np.inf)
+        bounds_max = np.full(3, -np.inf)
+
+        for mesh in self.json.get("meshes", []):
+            primitives = []
+            for primitive in mesh.get("primitives", []):
+                attributes = primitive.get("attributes", {})
+                mode = primitive.get("mode", MODE_TRIANGLES)
+                vertices = 0
+                if "POSITION" in attributes:
+                    position_spec = self.json["accessors"][attributes["POSITION"]]
+                    vertices = position_spec["count"]
+                    # An empty primitive has no bounds (and nothing to take a min/max of)
+                    if vertices:
+                        if "min" in position_spec and "max" in position_spec:
+                            low, high = position_spec["min"], position_spec["max"]
+                        else:
+                            positions = self.accessor(attributes["POSITION"])
+                            low, high = positions.min(axis=0), positions.max(axis=0)
+                        bounds_min = np.minimum(bounds_min, low)
+                        bounds_max = np.maximum(bounds_max, high)
+                elements = self.json["accessors"][primitive["indices"]]["count"] if "indices" in primitive else vertices
+                if mode == MODE_TRIANGLES:
+                    triangles = elements // 3
+                elif mode in (MODE_TRIANGLE_STRIP, MODE_TRIANGLE_FAN):
+                    triangles = max(elements - 2, 0)
+                else:
+                    triangles = 0
+                vertex_total += vertices
+                triangle_total += triangles
+                primitives.append({
+                    "mode": mode,
+                    "vertices": vertices,
+                    "triangles": triangles,
+                    "attributes": sorted(attributes),
+                    "material": primitive.get("material"),
+                })
+            meshes.append({"name": mesh.get("name"), "primitives": primitives})
+
+        bounds = None
+        if np.isfinite(bounds_min).all():
+            bounds = {
+                "min": [round(float(v), 6) for v in bounds_min],
+                "max": [round(float(v), 6) for v in bounds_max],
+                "size": [round(float(v), 6) for v in bounds_max - bounds_min],
+            }
+
+        textures = []
+        for index, texture in enumerate(self.json.get("textures", [])):
+            source = texture.get("source")
+            for extension in texture.get("extensions", {}).values():
+                if source is None and isinstance(extension, dict):
+                    source = extension.get("source")
+            entry = {"index": index, "image": source}
+            if source is not None:
+                try:
+                    data, mime_type = self.image(source)
+                except GLBError as e:
+                    entry["error"] = str(e)
+                else:
+                    size = image_size(data)
+                    entry.update({
+                        "mime_type": mime_type,
+                        "bytes": len(data),
+                        "width": size[0] if size else None,
+                        "height": size[1] if size else None,
+                    })
+            textures.append(entry)
+
+        materials = []
+        for material in self.json.get("materials", []):
+            pbr = material.get("pbrMetallicRoughness", {})
+            materials.append({
+                "name": material.get("name"),
+                "base_color_factor": pbr.get("baseColorFactor", [1, 1, 1, 1]),
+                "base_color_texture": pbr.get("baseColorTexture", {}).get("index"),
+                "metallic_roughness_texture": pbr.get("metallicRoughnessTexture", {}).get("index"),
+                "normal_texture": material.get("normalTexture", {}).get("index"),
+                "alpha_mode": material.get("alphaMode", "OPAQUE"),
+                "double_sided": material.get("doubleSided", False),
+            })
+
+        asset = self.json.get("asset", {})
+        return {
+            "generator": asset.get("generator"),
+            "gltf_version": asset.get("version"),
+            "byte_length": self.byte_length,
+            "json_bytes": self.json_bytes,
+            "bin_bytes": len(self.bin) if self.bin is not None else 0,
+            "vertex_count": vertex_total,
+            "triangle_count": triangle_total,
+            "bounds": bounds,
+            "meshes": meshes,
+            "materials": materials,
+            "textures": textures,
+            "nodes": len(self.json.get("nodes", [])),
+            "skins": len(self.json.get("skins", [])),
+            "animations": len(self.json.get("animations", [])),
+            "extensions_used": self.json.get("extensionsUsed", []),
+        }
+
+
+class BinWriter:
+    """
+    Builds a BIN chunk together with the bufferViews and accessors describing it
+
+    Pass an existing BIN chunk and the document's bufferViews/accessors lists
+    to append to a model instead of starting from scratch.
+    """
+
+    def __init__(self, prefix: bytes = b"", views: List[Dict] = None, accessors: List[Dict] = None):
+        self.chunks: List[bytes] = [prefix + b"\x00" * (-len(prefix) % 4)] if prefix else []
+        self.offset = len(self.chunks[0]) if prefix else 0
+        self.views: List[Dict] = views if views is not None else []
+        self.accessors: List[Dict] = accessors if accessors is not None else []
+
+    def binary(self) -> bytes:
+        return b"".join(self.chunks)
+
+    def view(self, blob: bytes, target: int = None, stride: int = None) -> int:
+        spec = {"buffer": 0, "byteOffset": self.offset, "byteLength": len(blob)}
+        if target:
+            spec["target"] = target
+        if stride:
+            spec["byteStride"] = stride
+        self.views.append(spec)
+        self.chunks.append(blob + b"\x00" * (-len(blob) % 4))
+        self.offset += len(self.chunks[-1])
+        return len(self.views) - 1
+
+    def accessor(self, array: np.ndarray, target: int = None, normalized: bool = False,
+                 bounds: bool = False, accessor_type: str = None, template: Dict = None) -> int:
+        array = np.ascontiguousarray(array)
+        count = len(array)
+        components = 1 if array.ndim == 1 else array.shape[1]
+        stride = None
+        blob = array.tobytes()
+        element = array.dtype.itemsize * components
+        if target == ARRAY_BUFFER and element % 4:
+            # Vertex attributes must start on 4-byte boundaries; pad each element
+            stride = element + (-element % 4)
+            padded = np.zeros((count, stride), dtype=np.uint8)
+            padded[:, :element] = np.frombuffer(blob, dtype=np.uint8).reshape(count, element)
+            blob = padded.tobytes()
+        spec = {k: v for k, v in (template or {}).items() if k in ("name", "min", "max", "normalized")}
+        spec.update({
+            "bufferView": self.view(blob, target, stride),
+            "componentType": COMPONENT_TYPES[array.dtype],
+            "count": count,
+            "type": accessor_type or ACCESSOR_TYPES[components],
+        })
+        if normalized:
+            spec["normalized"] = True
+        if bounds and count:
+            values = array.reshape(count, components)
+            cast = float if array.dtype.kind == "f" else int
+            spec["min"] = [cast(v) for v in values.min(axis=0)]
+            spec["max"] = [cast(v) for v in values.max(axis=0)]
+        self.accessors.append(spec)
+        return len(self.accessors) - 1
+
+
+def world_matrices(gltf: Dict) -> Dict[int, np.ndarray]:
+    """World transform of every node reachable from the scenes"""
+    nodes = gltf.get("nodes", [])
+
+    def local(node: Dict) -> np.ndarray:
+        if "matrix" in node:
+            return np.array(node["matrix"], dtype=np.float64).reshape(4, 4).T
+        t = np.eye(4)
+        t[:3, 3] = node.get("translation", [0, 0, 0])
+        x, y, z, w = node.get("rotation", [0, 0, 0, 1])
+        r = np.eye(4)
+        r[:3, :3] = [
+            [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+            [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+            [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+        ]
+        s = np.diag(list(node.get("scale", [1, 1, 1])) + [1])
+        return t @ r @ s
+
+    world = {}
+    roots = [n for scene in gltf.get("scenes", []) for n in scene.get("nodes", [])] or range(len(nodes))
+    stack = [(n, np.eye(4)) for n in roots]
+    while stack:
+        index, parent = stack.pop()
+        if index in world:
+            continue
+        world[index] = parent @ local(nodes[index])
+        stack.extend((child, world[index]) for child in nodes[index].get("children", []))
+    return world
+
+
+def pack_glb(gltf: Dict, binary: bytes = b"") -> bytes:
+    """Serialise a glTF JSON document and its BIN chunk into a GLB file"""
+    json_chunk = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    parts = [struct.pack("<II", len(json_chunk), CHUNK_JSON), json_chunk]
+    if binary:
+        padding = -len(binary) % 4
+        parts += [struct.pack("<II", len(binary) + padding, CHUNK_BIN), binary, b"\x00" * padding]
+    body = b"".join(parts)
+    return struct.pack("<4sII", GLB_MAGIC, 2, 12 + len(body)) + body
+
+
+def image_size(data: memoryview) -> Optional[Tuple[int, int]]:
+    """Read width and height from PNG, JPEG, WebP or KTX2 headers without decoding"""
+    head = bytes(data[:32])
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and len(head) >= 24:
+        return struct.unpack(">II", head[16:24])
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        kind = head[12:16]
+        if kind == b"VP8 " and len(head) >= 30:
+            width, height = struct.unpack("<HH", head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if kind == b"VP8L" and len(head) >= 25:
+            bits = int.from_bytes(head[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if kind == b"VP8X" and len(head) >= 30:
+            return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+    if head.startswith(b"\xabKTX 20\xbb") and len(head) >= 28:
+        return struct.unpack("<II", head[20:28])
+    if head.startswith(b"\xff\xd8"):
+        # Walk JPEG segments until a start-of-frame marker
+        offset = 2
+        while offset + 9 <= len(data):
+            if data[offset] != 0xFF:
+                return None
+            marker = data[offset + 1]
+            if marker == 0xFF:
+                offset += 1
+                continue
+            segment_length = (data[offset + 2] << 8) | data[offset + 3]
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height = (data[offset + 5] << 8) | data[offset + 6]
+                width = (data[offset + 7] << 8) | data[offset + 8]
+                return width, height
+            offset += 2 + segment_length
+    return None
+
+
+@contextmanager
+def open_glb(source) -> Iterator[GLB]:
+    """
+    Parse a GLB from a path or binary file object, memory-mapping it when possible
+
+    Arrays taken from the GLB should not outlive the block.
+    """
+    handle = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+    mapped = None
+    try:
+        try:
+            handle.seek(0)
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            data = mapped
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            # In-memory file objects (and empty files) can't be mapped
+            handle.seek(0)
+            data = handle.read()
+        glb = GLB(data)
+        try:
+            yield glb
+        finally:
+            glb.release()
+    finally:
+        if mapped is not None:
+            try:
+                mapped.close()
+            except BufferError:
+                # A caller still holds an array into the map; it is unmapped once that is collected
+                pass
+        if handle is not source:
+            handle.close()
@@ -0,0 +1,256 @@
+"""
+Level-of-detail chains for generated models
+
+QuadricSimplifier implements quadric-error edge collapse in batches: every
+pass scores all edges at once with NumPy (error quadrics summed per vertex,
+the collapse target is the point on the edge with the least error),
+picks a set of non-adjacent cheap collapses by letting each vertex vote for
+its cheapest edge, rejects the ones that would flip a triangle, and applies
+the rest together. Boundary vertices - open borders and UV/normal seams,
+where vertices are split - are locked so coarse levels do not crack or tear
+textures.
+
+build_lods() runs the simplifier down a ladder of triangle ratios and passes
+every level through optimize_glb, with textures shrinking as the level
+coarsens.
+"""
+import copy
+from typing import Dict, List, Tuple
+import numpy as np
+import scipy.sparse as sp
+from glb import GLB, BinWriter, pack_glb, COMPONENT_DTYPES, ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, MODE_TRIANGLES
+from glb_optimize import optimize_glb, weld
+
+# (fraction of the original triangles, longest texture side) per level, finest first
+LOD_LEVELS: List[Tuple[float, int]] = [(0.35, 1024), (0.1, 512), (0.025, 256)]
+# Primitives are never simplified below this many triangles
+MIN_TRIANGLES = 64
+MAX_PASSES = 100
+# Each pass only collapses edges cheaper than this quantile of all edge costs
+PASS_QUANTILE = 0.3
+# Rounds of vertex voting used to build each pass's set of collapses
+VOTING_ROUNDS = 3
+# A collapse is rejected if any surviving triangle's normal turns by more than ~80 degrees
+FLIP_COS = 0.2
+
+
+def _cross_rows(triangle_positions: np.ndarray) -> np.ndarray:
+    p0, p1, p2 = triangle_positions[:, 0], triangle_positions[:, 1], triangle_positions[:, 2]
+    return np.cross(p1 - p0, p2 - p0)
+
+
+class QuadricSimplifier:
+    """
+    Incremental edge-collapse simplifier for one indexed triangle mesh
+
+    simplify() can be called with decreasing targets; each call continues from
+    the previous result, so a whole LOD chain costs about as much as its
+    coarsest level.
+    """
+
+    def __init__(self, positions: np.ndarray, triangles: np.ndarray, attributes: Dict[str, np.ndarray] = None):
+        self.positions = np.array(positions, dtype=np.float64)
+        self.triangles = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+        # Float attributes are interpolated along collapses; integer ones keep the surviving vertex's value
+        self.attributes = {name: np.array(values) for name, values in (attributes or {}).items()}
+        self.quadrics = self._vertex_quadrics()
+
+    def _vertex_quadrics(self) -> np.ndarray:
+        """Area-weighted sum of the planes of each vertex's triangles, as (n, 4, 4)"""
+        n = len(self.positions)
+        normals = _cross_rows(self.positions[self.triangles])
+        double_area = np.linalg.norm(normals, axis=1)
+        unit = normals / np.maximum(double_area, 1e-30)[:, None]
+        planes = np.concatenate([unit, -np.einsum("ij,ij->i", unit, self.positions[self.triangles[:, 0]])[:, None]], axis=1)
+        face_quadrics = (planes[:, :, None] * planes[:, None, :] * (0.5 * double_area)[:, None, None]).reshape(-1, 16)
+        corners = self.triangles.ravel()
+        repeated = np.repeat(face_quadrics, 3, axis=0)
+        quadrics = np.empty((n, 16))
+        for c in range(16):
+            quadrics[:, c] = np.bincount(corners, weights=repeated[:, c], minlength=n)
+        return quadrics.reshape(n, 4, 4)
+
+    def _edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Unique edges and the number of triangles using each"""
+        n = len(self.positions)
+        edges = np.concatenate([self.triangles[:, [0, 1]], self.triangles[:, [1, 2]], self.triangles[:, [2, 0]]])
+        edges.sort(axis=1)
+        codes, counts = np.unique(edges[:, 0] * n + edges[:, 1], return_counts=True)
+        return np.stack([codes // n, codes % n], axis=1), counts
+
+    def _pass(self, target: int) -> int:
+        """Run one batch of collapses; returns the number applied"""
+        n = len(self.positions)
+        edges_all, counts = self._edges()
+        locked = np.zeros(n, dtype=bool)
+        locked[edges_all[counts != 2].ravel()] = True
+        edges = edges_all[~(locked[edges_all[:, 0]] | locked[edges_all[:, 1]])]
+        if not len(edges):
+            return 0
+        a, b = edges[:, 0], edges[:, 1]
+
+        # Along the edge v(t) = a + t (b - a) the quadric error is A t^2 + B t + C, so the best
+        # target on the segment is the clamped vertex of that parabola
+        combined = self.quadrics[a] + self.quadrics[b]
+        start = np.concatenate([self.positions[a], np.ones((len(edges), 1))], axis=1)
+        direction = np.concatenate([self.positions[b] - self.positions[a], np.zeros((len(edges), 1))], axis=1)
+        q_start = np.einsum("eij,ej->ei", combined, start)
+        q_direction = np.einsum("eij,ej->ei", combined, direction)
+        quad = np.einsum("ei,ei->e", direction, q_direction)
+        linear = 2 * np.einsum("ei,ei->e", start, q_direction)
+        constant = np.einsum("ei,ei->e", start, q_start)
+        t_best = np.clip(-linear / np.maximum(2 * quad, 1e-30), 0.0, 1.0)
+        # Endpoints come first so ties keep a vertex where it is
+        t_options = np.stack([np.zeros(len(edges)), np.ones(len(edges)), t_best], axis=1)
+        errors = (quad[:, None] * t_options + linear[:, None]) * t_options + constant[:, None]
+        choice = np.argmin(errors, axis=1)
+        t_all = t_options[np.arange(len(edges)), choice]
+        cost = np.maximum(errors[np.arange(len(edges)), choice], 0.0)
+
+        # Each vertex votes for its cheapest edge; edges chosen by both endpoints share no vertex.
+        # A few voting rounds over the still-free vertices fill in the matching.
+        rank = np.empty(len(edges), dtype=np.int64)
+        rank[np.argsort(cost)] = np.arange(len(edges))
+        available = cost <= np.quantile(cost, PASS_QUANTILE)
+        used = np.zeros(n, dtype=bool)
+        winners = []
+        for _ in range(VOTING_ROUNDS):
+            candidates_left = np.flatnonzero(available)
+            if not len(candidates_left):
+                break
+            best = np.full(n, len(edges), dtype=np.int64)
+            np.minimum.at(best, a[candidates_left], rank[candidates_left])
+            np.minimum.at(best, b[candidates_left], rank[candidates_left])
+            won = candidates_left[(best[a[candidates_left]] == rank[candidates_left])
+                                  & (best[b[candidates_left]] == rank[candidates_left])]
+            winners.append(won)
+            used[a[won]] = used[b[won]] = True
+            available &= ~(used[a] | used[b])
+        selected = np.concatenate(winners) if winners else np.zeros(0, dtype=np.int64)
+        selected = selected[np.argsort(cost[selected], kind="stable")]
+        # Each collapse removes about two triangles
+        selected = selected[:max((len(self.triangles) - target + 1) // 2, 1)]
+
+        # Link condition: endpoints of an interior edge must share exactly two neighbours,
+        # otherwise the collapse pinches the surface into a non-manifold edge
+        adjacency = sp.csr_matrix((np.ones(2 * len(edges_all), dtype=np.int32),
+                                   (edges_all.ravel(), edges_all[:, ::-1].ravel())), shape=(n, n))
+        common = np.asarray(adjacency[a[selected]].multiply(adjacency[b[selected]]).sum(axis=1)).ravel()
+        selected = selected[common == 2]
+
+        ea, eb = a[selected], b[selected]
+        t = t_all[selected]
+        new_positions = self.positions[ea] + t[:, None] * (self.positions[eb] - self.positions[ea])
+
+        # Drop collapses that would fold a surviving triangle over; rejecting one collapse can
+        # expose another, so re-check the affected triangles a few times
+        edge_of = np.full(n, -1, dtype=np.int64)
+        edge_of[ea] = np.arange(len(ea))
+        edge_of[eb] = np.arange(len(eb))
+        touched = edge_of[self.triangles]
+        affected = (touched >= 0).any(axis=1)
+        moved_all = touched[affected]
+        before = self.positions[self.triangles[affected]]
+        old_normals = _cross_rows(before)
+        old_length = np.linalg.norm(old_normals, axis=1)
+        alive = np.ones(len(ea), dtype=bool)
+        for _ in range(4):
+            moved = np.where((moved_all >= 0) & alive[np.maximum(moved_all, 0)], moved_all, -1)
+            after = np.where(moved[..., None] >= 0, new_positions[np.maximum(moved, 0)], before)
+            vanishing = (((moved[:, 0] >= 0) & ((moved[:, 0] == moved[:, 1]) | (moved[:, 0] == moved[:, 2])))
+                         | ((moved[:, 1] >= 0) & (moved[:, 1] == moved[:, 2])))
+            new_normals = _cross_rows(after)
+            bad = (~vanishing & (old_length > 1e-30)
+                   & (np.einsum("ij,ij->i", old_normals, new_normals) <= FLIP_COS * old_length * np.linalg.norm(new_normals, axis=1)))
+            if not bad.any():
+                break
+            rejected = moved[bad]
+            alive[rejected[rejected >= 0]] = False
+        ea, eb, t, new_positions = ea[alive], eb[alive], t[alive], new_positions[alive]
+        if not len(ea):
+            return 0
+
+        self.positions[ea] = new_positions
+        for values in self.attributes.values():
+            if values.dtype.kind == "f":
+                weight = t.reshape((-1,) + (1,) * (values.ndim - 1))
+                values[ea] = values[ea] * (1 - weight) + values[eb] * weight
+        self.quadrics[ea] += self.quadrics[eb]
+        remap = np.arange(n)
+        remap[eb] = ea
+        triangles = remap[self.triangles]
+        self.triangles = triangles[(triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2])
+                                   & (triangles[:, 0] != triangles[:, 2])]
+        return len(ea)
+
+    def simplify(self, target: int) -> np.ndarray:
+        """Collapse edges until at most target triangles remain (or nothing more can go)"""
+        for _ in range(MAX_PASSES):
+            if len(self.triangles) <= target or not self._pass(target):
+                break
+        return self.triangles
+
+
+def build_lods(data: bytes, levels: List[Tuple[float, int]] = LOD_LEVELS) -> List[Tuple[bytes, Dict]]:
+    """
+    Build progressively coarser versions of a GLB
+
+    Args:
+        data: GLB to simplify (float attributes, before quantization)
+        levels: (triangle ratio, longest texture side) per level, finest first
+
+    Returns:
+        List of (optimized LOD GLB, report) in the same order; levels that
+        would not remove any more triangles are left out
+    """
+    glb = GLB(data)
+    gltf = glb.json
+    simplifiers = {}
+    for mesh_index, mesh in enumerate(gltf.get("meshes", [])):
+        for primitive_index, primitive in enumerate(mesh.get("primitives", [])):
+            attributes = primitive.get("attributes", {})
+            if primitive.get("mode", MODE_TRIANGLES) != MODE_TRIANGLES or "POSITION" not in attributes or primitive.get("targets"):
+                continue
+            values = {name: glb.accessor(index) for name, index in attributes.items()}
+            count = len(values["POSITION"])
+            indices = (glb.accessor(primitive["indices"]).astype(np.int64) if "indices" in primitive
+                       else np.arange(count, dtype=np.int64))
+            # Exports are often triangle soups; shared corners must be one vertex for edges to collapse
+            representative, inverse = weld(values)
+            triangles = inverse[indices[:len(indices) // 3 * 3].reshape(-1, 3)]
+            triangles = triangles[(triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2])
+                                  & (triangles[:, 0] != triangles[:, 2])]
+            simplifiers[mesh_index, primitive_index] = QuadricSimplifier(
+                values["POSITION"][representative], triangles,
+                {name: array[representative] for name, array in values.items() if name != "POSITION"})
+
+    original_bin = bytes(glb.buffer(0)) if gltf.get("buffers") else b""
+    original_triangles = {key: len(s.triangles) for key, s in simplifiers.items()}
+    lods = []
+    previous = sum(original_triangles.values())
+    for ratio, max_texture_size in levels:
+        for key, simplifier in simplifiers.items():
+            simplifier.simplify(max(int(original_triangles[key] * ratio), MIN_TRIANGLES))
+        triangles = sum(len(s.triangles) for s in simplifiers.values())
+        if not simplifiers or triangles >= previous:
+            continue
+        previous = triangles
+
+        document = copy.deepcopy(gltf)
+        writer = BinWriter(original_bin, document.setdefault("bufferViews", []), document.setdefault("accessors", []))
+        for (mesh_index, primitive_index), simplifier in simplifiers.items():
+            primitive = document["meshes"][mesh_index]["primitives"][primitive_index]
+            specs = {name: gltf["accessors"][index] for name, index in primitive["attributes"].items()}
+            arrays = dict(simplifier.attributes, POSITION=simplifier.positions)
+            primitive["attributes"] = {
+                name: writer.accessor(arrays[name].astype(COMPONENT_DTYPES[specs[name]["componentType"]]), ARRAY_BUFFER,
+                                      specs[name].get("normalized", False), bounds=(name == "POSITION"))
+                for name in specs
+            }
+            primitive["indices"] = writer.accessor(simplifier.triangles.ravel().astype(np.uint32), ELEMENT_ARRAY_BUFFER)
+        binary = writer.binary()
+        document["buffers"] = [{"byteLength": len(binary)}] + document.get("buffers", [])[1:]
+        lod, optimization = optimize_glb(pack_glb(document, binary), max_texture_size=max_texture_size)
+        lods.append((lod, {"ratio": ratio, "triangles": optimization["triangles_after"], "bytes": len(lod)}))
+    glb.release()
+    return lods
@@ -0,0 +1,302 @@
+"""
+GLB optimisation for generated models
+
+TripoSR and Hunyuan3D export float32 attributes, unwelded vertices and
+full-size textures. optimize_glb() rewrites a GLB so the viewer downloads
+and parses far less:
+
+1. Attributes are quantized per KHR_mesh_quantization: positions to uint16
+   on a uniform per-mesh grid (the dequantization scale and offset live on a
+   new child node), normals and tangents to normalized int8, and UVs inside
+   [0, 1] to normalized uint16.
+2. Vertices are welded by hashing each vertex's quantized attribute bytes
+   with NumPy, so seams that only differed below the quantization step are
+   merged too. Degenerate triangles and unused vertices are dropped.
+3. Triangles are sorted along a Morton curve of their centroids and vertices
+   are renumbered in first-use order, which keeps the post-transform and
+   vertex-fetch caches warm. Indices shrink to uint16 when they fit.
+4. Embedded textures larger than max_texture_size are downscaled.
+
+Skins, animations and untouched primitives are copied into the new BIN
+chunk as-is.
+"""
+import io
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image
+from glb import GLB, BinWriter, ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, MODE_TRIANGLES, image_size, pack_glb
+
+# 0 disables texture downscaling
+MAX_TEXTURE_SIZE = int(os.getenv("GLB_MAX_TEXTURE_SIZE", "2048"))
+
+QUANTIZATION_EXTENSION = "KHR_mesh_quantization"
+# These reference buffer data in ways the rewrite below does not follow
+UNSUPPORTED_EXTENSIONS = {"KHR_draco_mesh_compression", "EXT_meshopt_compression", "EXT_mesh_gpu_instancing"}
+
+IMAGE_FORMATS = {"image/png": "PNG", "image/jpeg": "JPEG", "image/webp": "WEBP"}
+
+
+def _hash_rows(keys: np.ndarray) -> np.ndarray:
+    """64-bit FNV-style hash of each row of a uint8 matrix"""
+    width = keys.shape[1]
+    if width % 8:
+        keys = np.concatenate([keys, np.zeros((len(keys), -width % 8), dtype=np.uint8)], axis=1)
+    words = np.ascontiguousarray(keys).view(np.uint64)
+    h = np.full(len(keys), 0xCBF29CE484222325, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for column in words.T:
+            h = (h ^ column) * np.uint64(0x100000001B3)
+            h ^= h >> np.uint64(29)
+    return h
+
+
+def weld(attributes: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Merge vertices whose attributes are byte-identical
+
+    Returns:
+        (representative vertex of each unique vertex, old vertex -> unique vertex)
+    """
+    count = len(next(iter(attributes.values())))
+    keys = np.concatenate([np.ascontiguousarray(a).view(np.uint8).reshape(count, -1) for a in attributes.values()], axis=1)
+    _, first, inverse = np.unique(_hash_rows(keys), return_index=True, return_inverse=True)
+    if not np.array_equal(keys[first][inverse], keys):
+        # A hash collision; fall back to comparing whole rows
+        rows = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.shape[1]))).ravel()
+        _, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    return first, inverse.ravel()
+
+
+def _morton(cells: np.ndarray) -> np.ndarray:
+    """Interleave three 10-bit integer coordinates into a 30-bit Morton code"""
+    v = cells.astype(np.uint64)
+    for shift, mask in ((16, 0x030000FF), (8, 0x0300F00F), (4, 0x030C30C3), (2, 0x09249249)):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v[:, 0] | (v[:, 1] << np.uint64(1)) | (v[:, 2] << np.uint64(2))
+
+
+def reorder(triangles: np.ndarray, positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sort triangles spatially and renumber vertices in first-use order
+
+    Returns:
+        (new triangles, new vertex -> old vertex)
+    """
+    centroids = positions[triangles].mean(axis=1)
+    low, high = centroids.min(axis=0), centroids.max(axis=0)
+    cells = ((centroids - low) / np.maximum(high - low, 1e-12) * 1023).astype(np.uint32)
+    triangles = triangles[np.argsort(_morton(cells), kind="stable")]
+
+    used, first_use = np.unique(triangles.ravel(), return_index=True)
+    order = used[np.argsort(first_use)]
+    remap = np.empty(len(positions), dtype=np.int64)
+    remap[order] = np.arange(len(order))
+    return remap[triangles], order
+
+
+def _quantize(name: str, values: np.ndarray, grid: Optional[Tuple[np.ndarray, float]]) -> Tuple[np.ndarray, bool]:
+    """Quantized attribute and whether it is normalized; unsupported attributes come back unchanged"""
+    if values.dtype != np.float32:
+        return values, False
+    if name == "POSITION" and grid is not None:
+        low, step = grid
+        return np.clip(np.rint((values - low) / step), 0, 65535).astype(np.uint16), False
+    if name in ("NORMAL", "TANGENT"):
+        v = values.copy()
+        v[:, :3] /= np.maximum(np.linalg.norm(v[:, :3], axis=1, keepdims=True), 1e-12)
+        return np.clip(np.rint(v * 127), -127, 127).astype(np.int8), True
+    if name.startswith("TEXCOORD_") and len(values) and values.min() >= 0 and values.max() <= 1:
+        return np.rint(values * 65535).astype(np.uint16), True
+    return values, False
+
+
+def _downscale(data: memoryview, mime_type: str, max_size: int) -> Optional[bytes]:
+    """Re-encoded image no larger than max_size on either side, or None if that would not help"""
+    size = image_size(data)
+    if not max_size or not size or max(size) <= max_size or mime_type not in IMAGE_FORMATS:
+        return None
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        out = io.BytesIO()
+        image_format = IMAGE_FORMATS[mime_type]
+        options = {"PNG": {"optimize": True}, "JPEG": {"quality": 90}, "WEBP": {"quality": 90}}[image_format]
+        if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(out, image_format, **options)
+    encoded = out.getvalue()
+    return encoded if len(encoded) < len(data) else None
+
+
+def optimize_glb(data: bytes, quantize: bool = True, max_texture_size: int = MAX_TEXTURE_SIZE) -> Tuple[bytes, Dict]:
+    """
+    Weld, reorder and quantize the meshes of a GLB and shrink its textures
+
+    Args:
+        data: GLB file contents
+        quantize: Use KHR_mesh_quantization for positions, normals, tangents and UVs
+        max_texture_size: Longest texture side to keep (0 keeps textures as they are)
+
+    Returns:
+        (optimized GLB bytes, report with before/after sizes and counts); the
+        input is returned unchanged when optimisation would not shrink it
+    """
+    started = time.perf_counter()
+    glb = GLB(data)
+    gltf = glb.json
+    report = {"bytes_before": glb.byte_length}
+    before = glb.inspect()
+    report.update(vertices_before=before["vertex_count"], triangles_before=before["triangle_count"],
+                  texture_bytes_before=sum(t.get("bytes", 0) for t in before["textures"]))
+
+    blocked = UNSUPPORTED_EXTENSIONS.intersection(gltf.get("extensionsUsed", []))
+    if QUANTIZATION_EXTENSION in gltf.get("extensionsUsed", []):
+        blocked.add(QUANTIZATION_EXTENSION)
+    if blocked:
+        report.update(skipped=f"Already uses {', '.join(sorted(blocked))}", bytes_after=glb.byte_length)
+        return data, report
+
+    nodes = gltf.get("nodes", [])
+    mesh_users: Dict[int, List[int]] = {}
+    for node_index, node in enumerate(nodes):
+        if "mesh" in node:
+            mesh_users.setdefault(node["mesh"], []).append(node_index)
+
+    writer = BinWriter()
+    copied: Dict[Tuple[int, int], int] = {}
+
+    def copy_accessor(index: int, target: int = None) -> int:
+        if (index, target) not in copied:
+            spec = gltf["accessors"][index]
+            array = glb.accessor(index)
+            if spec["type"].startswith("MAT"):
+                array = array.reshape(len(array), -1)
+            copied[index, target] = writer.accessor(array, target, accessor_type=spec["type"], template=spec)
+        return copied[index, target]
+
+    quantized_meshes = {}
+    uses_quantization = False
+    resized = 0
+    for mesh_index, mesh in enumerate(gltf.get("meshes", [])):
+        primitives = mesh.get("primitives", [])
+        users = mesh_users.get(mesh_index, [])
+        optimizable = [p for p in primitives
+                       if p.get("mode", MODE_TRIANGLES) == MODE_TRIANGLES and "POSITION" in p.get("attributes", {})
+                       and not p.get("targets")]
+        # Skinned meshes ignore their node transform, so positions can only be quantized on plain nodes
+        grid = None
+        if quantize and users and not any("skin" in nodes[n] for n in users) and len(optimizable) == len(primitives):
+            positions = [glb.accessor(p["attributes"]["POSITION"]) for p in optimizable]
+            if all(p.dtype == np.float32 for p in positions) and any(len(p) for p in positions):
+                low = np.min([p.min(axis=0) for p in positions if len(p)], axis=0).astype(np.float64)
+                high = np.max([p.max(axis=0) for p in positions if len(p)], axis=0).astype(np.float64)
+                # Uniform step keeps the node scale uniform, so normals are not skewed
+                grid = (low, max(float((high - low).max()) / 65535, 1e-12))
+                quantized_meshes[mesh_index] = grid
+
+        for primitive in primitives:
+            attributes = primitive.get("attributes", {})
+            if primitive not in optimizable:
+                primitive["attributes"] = {name: copy_accessor(i, ARRAY_BUFFER) for name, i in attributes.items()}
+                if "indices" in primitive:
+                    primitive["indices"] = copy_accessor(primitive["indices"], ELEMENT_ARRAY_BUFFER)
+                if primitive.get("targets"):
+                    primitive["targets"] = [{name: copy_accessor(i, ARRAY_BUFFER) for name, i in target.items()}
+                                            for target in primitive["targets"]]
+                continue
+
+            positions = np.asarray(glb.accessor(attributes["POSITION"]), dtype=np.float64)
+            values, normalized = {}, {}
+            for name, index in attributes.items():
+                values[name] = glb.accessor(index)
+                normalized[name] = gltf["accessors"][index].get("normalized", False)
+                if quantize:
+                    array, is_normalized = _quantize(name, values[name], grid)
+                    if array is not values[name]:
+                        values[name], normalized[name] = array, is_normalized
+                        # Core glTF already allows normalized integer UVs
+                        uses_quantization |= not name.startswith("TEXCOORD_")
+            indices = (glb.accessor(primitive["indices"]).astype(np.int64) if "indices" in primitive
+                       else np.arange(len(positions), dtype=np.int64))
+            triangles = indices[:len(indices) // 3 * 3].reshape(-1, 3)
+
+            representative, inverse = weld(values)
+            triangles = inverse[triangles]
+            a, b, c = triangles.T
+            triangles = triangles[(a != b) & (b != c) & (a != c)]
+            if len(triangles):
+                triangles, order = reorder(triangles, positions[representative])
+                keep = representative[order]
+            else:
+                keep = representative[:0]
+
+            primitive["attributes"] = {
+                name: writer.accessor(array[keep], ARRAY_BUFFER, normalized[name], bounds=(name == "POSITION"),
+                                      template={k: v for k, v in gltf["accessors"][attributes[name]].items() if k == "name"})
+                for name, array in values.items()
+            }
+            index_dtype = np.uint16 if len(keep) <= 65535 else np.uint32
+            primitive["indices"] = writer.accessor(triangles.ravel().astype(index_dtype), ELEMENT_ARRAY_BUFFER)
+
+    # Dequantization lives on a child node so the original node's children are unaffected
+    for mesh_index, (low, step) in quantized_meshes.items():
+        for node_index in mesh_users[mesh_index]:
+            node = nodes[node_index]
+            del node["mesh"]
+            child = {"mesh": mesh_index, "translation": [float(v) for v in low], "scale": [step] * 3}
+            if "weights" in node:
+                child["weights"] = node.pop("weights")
+            nodes.append(child)
+            node.setdefault("children", []).append(len(nodes) - 1)
+
+    for skin in gltf.get("skins", []):
+        if "inverseBindMatrices" in skin:
+            skin["inverseBindMatrices"] = copy_accessor(skin["inverseBindMatrices"])
+    for animation in gltf.get("animations", []):
+        for sampler in animation.get("samplers", []):
+            sampler["input"] = copy_accessor(sampler["input"])
+            sampler["output"] = copy_accessor(sampler["output"])
+
+    texture_bytes = 0
+    for image_index, image in enumerate(gltf.get("images", [])):
+        if "bufferView" not in image and not image.get("uri", "").startswith("data:"):
+            continue
+        encoded, mime_type = glb.image(image_index)
+        smaller = _downscale(encoded, mime_type, max_texture_size)
+        if smaller is not None:
+            encoded = smaller
+            resized += 1
+        image.pop("uri", None)
+        image["bufferView"] = writer.view(bytes(encoded))
+        if mime_type:
+            image["mimeType"] = mime_type
+        texture_bytes += len(encoded)
+
+    binary = writer.binary()
+    gltf["accessors"] = writer.accessors
+    gltf["bufferViews"] = writer.views
+    gltf["buffers"] = [{"byteLength": len(binary)}] if binary else []
+    if not binary:
+        gltf.pop("bufferViews")
+    if uses_quantization:
+        for key in ("extensionsUsed", "extensionsRequired"):
+            gltf[key] = sorted(set(gltf.get(key, [])) | {QUANTIZATION_EXTENSION})
+    optimized = pack_glb(gltf, binary)
+    glb.release()
+
+    after = GLB(optimized).inspect()
+    report.update(
+        vertices_after=after["vertex_count"],
+        triangles_after=after["triangle_count"],
+        texture_bytes_after=texture_bytes,
+        textures_resized=resized,
+        quantized=bool(quantized_meshes),
+    )
+    if len(optimized) >= len(data):
+        report.update(skipped="Optimized file was not smaller", bytes_after=len(data))
+        return data, report
+    report["bytes_after"] = len(optimized)
+    report["ratio"] = round(len(data) / len(optimized), 2)
+    report["optimize_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return optimized, report
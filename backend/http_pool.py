@@ -0,0 +1,128 @@
+"""
+Shared pooled HTTP clients for outbound requests
+
+One httpx.AsyncClient is kept per upstream host family so that TCP/TLS
+connections (and HTTP/2 streams where the server supports it) are reused
+across requests instead of being re-established on every call.
+"""
+import importlib.util
+from typing import Dict
+import httpx
+
+# HTTP/2 needs the optional `h2` package (installed via httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Pool settings per upstream host family
+CLIENT_PROFILES = {
+    # Arbitrary user-supplied URLs (image fetches for 3D conversion, etc.)
+    "default": {
+        "timeout": httpx.Timeout(60.0, connect=10.0),
+        "limits": httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0),
+    },
+    # Third-party pages fetched for SEO analysis; short read timeout so slow sites fail fast
+    "pages": {
+        "timeout": httpx.Timeout(15.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0),
+    },
+    # image.pollinations.ai / pollinations.ai
+    "pollinations": {
+        "timeout": httpx.Timeout(30.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+    },
+    # Ready Player Me REST API (create + status polling)
+    "rpm": {
+        "timeout": httpx.Timeout(30.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=120.0),
+    },
+    # Ready Player Me model CDN (GLB downloads)
+    "rpm_assets": {
+        "timeout": httpx.Timeout(120.0, connect=10.0),
+        "limits": httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+    },
+    # api.imgbb.com uploads
+    "imgbb": {
+        "timeout": httpx.Timeout(30.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=10, max_keepalive_connections=5, keepalive_expiry=60.0),
+    },
+}
+
+
+class ConnectionStats:
+    """Counts requests and newly opened connections for one client"""
+
+    def __init__(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.http2_responses = 0
+
+    async def trace(self, event_name: str, info: Dict):
+        # httpcore emits this once per freshly opened TCP connection
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+
+    async def on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = self.trace
+
+    async def on_response(self, response: httpx.Response):
+        if response.http_version == "HTTP/2":
+            self.http2_responses += 1
+
+    def as_dict(self) -> Dict:
+        reused = max(self.requests - self.new_connections, 0)
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": reused,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+            "http2_responses": self.http2_responses,
+        }
+
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_stats: Dict[str, ConnectionStats] = {}
+
+
+def _build_client(family: str) -> httpx.AsyncClient:
+    profile = CLIENT_PROFILES[family]
+    stats = _stats.setdefault(family, ConnectionStats())
+    return httpx.AsyncClient(
+        http2=HTTP2_AVAILABLE,
+        timeout=profile["timeout"],
+        limits=profile["limits"],
+        follow_redirects=True,
+        event_hooks={"request": [stats.on_request], "response": [stats.on_response]},
+    )
+
+
+def get_client(family: str = "default") -> httpx.AsyncClient:
+    """Return the shared client for a host family, creating it on first use"""
+    if family not in CLIENT_PROFILES:
+        raise KeyError(f"Unknown HTTP client family: {family}")
+    client = _clients.get(family)
+    if client is None or client.is_closed:
+        client = _build_client(family)
+        _clients[family] = client
+    return client
+
+
+async def start_clients():
+    """Create every client up front (called from the app lifespan)"""
+    for family in CLIENT_PROFILES:
+        get_client(family)
+
+
+async def close_clients():
+    """Close all pooled connections (called from the app lifespan)"""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def connection_stats() -> Dict:
+    """Connection reuse statistics per host family"""
+    return {
+        "http2_enabled": HTTP2_AVAILABLE,
+        "clients": {family: stats.as_dict() for family, stats in _stats.items()},
+    }
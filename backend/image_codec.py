@@ -0,0 +1,129 @@
+"""
+Compact encodings for generated images
+
+Image providers return PNG or JPEG, and the bytes reach the browser
+base64-encoded inside JSON, so every byte costs 4/3 on the wire.
+transcode_image() re-encodes an image to WebP (or AVIF where Pillow supports
+it), binary-searching the encoder quality for the best one that fits a byte
+budget, and makes a small preview the same way. It is CPU-bound and runs in
+cpu_pool's worker processes, so it only takes and returns picklable values.
+"""
+import io
+import os
+import base64
+from typing import Dict, List, Tuple
+from PIL import Image, features
+
+IMAGE_TARGET_BYTES = int(os.getenv("IMAGE_TARGET_BYTES", "48000"))
+PREVIEW_SIZE = 256
+PREVIEW_TARGET_BYTES = 8000
+MIN_QUALITY = 40
+MAX_QUALITY = 92
+# Halvings of the quality range; five pins it to within two points
+SEARCH_STEPS = 5
+# Name -> (Pillow format, MIME type, encoder options)
+ENCODINGS = {
+    "webp": ("WEBP", "image/webp", {"method": 4}),
+    "avif": ("AVIF", "image/avif", {"speed": 8}),
+}
+
+
+def available_formats() -> List[str]:
+    return [name for name in ENCODINGS if features.check(name)]
+
+
+def sniff_mime_type(data: bytes, default: str = "image/png") -> str:
+    """MIME type from the image header (nothing is decoded), or default if Pillow can't identify it"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return Image.MIME.get(image.format, default)
+    except (OSError, ValueError):
+        return default
+
+
+def encode_to_target(image: Image.Image, image_format: str, target_bytes: int) -> Tuple[bytes, int]:
+    """
+    Encode at the highest quality that fits target_bytes
+
+    Returns:
+        (encoded bytes, quality); at MIN_QUALITY the result may still be over
+        the target
+    """
+    pil_format, _, options = ENCODINGS[image_format]
+    encoded = {}
+
+    def encode(quality: int) -> bytes:
+        if quality not in encoded:
+            output = io.BytesIO()
+            image.save(output, pil_format, quality=quality, **options)
+            encoded[quality] = output.getvalue()
+        return encoded[quality]
+
+    # Flat or small images often fit at full quality without a search
+    if len(encode(MAX_QUALITY)) <= target_bytes:
+        return encoded[MAX_QUALITY], MAX_QUALITY
+    low, high = MIN_QUALITY, MAX_QUALITY
+    for _ in range(SEARCH_STEPS):
+        if high - low <= 1:
+            break
+        quality = (low + high) // 2
+        if len(encode(quality)) <= target_bytes:
+            low = quality
+        else:
+            high = quality
+    return encode(low), low
+
+
+def transcode_image(data: bytes, image_format: str = "webp", target_bytes: int = IMAGE_TARGET_BYTES,
+                    preview_size: int = PREVIEW_SIZE, preview_target_bytes: int = PREVIEW_TARGET_BYTES) -> Dict:
+    """
+    Re-encode a generated image compactly and make a preview
+
+    Args:
+        data: Encoded source image
+        image_format: "webp" or "avif"; falls back to WebP if Pillow cannot encode it
+        target_bytes: Byte budget for the full-size image
+        preview_size: Longest side of the preview
+        preview_target_bytes: Byte budget for the preview
+
+    Returns:
+        Dict with image_base64/mime_type, preview_base64/preview_mime_type and
+        a report. The source is kept when re-encoding would not make it smaller.
+    """
+    image = Image.open(io.BytesIO(data))
+    source_mime_type = Image.MIME.get(image.format, "image/png")
+    image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info else "RGB")
+    formats = available_formats()
+    if image_format not in formats:
+        image_format = "webp" if "webp" in formats else None
+    if image_format is None:
+        encoded = base64.b64encode(data).decode("ascii")
+        return {"image_base64": encoded, "mime_type": source_mime_type,
+                "preview_base64": encoded, "preview_mime_type": source_mime_type,
+                "report": {"format": None, "bytes_before": len(data), "bytes_after": len(data)}}
+
+    mime_type = ENCODINGS[image_format][1]
+    full, quality = encode_to_target(image, image_format, target_bytes)
+    if len(full) >= len(data):
+        full, quality, mime_type = data, None, source_mime_type
+
+    preview_image = image.copy()
+    preview_image.thumbnail((preview_size, preview_size), Image.LANCZOS)
+    preview, preview_quality = encode_to_target(preview_image, image_format, preview_target_bytes)
+
+    return {
+        "image_base64": base64.b64encode(full).decode("ascii"),
+        "mime_type": mime_type,
+        "preview_base64": base64.b64encode(preview).decode("ascii"),
+        "preview_mime_type": ENCODINGS[image_format][1],
+        "report": {
+            "format": image_format,
+            "width": image.width,
+            "height": image.height,
+            "quality": quality,
+            "bytes_before": len(data),
+            "bytes_after": len(full),
+            "preview_quality": preview_quality,
+            "preview_bytes": len(preview),
+        },
+    }
@@ -0,0 +1,136 @@
+"""
+Input preparation for image-to-3D models
+
+Generated character images are mostly empty studio backdrop around a
+subject, and the Hugging Face Spaces resize them to a small square anyway.
+prepare_image() does that work locally before the upload:
+
+1. Find the subject. Images with transparency use their alpha channel;
+   otherwise the backdrop is the region of near-border-colour pixels
+   connected to the image border (the border colour must be light, as the
+   character prompts ask for a white background). Small specks are ignored.
+2. Crop to the subject and scale it to fill FOREGROUND_RATIO of a square
+   canvas at the model's input resolution.
+3. Encode as WebP (PNG if Pillow lacks WebP support).
+
+Transparent inputs keep a transparent canvas and need no remote background
+removal. A flood-filled backdrop is only trusted for the crop: highlights
+on a light subject can leak into it, so the canvas is padded with the
+backdrop colour and the Space still removes the background itself. When no
+backdrop can be found (a photo, say) the image is only shrunk.
+"""
+import io
+from typing import Dict, Optional, Tuple
+import numpy as np
+from PIL import Image, ImageOps, features
+from scipy import ndimage
+
+# Input resolution of each image-to-3D model
+MODEL_INPUT_SIZES = {"triposr": 512, "hunyuan3d": 512}
+# Share of the canvas the subject's longer side fills (TripoSR's default)
+FOREGROUND_RATIO = 0.85
+# Border pixels must be at least this bright (per channel) to count as a backdrop
+BACKDROP_MIN_LEVEL = 200
+# Largest per-channel difference from the border colour still counted as backdrop
+BACKDROP_TOLERANCE = 24
+# Foreground components smaller than this share of the largest one are treated as noise
+MIN_COMPONENT_RATIO = 0.01
+# A detected backdrop must cover at least this share of the image
+MIN_BACKDROP_SHARE = 0.1
+WEBP_QUALITY = 90
+
+
+def _find_backdrop(rgb: np.ndarray) -> Optional[Tuple[np.ndarray, Tuple[int, int, int]]]:
+    """Mask of a light backdrop connected to the border and its colour, or None"""
+    border = np.concatenate([rgb[0], rgb[-1], rgb[:, 0], rgb[:, -1]]).astype(np.int16)
+    colour = np.median(border, axis=0)
+    if colour.min() < BACKDROP_MIN_LEVEL:
+        return None
+    close = (np.abs(rgb.astype(np.int16) - colour) <= BACKDROP_TOLERANCE).all(axis=2)
+    labels, count = ndimage.label(close)
+    touches_edge = np.zeros(count + 1, dtype=bool)
+    touches_edge[np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]])] = True
+    touches_edge[0] = False
+    backdrop = touches_edge[labels]
+    if backdrop.mean() < MIN_BACKDROP_SHARE or backdrop.all():
+        return None
+    return backdrop, tuple(int(c) for c in colour)
+
+
+def _subject_box(subject: np.ndarray) -> Optional[Tuple[int, int, int, int]]:
+    """Bounding box (left, top, right, bottom) of the subject mask, ignoring specks"""
+    labels, count = ndimage.label(subject)
+    if not count:
+        return None
+    areas = np.bincount(labels.ravel())
+    areas[0] = 0
+    rows, columns = np.nonzero((areas >= areas.max() * MIN_COMPONENT_RATIO)[labels] & (labels > 0))
+    return int(columns.min()), int(rows.min()), int(columns.max()) + 1, int(rows.max()) + 1
+
+
+def prepare_image(data: bytes, size: int = 512, foreground_ratio: float = FOREGROUND_RATIO) -> Tuple[bytes, Dict]:
+    """
+    Crop an image to its subject and fit it to a model's square input
+
+    Args:
+        data: Encoded image (any format Pillow reads)
+        size: Side of the square the model consumes
+        foreground_ratio: Share of the side the subject's longer edge fills
+
+    Returns:
+        (encoded image, report). report["background"] says how the subject
+        was found ("alpha", "backdrop" or None when it was not and the image
+        was only resized); report["transparent"] is True when the output
+        already has the background removed.
+    """
+    image = Image.open(io.BytesIO(data))
+    source_size = image.size
+    # JPEGs can decode straight at a fraction of their size
+    image.draft("RGB", (size * 2, size * 2))
+    image = ImageOps.exif_transpose(image)
+
+    background, box, fill = None, None, None
+    if image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info:
+        image = image.convert("RGBA")
+        subject = np.asarray(image.getchannel("A")) >= 128
+        if not subject.all():
+            background, fill = "alpha", (255, 255, 255, 0)
+    else:
+        image = image.convert("RGB")
+        backdrop = _find_backdrop(np.asarray(image))
+        if backdrop is not None:
+            subject, fill = ~backdrop[0], backdrop[1]
+            background = "backdrop"
+    if background:
+        box = _subject_box(subject)
+        if box is None:
+            background = None
+
+    if background:
+        cropped = image.crop(box)
+        scale = size * foreground_ratio / max(cropped.size)
+        cropped = cropped.resize((max(round(cropped.width * scale), 1), max(round(cropped.height * scale), 1)),
+                                 Image.LANCZOS)
+        image = Image.new(image.mode, (size, size), fill)
+        image.paste(cropped, ((size - cropped.width) // 2, (size - cropped.height) // 2))
+    else:
+        image = image.convert("RGB")
+        image.thumbnail((size, size), Image.LANCZOS)
+
+    image_format = "webp" if features.check("webp") else "png"
+    output = io.BytesIO()
+    if image_format == "webp":
+        image.save(output, "WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(output, "PNG", optimize=True)
+    prepared = output.getvalue()
+
+    return prepared, {
+        "background": background,
+        "transparent": background == "alpha",
+        "size_before": list(source_size),
+        "size_after": list(image.size),
+        "bytes_before": len(data),
+        "bytes_after": len(prepared),
+        "format": image_format,
+    }
@@ -1,26 +1,38 @@
 """
 FastAPI Backend for SilentTrendFarm
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, UploadFile, File, Header
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional
 import os
 from dotenv import load_dotenv
-import requests
 from pytrends.request import TrendReq
 from datetime import datetime
 import json
-import base64
 import io
 import time
-import httpx
+import asyncio
+from contextlib import asynccontextmanager
 from gradio_client import Client
+import http_pool
+import cpu_pool
+from scratch import scratch_space
+from openai_client import get_openai_client, close_openai_client
+from crawler import analyze_url, crawl, load_sitemap, CRAWL_MAX_URLS
+from glb import open_glb, GLBError
+from model_store import THUMBNAIL_TYPES, describe, level_path, load_manifest, thumbnail_path
+from app.ready_player_me import router as rpm_router, avatar_poller
 from character_pipeline import (
     CharacterGenerationRequest,
     RigModelRequest,
     generate_image_sdxl,
     convert_to_3d_hunyuan,
+    encode_generated_image,
+    prepare_model_input,
+    optimize_model,
+    store_model_lods,
     auto_rig_model,
     analyze_theme,
     full_character_pipeline
@@ -29,11 +41,25 @@ from character_pipeline import (
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    await http_pool.start_clients()
+    try:
+        yield
+    finally:
+        await avatar_poller.stop()
+        await close_openai_client()
+        await http_pool.close_clients()
+        await scratch_space.stop()
+        cpu_pool.shutdown()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="SilentTrendFarm API",
     description="Backend API for SilentTrendFarm blog",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -45,6 +71,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Ready Player Me avatar endpoints are public and call a paid third-party API, so they are opt-in
+if os.getenv("RPM_ROUTES_ENABLED", "false").lower() == "true":
+    app.include_router(rpm_router, prefix="/api")
+
 # Pydantic models for request/response
 class TrendRequest(BaseModel):
     keywords: List[str]
@@ -60,9 +90,23 @@ class BlogPostIdea(BaseModel):
 class ContentAnalysis(BaseModel):
     url: str
     extract_meta: Optional[bool] = True
+    # Only read the <head> (title + meta tags); skips headings and word count
+    meta_only: Optional[bool] = False
+    max_h2: int = Field(5, ge=0)
+
+class BulkContentAnalysis(BaseModel):
+    urls: List[str] = []
+    sitemap_url: Optional[str] = None
+    extract_meta: Optional[bool] = True
+    meta_only: Optional[bool] = False
+    max_h2: int = Field(5, ge=0)
+    per_host_concurrency: int = Field(2, ge=1, le=8)
+    respect_robots: bool = True
 
 class Image3DRequest(BaseModel):
     image_url: str
+    # Viewers that load LODs from /api/models/... can skip the inline full-resolution GLB
+    include_glb: bool = True
 
 # Root endpoint
 @app.get("/")
@@ -78,6 +122,22 @@ async def root():
 async def health_check():
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+def _fetch_trends(request: TrendRequest) -> dict:
+    pytrends = TrendReq(hl='en-US', tz=360)
+    pytrends.build_payload(request.keywords, timeframe=request.timeframe, geo=request.geo)
+    
+    # Get interest over time
+    interest_over_time = pytrends.interest_over_time()
+    
+    # Get related queries
+    related_queries = pytrends.related_queries()
+    
+    return {
+        "keywords": request.keywords,
+        "interest_over_time": interest_over_time.to_dict() if not interest_over_time.empty else {},
+        "related_queries": related_queries
+    }
+
 # Google Trends endpoint
 @app.post("/api/trends")
 async def get_trends(request: TrendRequest):
@@ -85,20 +145,8 @@ async def get_trends(request: TrendRequest):
     Fetch trending topics from Google Trends
     """
     try:
-        pytrends = TrendReq(hl='en-US', tz=360)
-        pytrends.build_payload(request.keywords, timeframe=request.timeframe, geo=request.geo)
-        
-        # Get interest over time
-        interest_over_time = pytrends.interest_over_time()
-        
-        # Get related queries
-        related_queries = pytrends.related_queries()
-        
-        return {
-            "keywords": request.keywords,
-            "interest_over_time": interest_over_time.to_dict() if not interest_over_time.empty else {},
-            "related_queries": related_queries
-        }
+        # pytrends makes blocking requests and builds DataFrames; keep both off the event loop
+        return await asyncio.to_thread(_fetch_trends, request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -133,64 +181,126 @@ async def analyze_content(request: ContentAnalysis):
     Analyze content from a URL for SEO insights
     """
     try:
-        from bs4 import BeautifulSoup
-        
-        response = requests.get(request.url, headers={'User-Agent': 'Mozilla/5.0'})
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Extract meta information
-        meta_data = {}
-        if request.extract_meta:
-            meta_data = {
-                "title": soup.find('title').text if soup.find('title') else "",
-                "description": soup.find('meta', {'name': 'description'})['content'] if soup.find('meta', {'name': 'description'}) else "",
-                "keywords": soup.find('meta', {'name': 'keywords'})['content'] if soup.find('meta', {'name': 'keywords'}) else "",
-                "h1_tags": [h1.text for h1 in soup.find_all('h1')],
-                "h2_tags": [h2.text for h2 in soup.find_all('h2')][:5]  # Limit to 5
-            }
-        
-        # Count words
-        text = soup.get_text()
-        word_count = len(text.split())
-        
-        return {
-            "url": request.url,
-            "meta_data": meta_data,
-            "word_count": word_count,
-            "analyzed_at": datetime.now().isoformat()
-        }
+        result = await analyze_url(
+            request.url,
+            extract_meta=request.extract_meta,
+            meta_only=request.meta_only,
+            max_h2=request.max_h2
+        )
+        result["analyzed_at"] = datetime.now().isoformat()
+        return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Bulk content analysis (competitor crawls)
+@app.post("/api/analyze-content/bulk")
+async def analyze_content_bulk(request: BulkContentAnalysis):
+    """
+    Analyze many URLs (or a sitemap) concurrently, streaming NDJSON results
+    as each page finishes
+    """
+    urls = list(dict.fromkeys(request.urls))
+    if request.sitemap_url:
+        urls = list(dict.fromkeys(urls + await load_sitemap(request.sitemap_url)))
+    if not urls:
+        raise HTTPException(status_code=400, detail="Provide urls or a sitemap_url")
+    if len(urls) > CRAWL_MAX_URLS:
+        raise HTTPException(status_code=400, detail=f"At most {CRAWL_MAX_URLS} URLs per crawl")
+    
+    async def ndjson():
+        async for result in crawl(
+            urls,
+            per_host_concurrency=request.per_host_concurrency,
+            respect_robots=request.respect_robots,
+            extract_meta=request.extract_meta,
+            meta_only=request.meta_only,
+            max_h2=request.max_h2
+        ):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 # AI content assistant endpoint (if OpenAI key is available)
+AI_ASSISTANT_MODEL = os.getenv("AI_ASSISTANT_MODEL", "gpt-3.5-turbo")
+AI_ASSISTANT_SYSTEM_PROMPT = "You are a helpful blog writing assistant."
+
+def _sse(event: str, data: dict) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @app.post("/api/ai-assistant")
-async def ai_assistant(prompt: str, max_tokens: int = 150):
+async def ai_assistant(prompt: str, max_tokens: int = 150, stream: bool = False):
     """
     AI-powered content assistant using OpenAI
+    
+    With stream=true the completion is relayed as server-sent events:
+    "token" events as text arrives, then a "done" event with timings and
+    token usage (or an "error" event).
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
+    client = get_openai_client()
+    if client is None:
         raise HTTPException(status_code=503, detail="OpenAI API key not configured")
     
-    try:
-        import openai
-        openai.api_key = api_key
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful blog writing assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=max_tokens
-        )
-        
-        return {
-            "response": response.choices[0].message.content,
-            "tokens_used": response.usage.total_tokens
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    messages = [
+        {"role": "system", "content": AI_ASSISTANT_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    
+    if not stream:
+        try:
+            started = time.perf_counter()
+            response = await client.chat.completions.create(
+                model=AI_ASSISTANT_MODEL,
+                messages=messages,
+                max_tokens=max_tokens
+            )
+            return {
+                "response": response.choices[0].message.content,
+                "tokens_used": response.usage.total_tokens,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    async def events():
+        started = time.perf_counter()
+        first_token_at = None
+        usage = None
+        try:
+            completion = await client.chat.completions.create(
+                model=AI_ASSISTANT_MODEL,
+                messages=messages,
+                max_tokens=max_tokens,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            async for chunk in completion:
+                if chunk.usage is not None:
+                    usage = chunk.usage.total_tokens
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    yield _sse("token", {"token": token})
+        except Exception as e:
+            yield _sse("error", {"detail": str(e)})
+            return
+        finished = time.perf_counter()
+        yield _sse("done", {
+            "tokens_used": usage,
+            "ttft_ms": round((first_token_at - started) * 1000, 1) if first_token_at else None,
+            "total_ms": round((finished - started) * 1000, 1)
+        })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Image to 3D using Hugging Face Spaces (TripoSR or InstantMesh)
 @app.post("/api/image-to-3d")
@@ -201,55 +311,114 @@ async def image_to_3d(request: Image3DRequest):
     Returns a URL to download the GLB file
     """
     try:
-        image_path = None
-        
-        async with httpx.AsyncClient(timeout=60.0) as http_client:
-            response = await http_client.get(request.image_url)
-            if response.status_code != 200:
-                raise HTTPException(status_code=400, detail="Failed to fetch image")
-        
-        import tempfile
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-            tmp.write(response.content)
-            image_path = tmp.name
+        response = await http_pool.get_client().get(request.image_url)
+        if response.status_code != 200:
+            raise HTTPException(status_code=400, detail="Failed to fetch image")
         
-        # Use TripoSR for 3D generation
-        # TripoSR is fast and produces good results
-        tripo_client = Client("stabilityai/TripoSR")
+        # Crop to the subject and shrink to TripoSR's input size before uploading
+        image_bytes, preprocessing = await prepare_model_input(response.content, "triposr")
         
-        result = tripo_client.predict(
-            image_path,  # Input image
-            True,        # Remove background (already done but let it handle edge cases)
-            0.5,         # Foreground ratio
-            api_name="/run"
-        )
-        
-        # Clean up temp file
-        if image_path and os.path.exists(image_path):
-            os.unlink(image_path)
-        
-        # Result should be a path to the GLB file
-        # Read and return as base64 or provide download
-        if result and len(result) > 1:
-            glb_path = result[1]  # GLB file path
+        # The upload and TripoSR's downloaded results share one scratch directory, removed on exit
+        async with scratch_space.directory() as scratch:
+            image_path = scratch / f"input.{preprocessing['format']}"
+            image_path.write_bytes(image_bytes)
+            
+            # Use TripoSR for 3D generation
+            # TripoSR is fast and produces good results
+            tripo_client = Client("stabilityai/TripoSR", download_files=str(scratch))
             
-            with open(glb_path, "rb") as f:
-                glb_bytes = f.read()
+            result = tripo_client.predict(
+                str(image_path),  # Input image
+                not preprocessing["transparent"],  # Remove background unless the input was already cut out
+                0.5,         # Foreground ratio
+                api_name="/run"
+            )
             
-            glb_base64 = base64.b64encode(glb_bytes).decode('utf-8')
+            # Result should be a path to the GLB file
+            glb_bytes = None
+            if result and len(result) > 1:
+                with open(result[1], "rb") as f:
+                    glb_bytes = f.read()
+        
+        # Read and return as base64 or provide download
+        if glb_bytes:
+            optimized, optimization = await optimize_model(glb_bytes)
+            lods = await store_model_lods(glb_bytes, optimized)
             
             return {
                 "success": True,
-                "glb_base64": glb_base64,
+                "glb_base64": await cpu_pool.encode_base64(optimized) if request.include_glb or not lods.get("levels") else None,
+                "preprocessing": preprocessing,
+                "optimization": optimization,
+                "lods": lods,
                 "message": "3D model generated successfully"
             }
         else:
             raise HTTPException(status_code=500, detail="3D generation returned no result")
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"3D generation failed: {str(e)}")
 
 
+# GLB inspection (TripoSR / Hunyuan3D output)
+def _inspect_glb_file(fileobj) -> dict:
+    with open_glb(fileobj) as glb:
+        return glb.inspect()
+
+@app.post("/api/glb/inspect")
+async def inspect_glb(file: UploadFile = File(...)):
+    """
+    Report vertex/triangle counts, bounds, materials and texture sizes of an
+    uploaded GLB without decoding its buffers
+    """
+    started = time.perf_counter()
+    try:
+        # Large uploads are spooled to disk, so the parser can mmap them instead of reading them in
+        report = await asyncio.to_thread(_inspect_glb_file, file.file)
+    except GLBError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid GLB: {e}")
+    report["inspect_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return report
+
+# Generated models and their LOD chains
+MODEL_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+def _immutable_file(path, etag: str, media_type: str, if_none_match: Optional[str]):
+    # Model ids are content hashes, so stored files never change
+    if if_none_match and etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": MODEL_CACHE_CONTROL})
+    return FileResponse(path, media_type=media_type, headers={"ETag": etag, "Cache-Control": MODEL_CACHE_CONTROL})
+
+@app.get("/api/models/{model_id}")
+async def get_model(model_id: str):
+    """
+    Levels of a generated model, coarsest first, so viewers can render the
+    smallest one immediately and upgrade as finer levels arrive
+    """
+    manifest = load_manifest(model_id)
+    if not manifest:
+        raise HTTPException(status_code=404, detail="Model not found")
+    return describe(manifest)
+
+@app.get("/api/models/{model_id}/lod/{level}")
+async def get_model_lod(model_id: str, level: int, if_none_match: Optional[str] = Header(None)):
+    """One level of a generated model's LOD chain (0 is full resolution)"""
+    manifest = load_manifest(model_id)
+    if not manifest or not any(entry["level"] == level for entry in manifest["levels"]):
+        raise HTTPException(status_code=404, detail="Model level not found")
+    return _immutable_file(level_path(model_id, level), f'"{model_id}-{level}"', "model/gltf-binary", if_none_match)
+
+@app.get("/api/models/{model_id}/thumbnail.{image_format}")
+async def get_model_thumbnail(model_id: str, image_format: str, if_none_match: Optional[str] = Header(None)):
+    """Software-rendered preview: a PNG still or an animated WebP turntable"""
+    manifest = load_manifest(model_id)
+    if not manifest or image_format not in manifest.get("thumbnails", {}):
+        raise HTTPException(status_code=404, detail="Model thumbnail not found")
+    return _immutable_file(thumbnail_path(model_id, image_format), f'"{model_id}-thumbnail-{image_format}"',
+                           THUMBNAIL_TYPES[image_format], if_none_match)
+
 # Combined pipeline endpoint
 @app.post("/api/pipeline/image-to-3d")
 async def full_pipeline(request: Image3DRequest):
@@ -287,9 +456,16 @@ async def generate_character_image(request: CharacterGenerationRequest):
             t_pose=request.generate_t_pose
         )
         
+        # Providers return PNG/JPEG; re-encode before it is base64'd into the response
+        encoded = await encode_generated_image(result["image_base64"], request.image_format)
+        
         return {
             "success": result["success"],
-            "image_base64": result["image_base64"],
+            "image_base64": encoded["image_base64"],
+            "mime_type": encoded["mime_type"],
+            "preview_base64": encoded["preview_base64"],
+            "preview_mime_type": encoded["preview_mime_type"],
+            "encoding": encoded["report"],
             "enhanced_prompt": result["enhanced_prompt"],
             "original_prompt": result["original_prompt"],
             "theme_analysis": theme_data,
@@ -322,6 +498,8 @@ async def rig_3d_model(request: RigModelRequest):
             method=request.rigging_method
         )
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -357,6 +535,28 @@ async def get_stats():
         "last_updated": datetime.now().isoformat()
     }
 
+# Outbound connection pool statistics
+@app.get("/api/stats/http")
+async def get_http_stats():
+    """
+    Get connection reuse statistics for the shared HTTP clients
+    """
+    return http_pool.connection_stats()
+
+@app.get("/api/stats/cpu")
+async def get_cpu_stats():
+    """
+    Get inline and process-pool time per CPU-bound function
+    """
+    return cpu_pool.stats()
+
+@app.get("/api/stats/scratch")
+async def get_scratch_stats():
+    """
+    Get quota, usage and sweeper statistics for the request scratch space
+    """
+    return scratch_space.stats()
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
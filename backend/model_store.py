@@ -0,0 +1,120 @@
+"""
+On-disk store for generated 3D models and their LOD chains
+
+Each model lives in MODEL_STORE_DIR/<model_id>/: lod0.glb is the optimized
+full-resolution model, lod1.glb ... lodN.glb are progressively coarser,
+thumbnail.png / thumbnail.webp are software-rendered previews, and
+manifest.json is written last so a half-built model is never listed. Model
+ids are content hashes of the generated GLB, so stored files never change
+and can be cached by clients indefinitely.
+"""
+import os
+import re
+import json
+import uuid
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+from glb import GLB
+from glb_lod import build_lods
+from glb_thumbnail import thumbnails
+
+MODEL_STORE_DIR = Path(os.getenv("MODEL_STORE_DIR", os.path.join(tempfile.gettempdir(), "generated_models")))
+MODEL_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+THUMBNAIL_TYPES = {"png": "image/png", "webp": "image/webp"}
+
+
+def _write_atomic(path: Path, data: bytes):
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def level_path(model_id: str, level: int) -> Path:
+    return MODEL_STORE_DIR / model_id / f"lod{level}.glb"
+
+
+def thumbnail_path(model_id: str, image_format: str) -> Path:
+    return MODEL_STORE_DIR / model_id / f"thumbnail.{image_format}"
+
+
+def _write_thumbnails(model_id: str, data: bytes) -> Dict[str, int]:
+    sizes = {}
+    for image_format, image in thumbnails(data).items():
+        _write_atomic(thumbnail_path(model_id, image_format), image)
+        sizes[image_format] = len(image)
+    return sizes
+
+
+def _add_thumbnails(manifest: Dict, data: bytes):
+    """Render thumbnails into the manifest; a model that can't be previewed is still stored"""
+    try:
+        manifest["thumbnails"] = _write_thumbnails(manifest["model_id"], data)
+    except Exception as e:
+        manifest["thumbnails"] = {}
+        manifest["thumbnail_error"] = str(e)
+
+
+def _write_manifest(manifest: Dict):
+    _write_atomic(MODEL_STORE_DIR / manifest["model_id"] / "manifest.json", json.dumps(manifest).encode("utf-8"))
+
+
+def load_manifest(model_id: str) -> Optional[Dict]:
+    if not MODEL_ID_PATTERN.match(model_id):
+        return None
+    try:
+        return json.loads((MODEL_STORE_DIR / model_id / "manifest.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def store_model(source: bytes, optimized: Optional[bytes] = None) -> Dict:
+    """
+    Save a generated model, render its thumbnails and build its LOD chain
+
+    Args:
+        source: GLB as generated (float attributes; LODs are simplified from this)
+        optimized: Optimized full-resolution GLB to serve as level 0 (defaults to source)
+
+    Returns:
+        Manifest with the model id, one entry per level (finest first) and
+        the byte size of each thumbnail format
+    """
+    model_id = hashlib.sha256(source).hexdigest()[:32]
+    existing = load_manifest(model_id)
+    if existing:
+        if "thumbnails" not in existing:
+            # Stored before thumbnails existed; render them from the full-resolution level
+            _add_thumbnails(existing, level_path(model_id, 0).read_bytes())
+            _write_manifest(existing)
+        return existing
+
+    full = optimized or source
+    (MODEL_STORE_DIR / model_id).mkdir(parents=True, exist_ok=True)
+    manifest = {"model_id": model_id, "levels": []}
+
+    levels = [(full, {"triangles": GLB(full).inspect()["triangle_count"]})]
+    levels += [(lod, {"triangles": report["triangles"]}) for lod, report in build_lods(source)]
+    for level, (data, info) in enumerate(levels):
+        _write_atomic(level_path(model_id, level), data)
+        manifest["levels"].append({"level": level, "triangles": info["triangles"], "bytes": len(data)})
+    # After the levels, so a model the renderer can't handle is still viewable
+    _add_thumbnails(manifest, full)
+    _write_manifest(manifest)
+    return manifest
+
+
+def describe(manifest: Dict) -> Dict:
+    """Manifest for clients: levels coarsest first and thumbnails, each with its download URL"""
+    model_id = manifest["model_id"]
+    levels = sorted(manifest["levels"], key=lambda level: -level["level"])
+    described = {
+        "model_id": model_id,
+        "levels": [dict(level, url=f"/api/models/{model_id}/lod/{level['level']}") for level in levels],
+        "thumbnails": {image_format: f"/api/models/{model_id}/thumbnail.{image_format}"
+                       for image_format in manifest.get("thumbnails", {})},
+    }
+    if "thumbnail_error" in manifest:
+        described["thumbnail_error"] = manifest["thumbnail_error"]
+    return described
@@ -0,0 +1,31 @@
+"""
+Shared AsyncOpenAI client
+
+A single client (and therefore a single pooled connection set) is reused
+for every OpenAI request made by the API. OPENAI_BASE_URL is honoured by
+the SDK, so pointing it at app/openai_stub.py runs everything offline.
+"""
+import os
+from typing import Optional
+from openai import AsyncOpenAI
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def get_openai_client() -> Optional[AsyncOpenAI]:
+    """Return the shared client, or None when OPENAI_API_KEY is not configured"""
+    global _client
+    if _client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            return None
+        _client = AsyncOpenAI(api_key=api_key)
+    return _client
+
+
+async def close_openai_client():
+    """Close the shared client (called from the app lifespan)"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,157 @@
+"""
+Size-capped page fetcher with an on-disk HTTP cache
+
+Pages are streamed through the shared "pages" client with connect/read
+timeouts, decoded incrementally and aborted once they exceed a maximum
+size. Responses are cached on local disk together with their validators
+(ETag / Last-Modified), so analyzing the same URL again costs either
+nothing (still fresh) or a single conditional request (304).
+"""
+import os
+import re
+import json
+import time
+import codecs
+import asyncio
+import hashlib
+import tempfile
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+from fastapi import HTTPException
+import httpx
+import http_pool
+
+PAGE_MAX_BYTES = int(os.getenv("PAGE_MAX_BYTES", str(5 * 1024 * 1024)))
+# Freshness used when the server does not send Cache-Control max-age
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "300"))
+PAGE_CACHE_DIR = Path(os.getenv("PAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "page_cache")))
+PAGE_HEADERS = {"User-Agent": "Mozilla/5.0", "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.8"}
+
+
+class FetchedPage:
+    def __init__(self, url: str, text: str, status_code: int, cache: str):
+        self.url = url
+        self.text = text
+        self.status_code = status_code
+        # "hit" (served without a request), "revalidated" (304) or "miss"
+        self.cache = cache
+
+
+def _cache_paths(url: str, user_agent: str):
+    # Sites serve different markup to different agents, so each agent gets its own entry
+    key = hashlib.sha256(f"{user_agent}\n{url}".encode()).hexdigest()
+    return PAGE_CACHE_DIR / f"{key}.json", PAGE_CACHE_DIR / f"{key}.html"
+
+
+def _freshness(headers: httpx.Headers) -> Optional[int]:
+    """Seconds the response may be reused without revalidation, or None if it must not be stored"""
+    cache_control = headers.get("cache-control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return 0
+    match = re.search(r"max-age=(\d+)", cache_control)
+    if match:
+        return int(match.group(1))
+    return PAGE_CACHE_TTL
+
+
+def _load_meta(meta_path: Path) -> Optional[Dict]:
+    try:
+        return json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _store(url: str, user_agent: str, response: httpx.Response, text: str, max_age: int):
+    meta_path, body_path = _cache_paths(url, user_agent)
+    PAGE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    _atomic_write(body_path, text)
+    _write_meta(meta_path, {
+        "url": url,
+        "status_code": response.status_code,
+        "etag": response.headers.get("etag"),
+        "last_modified": response.headers.get("last-modified"),
+        "stored_at": time.time(),
+        "max_age": max_age,
+    })
+
+
+def _write_meta(meta_path: Path, meta: Dict):
+    _atomic_write(meta_path, json.dumps(meta))
+
+
+def _atomic_write(path: Path, text: str):
+    tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def _encoding_for(response: httpx.Response) -> str:
+    encoding = response.charset_encoding or "utf-8"
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        encoding = "utf-8"
+    return encoding
+
+
+async def iter_text(response: httpx.Response, max_bytes: int = PAGE_MAX_BYTES) -> AsyncIterator[str]:
+    """Decode a streamed response incrementally, enforcing the size cap on the decompressed body"""
+    declared = response.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Page exceeds {max_bytes} bytes")
+
+    decoder = codecs.getincrementaldecoder(_encoding_for(response))(errors="replace")
+    received = 0
+    async for chunk in response.aiter_bytes():
+        received += len(chunk)
+        if received > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Page exceeds {max_bytes} bytes")
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def fetch_page(url: str, max_bytes: int = PAGE_MAX_BYTES, user_agent: Optional[str] = None) -> FetchedPage:
+    """Fetch a page as text, using the disk cache and conditional requests where possible"""
+    user_agent = user_agent or PAGE_HEADERS["User-Agent"]
+    meta_path, body_path = _cache_paths(url, user_agent)
+    meta = _load_meta(meta_path) if body_path.exists() else None
+
+    if meta and time.time() - meta["stored_at"] < meta["max_age"]:
+        text = await asyncio.to_thread(body_path.read_text, encoding="utf-8")
+        return FetchedPage(url, text, meta["status_code"], "hit")
+
+    headers = dict(PAGE_HEADERS, **{"User-Agent": user_agent})
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    client = http_pool.get_client("pages")
+    try:
+        async with client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and meta:
+                meta["stored_at"] = time.time()
+                max_age = _freshness(response.headers)
+                if max_age is not None:
+                    meta["max_age"] = max_age
+                await asyncio.to_thread(_write_meta, meta_path, meta)
+                text = await asyncio.to_thread(body_path.read_text, encoding="utf-8")
+                return FetchedPage(url, text, meta["status_code"], "revalidated")
+
+            text = "".join([part async for part in iter_text(response, max_bytes)])
+            max_age = _freshness(response.headers)
+            if response.status_code == 200 and max_age is not None:
+                await asyncio.to_thread(_store, url, user_agent, response, text, max_age)
+            return FetchedPage(url, text, response.status_code, "miss")
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail=f"Timed out fetching {url}")
+    except httpx.HTTPError as e:
+        raise HTTPException(status_code=502, detail=f"Failed to fetch {url}: {e}")
@@ -0,0 +1,224 @@
+"""
+Per-request scratch directories, in RAM where possible
+
+Files exchanged with the Gradio Spaces (uploaded inputs and downloaded
+results) live in one directory per request under SCRATCH_ROOT. That root is
+/dev/shm when it is writable and has room for the whole quota, so the files
+never touch the disk, and the system temp dir otherwise (Docker gives
+containers a 64 MB /dev/shm unless started with --shm-size). The quota is
+also capped at the free space of the root, so it can't promise more than
+the filesystem holds.
+
+scratch_space.directory() removes the directory however the request ends.
+A byte quota applies back-pressure: each directory reserves an estimate up
+front, and callers wait for space rather than filling RAM. A background
+sweeper removes directories orphaned by crashed workers.
+"""
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+from collections import deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Deque, Optional, Set
+from fastapi import HTTPException
+
+
+# Bytes all live scratch directories of one worker may reserve together
+SCRATCH_QUOTA_BYTES = int(os.getenv("SCRATCH_QUOTA_MB", "512")) * 1024 * 1024
+
+
+def _free_bytes(path: Path) -> Optional[int]:
+    """Space available to unprivileged writers on the filesystem holding path (or its nearest existing parent)"""
+    path = Path(path)
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    try:
+        stat = os.statvfs(path)
+    except OSError:
+        return None
+    return stat.f_bavail * stat.f_frsize
+
+
+def _default_root() -> Path:
+    shm = Path("/dev/shm")
+    in_memory = shm.is_dir() and os.access(shm, os.W_OK) and (_free_bytes(shm) or 0) >= SCRATCH_QUOTA_BYTES
+    base = shm if in_memory else Path(tempfile.gettempdir())
+    return base / "silenttrendfarm-scratch"
+
+
+SCRATCH_ROOT = Path(os.getenv("SCRATCH_DIR") or _default_root())
+# Default reservation per directory: an input image plus a generated GLB
+SCRATCH_RESERVE_BYTES = 64 * 1024 * 1024
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _tree_size(path: Path) -> int:
+    total = 0
+    for directory, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(directory, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _remove_tree(path: Path) -> int:
+    """Delete a directory tree and return the bytes it held"""
+    size = _tree_size(path)
+    shutil.rmtree(path, ignore_errors=True)
+    return size
+
+
+class ScratchSpace:
+    """Scratch directories under one root, with a byte quota and an orphan sweeper.
+
+    Directory names start with the owning process id, so workers sharing the root can tell
+    live directories from those of processes that have died. The sweeper removes directories
+    of dead processes and anything not in use by this process that is older than max_age.
+    """
+
+    def __init__(self, root: Path = SCRATCH_ROOT, quota_bytes: int = SCRATCH_QUOTA_BYTES,
+                 reserve_bytes: int = SCRATCH_RESERVE_BYTES, wait_timeout: float = 30.0,
+                 sweep_interval: float = 300.0, max_age: float = 3600.0):
+        self.root = root
+        free = _free_bytes(root)
+        # Waiting for quota is better than failing with ENOSPC halfway through a download
+        self.quota_bytes = min(quota_bytes, free) if free is not None else quota_bytes
+        self.reserve_bytes = reserve_bytes
+        self.wait_timeout = wait_timeout
+        self.sweep_interval = sweep_interval
+        self.max_age = max_age
+        self._reserved = 0
+        self._active: Set[Path] = set()
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self.created = 0
+        self.waited = 0
+        self.rejected = 0
+        self.swept = 0
+        self.largest_bytes = 0
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _reserve(self, size: int):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        if self._reserved + size > self.quota_bytes:
+            self.waited += 1
+        while self._reserved + size > self.quota_bytes:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                self.rejected += 1
+                raise HTTPException(status_code=503, detail="Scratch space is busy, try again shortly")
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+        self._reserved += size
+
+    def _release(self, size: int):
+        self._reserved -= size
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def directory(self, reserve_bytes: Optional[int] = None) -> AsyncIterator[Path]:
+        """
+        A fresh directory that is deleted when the block exits
+
+        Args:
+            reserve_bytes: Expected peak size of the directory's contents
+                (defaults to reserve_bytes; capped at the quota)
+        """
+        self._ensure_running()
+        size = min(reserve_bytes or self.reserve_bytes, self.quota_bytes)
+        await self._reserve(size)
+        path = None
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            path = Path(tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=self.root))
+            self._active.add(path)
+            self.created += 1
+            yield path
+        finally:
+            try:
+                if path is not None:
+                    self._active.discard(path)
+                    # Walking and deleting a tree of model files blocks, so keep it off the event loop
+                    self.largest_bytes = max(self.largest_bytes, await asyncio.to_thread(_remove_tree, path))
+            finally:
+                # Also when cancelled while waiting for the thread (which still finishes the delete)
+                self._release(size)
+
+    def sweep(self) -> int:
+        """Remove orphaned directories and return how many were removed"""
+        if not self.root.is_dir():
+            return 0
+        removed = 0
+        now = time.time()
+        for entry in self.root.iterdir():
+            if entry in self._active or not entry.is_dir():
+                continue
+            try:
+                pid = int(entry.name.split("-", 1)[0])
+                age = now - entry.stat().st_mtime
+            except (ValueError, OSError):
+                continue
+            if age < self.max_age and _process_alive(pid):
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            removed += 1
+        self.swept += removed
+        return removed
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "root": str(self.root),
+            "in_memory": str(self.root).startswith("/dev/shm"),
+            "quota_bytes": self.quota_bytes,
+            "reserved_bytes": self._reserved,
+            "active_directories": len(self._active),
+            "waiting": sum(not waiter.done() for waiter in self._waiters),
+            "created": self.created,
+            "waited": self.waited,
+            "rejected": self.rejected,
+            "swept": self.swept,
+            "largest_directory_bytes": self.largest_bytes,
+        }
+
+    async def _run(self):
+        # The first sweep clears what earlier runs of the server left behind
+        while True:
+            await asyncio.to_thread(self.sweep)
+            await asyncio.sleep(self.sweep_interval)
+
+
+scratch_space = ScratchSpace()
@@ -0,0 +1,132 @@
+"""
+Single-pass SEO extractor built on the incremental stdlib HTMLParser
+
+Collects the title, description/keywords meta tags, H1s and the first N
+H2s while counting words on the fly, without building a DOM or a text
+blob. In meta-only mode parsing stops as soon as </head> (or <body>) is
+reached.
+"""
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+# Text inside these elements is not visible page copy
+SKIPPED_TEXT_TAGS = {"script", "style", "noscript", "template"}
+CAPTURED_TAGS = {"title", "h1", "h2"}
+FEED_CHUNK_SIZE = 16 * 1024
+
+
+class SeoExtractor(HTMLParser):
+    def __init__(self, max_h2: int = 5, meta_only: bool = False):
+        super().__init__(convert_charrefs=True)
+        self.max_h2 = max_h2
+        self.meta_only = meta_only
+        self.title: Optional[str] = None
+        self.description = ""
+        self.keywords = ""
+        self.h1_tags: List[str] = []
+        self.h2_tags: List[str] = []
+        self.word_count = 0
+        self.done = False
+        self._skip_depth = 0
+        self._captures: List[tuple] = []  # (tag, text parts) for open title/h1/h2 elements
+        self._in_word = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if tag == "body" and self.meta_only:
+            self.done = True
+            return
+        if tag in SKIPPED_TEXT_TAGS:
+            self._skip_depth += 1
+        elif tag == "meta":
+            self._handle_meta(attrs)
+        elif tag in CAPTURED_TAGS:
+            wanted = (
+                (tag == "title" and self.title is None)
+                or (tag == "h1" and not self.meta_only)
+                or (tag == "h2" and not self.meta_only and len(self.h2_tags) < self.max_h2)
+            )
+            if wanted:
+                self._captures.append((tag, []))
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == "meta" and not self.done:
+            self._handle_meta(attrs)
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag == "head" and self.meta_only:
+            self.done = True
+            return
+        if tag in SKIPPED_TEXT_TAGS:
+            self._skip_depth = max(self._skip_depth - 1, 0)
+        elif tag in CAPTURED_TAGS:
+            # Close the innermost open capture for this tag
+            for i in range(len(self._captures) - 1, -1, -1):
+                if self._captures[i][0] == tag:
+                    _, parts = self._captures.pop(i)
+                    text = "".join(parts)
+                    if tag == "title":
+                        self.title = text
+                    elif tag == "h1":
+                        self.h1_tags.append(text)
+                    elif len(self.h2_tags) < self.max_h2:
+                        self.h2_tags.append(text)
+                    break
+
+    def handle_data(self, data):
+        if self.done or self._skip_depth:
+            return
+        for _, parts in self._captures:
+            parts.append(data)
+        if self.meta_only or not data:
+            return
+        # Count whitespace-separated runs; a run split across two data events is counted once
+        words = len(data.split())
+        if words and self._in_word and not data[0].isspace():
+            words -= 1
+        self.word_count += words
+        self._in_word = not data[-1].isspace()
+
+    def _handle_meta(self, attrs):
+        attr_map = {name.lower(): value or "" for name, value in attrs}
+        name = attr_map.get("name", "").lower()
+        if name == "description" and not self.description:
+            self.description = attr_map.get("content", "")
+        elif name == "keywords" and not self.keywords:
+            self.keywords = attr_map.get("content", "")
+
+    def feed_text(self, text: str) -> "SeoExtractor":
+        """Feed a document in chunks, stopping as soon as the extractor is done"""
+        for start in range(0, len(text), FEED_CHUNK_SIZE):
+            if self.done:
+                break
+            self.feed(text[start:start + FEED_CHUNK_SIZE])
+        if not self.done:
+            self.close()
+        return self
+
+    def meta_data(self) -> Dict:
+        return {
+            "title": self.title or "",
+            "description": self.description,
+            "keywords": self.keywords,
+            "h1_tags": self.h1_tags,
+            "h2_tags": self.h2_tags,
+        }
+
+
+def extract_seo(html: str, max_h2: int = 5, meta_only: bool = False) -> SeoExtractor:
+    """Run the extractor over a whole document"""
+    return SeoExtractor(max_h2=max_h2, meta_only=meta_only).feed_text(html)
+
+
+def summarize_seo(html: str, max_h2: int = 5, meta_only: bool = False, extract_meta: bool = True) -> Dict:
+    """extract_seo() reduced to the fields analyze_url returns (picklable, for cpu_pool workers)"""
+    extractor = extract_seo(html, max_h2=max_h2, meta_only=meta_only)
+    return {
+        "meta_data": extractor.meta_data() if extract_meta or meta_only else {},
+        "word_count": None if meta_only else extractor.word_count,
+    }
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Let the tests import backend modules (main, app.*) however pytest is started
+sys.path.insert(0, str(Path(__file__).parent.parent))
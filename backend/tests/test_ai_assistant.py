@@ -0,0 +1,65 @@
+"""/api/ai-assistant through the shared AsyncOpenAI client, answered by app/openai_stub.py"""
+import json
+import socket
+import threading
+import time
+
+import pytest
+import uvicorn
+from fastapi.testclient import TestClient
+
+import main
+import openai_client
+from app import openai_stub
+
+
+@pytest.fixture(scope="module")
+def stub_base_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(openai_stub.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+    thread.join()
+
+
+@pytest.fixture
+def client(monkeypatch, stub_base_url):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_BASE_URL", stub_base_url)
+    monkeypatch.setattr(openai_stub, "FIRST_TOKEN_DELAY", 0.0)
+    monkeypatch.setattr(openai_stub, "TOKEN_DELAY", 0.0)
+    monkeypatch.setattr(openai_client, "_client", None)
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+def test_completion(client):
+    response = client.post("/api/ai-assistant", params={"prompt": "hello there", "max_tokens": 8})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["response"].startswith("Mock reply to: hello there")
+    assert len(body["response"].split()) == 8
+    assert body["tokens_used"] > 8
+
+
+def test_streamed_completion(client):
+    response = client.post("/api/ai-assistant", params={"prompt": "hello there", "max_tokens": 8, "stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    tokens = [data["token"] for event, data in events if event == "token"]
+    assert "".join(tokens).startswith("Mock reply to: hello there")
+    assert len(tokens) == 8
+    event, done = events[-1]
+    assert event == "done"
+    # Usage arrives in the final chunk requested with stream_options
+    assert done["tokens_used"] > 8
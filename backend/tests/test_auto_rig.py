@@ -0,0 +1,76 @@
+"""rig_glb on the benchmark's synthetic T-pose humanoid"""
+import json
+
+import numpy as np
+import pytest
+
+from auto_rig import BONE_NAMES, rig_glb
+from benchmarks.auto_rig_bench import build_humanoid_glb
+from glb import GLB, GLBError, pack_glb, world_matrices
+
+
+@pytest.fixture(scope="module")
+def placed_humanoid() -> bytes:
+    """The humanoid on a moved and scaled node, so the rig has a node transform to fold in"""
+    glb = GLB(build_humanoid_glb(8000))
+    document = json.loads(json.dumps(glb.json))
+    document["nodes"][0].update(translation=[2.0, 0.5, -1.0], scale=[1.5, 1.5, 1.5])
+    return pack_glb(document, bytes(glb.bin))
+
+
+def test_rig_adds_valid_skin_attributes(placed_humanoid):
+    rigged, metadata = rig_glb(placed_humanoid)
+    glb = GLB(rigged)
+    primitive = glb.json["meshes"][0]["primitives"][0]
+    joints = glb.accessor(primitive["attributes"]["JOINTS_0"])
+    weights = glb.accessor(primitive["attributes"]["WEIGHTS_0"]).astype(np.int64)
+
+    assert metadata["bones"] == BONE_NAMES and len(glb.json["skins"][0]["joints"]) == len(BONE_NAMES)
+    assert joints.max() < len(BONE_NAMES)
+    # Normalized uint8 weights of each vertex add up to exactly 1.0
+    assert (weights.sum(axis=1) == 255).all()
+    # The original attributes are carried over untouched
+    source = GLB(placed_humanoid)
+    np.testing.assert_array_equal(glb.accessor(primitive["attributes"]["POSITION"]), source.accessor(0))
+
+
+def test_bind_pose_reproduces_the_placed_mesh(placed_humanoid):
+    rigged, _ = rig_glb(placed_humanoid)
+    glb = GLB(rigged)
+    node_index = next(i for i, n in enumerate(glb.json["nodes"]) if "skin" in n)
+    skin = glb.json["skins"][glb.json["nodes"][node_index]["skin"]]
+    primitive = glb.json["meshes"][0]["primitives"][0]
+    local = glb.accessor(primitive["attributes"]["POSITION"]).astype(np.float64)
+    joints = glb.accessor(primitive["attributes"]["JOINTS_0"]).astype(np.int64)
+    weights = glb.accessor(primitive["attributes"]["WEIGHTS_0"]) / 255.0
+
+    world = world_matrices(glb.json)
+    inverse_bind = glb.accessor(skin["inverseBindMatrices"]).reshape(-1, 4, 4).transpose(0, 2, 1)
+    joint_matrices = np.stack([world[j] for j in skin["joints"]]) @ inverse_bind
+    homogeneous = np.c_[local, np.ones(len(local))]
+    skinned = np.einsum("vk,vkij,vj->vi", weights, joint_matrices[joints], homogeneous)[:, :3]
+
+    placed = local * 1.5 + [2.0, 0.5, -1.0]
+    np.testing.assert_allclose(skinned, placed, atol=1e-4)
+
+
+def test_dominant_bones_follow_the_body(placed_humanoid):
+    rigged, _ = rig_glb(placed_humanoid)
+    glb = GLB(rigged)
+    primitive = glb.json["meshes"][0]["primitives"][0]
+    positions = glb.accessor(primitive["attributes"]["POSITION"])
+    joints = glb.accessor(primitive["attributes"]["JOINTS_0"])
+
+    def dominant(probe):
+        return BONE_NAMES[joints[np.argmin(np.linalg.norm(positions - probe, axis=1)), 0]]
+
+    assert dominant((0, 1.78, 0)) == "head"
+    assert dominant((0.85, 1.45, 0)) in ("forearm_l", "hand_l")
+    assert dominant((-0.1, 0.5, 0.05)) in ("thigh_r", "shin_r")
+    assert dominant((0.1, 0.02, 0.12)) in ("shin_l", "foot_l")
+
+
+def test_already_skinned_model_is_rejected(placed_humanoid):
+    rigged, _ = rig_glb(placed_humanoid)
+    with pytest.raises(GLBError, match="already skinned"):
+        rig_glb(rigged)
@@ -0,0 +1,43 @@
+"""convert_to_3d_hunyuan input validation and TripoSR fallback errors, with the Spaces mocked out"""
+import asyncio
+import base64
+import io
+
+import pytest
+from fastapi import HTTPException
+from PIL import Image
+
+import character_pipeline
+
+
+def png_base64() -> str:
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 80, 40)).save(buffer, "PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def failing_client(error: Exception):
+    class Client:
+        def __init__(self, *args, **kwargs):
+            raise error
+    return Client
+
+
+def test_invalid_base64_is_a_client_error():
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(character_pipeline.convert_to_3d_hunyuan("not base64!"))
+    assert excinfo.value.status_code == 400
+
+
+def test_service_failures_are_reported(monkeypatch):
+    monkeypatch.setattr(character_pipeline, "Client", failing_client(ValueError("Space is sleeping")))
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(character_pipeline.convert_to_3d_hunyuan(png_base64()))
+    assert excinfo.value.status_code == 500
+    assert "TripoSR fallback: Space is sleeping" in excinfo.value.detail
+
+
+def test_bugs_in_the_fallback_are_not_swallowed(monkeypatch):
+    monkeypatch.setattr(character_pipeline, "Client", failing_client(TypeError("unexpected keyword")))
+    with pytest.raises(TypeError):
+        asyncio.run(character_pipeline.convert_to_3d_hunyuan(png_base64()))
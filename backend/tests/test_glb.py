@@ -0,0 +1,63 @@
+"""GLB parsing and inspect() on valid, truncated and malformed files"""
+import json
+import struct
+
+import pytest
+
+from app.triposr_stub import build_stub_glb
+from glb import GLB, GLBError, pack_glb
+
+
+def rewrite_json(edit) -> bytes:
+    """The stub GLB with its JSON chunk edited, and POSITION bounds dropped so inspect() reads the data"""
+    glb = GLB(build_stub_glb())
+    document = json.loads(json.dumps(glb.json))
+    for accessor in document["accessors"]:
+        accessor.pop("min", None)
+        accessor.pop("max", None)
+    edit(document)
+    return pack_glb(document, bytes(glb.bin))
+
+
+def test_inspect_reports_the_stub_triangle():
+    for data in (build_stub_glb(), rewrite_json(lambda d: None)):
+        report = GLB(data).inspect()
+        assert report["vertex_count"] == 3
+        assert report["triangle_count"] == 1
+        assert report["bounds"]["max"] == [1.0, 1.0, 0.0]
+
+
+@pytest.mark.parametrize("data", [
+    b"glTF",
+    b"NOPE" + build_stub_glb()[4:],
+    build_stub_glb()[:-8],
+    # Header length fixed up, but the BIN chunk still claims its full size
+    (lambda d: d[:8] + struct.pack("<I", len(d) - 8) + d[12:-8])(build_stub_glb()),
+], ids=["short-header", "bad-magic", "truncated", "chunk-past-end"])
+def test_truncated_or_foreign_files_are_rejected(data):
+    with pytest.raises(GLBError):
+        GLB(data)
+
+
+def test_unparseable_or_non_object_json_is_rejected():
+    stub = build_stub_glb()
+    json_length = struct.unpack_from("<I", stub, 12)[0]
+    broken = stub[:20] + b"{" * json_length + stub[20 + json_length:]
+    with pytest.raises(GLBError, match="Invalid JSON"):
+        GLB(broken)
+    with pytest.raises(GLBError, match="not an object"):
+        GLB(pack_glb([1, 2, 3]))
+
+
+@pytest.mark.parametrize("edit", [
+    lambda d: d["meshes"][0]["primitives"][0]["attributes"].update(POSITION=42),
+    lambda d: d["accessors"][0].pop("componentType"),
+    lambda d: d["accessors"][0].update(count=10 ** 6),
+    lambda d: d["bufferViews"][0].update(buffer=3),
+    lambda d: d.update(meshes={"not": "a list"}),
+    lambda d: d["meshes"][0].update(primitives=[None]),
+], ids=["dangling-accessor", "missing-field", "count-past-view", "dangling-buffer", "wrong-type", "null-primitive"])
+def test_malformed_json_is_reported_as_glb_error(edit):
+    glb = GLB(rewrite_json(edit))
+    with pytest.raises(GLBError):
+        glb.inspect()
@@ -0,0 +1,71 @@
+"""build_lods on a closed mesh: triangle budgets, valid indices and no flipped faces"""
+import numpy as np
+
+from glb import GLB, BinWriter, pack_glb, ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER
+from glb_lod import LOD_LEVELS, MIN_TRIANGLES, build_lods
+
+
+def ellipsoid_glb(rings: int = 40, segments: int = 64) -> bytes:
+    """A closed, welded ellipsoid (convex, so every face must point away from its centre)"""
+    theta = np.linspace(0, np.pi, rings)
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    t, p = np.meshgrid(theta, phi, indexing="ij")
+    unit = np.stack([np.sin(t) * np.cos(p), np.cos(t), np.sin(t) * np.sin(p)], axis=-1).reshape(-1, 3)
+    unit[np.abs(unit) < 1e-9] = 0
+    radii = np.array([1.0, 2.0, 0.7])
+    normals = unit / radii
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+
+    r, s = np.meshgrid(np.arange(rings - 1), np.arange(segments), indexing="ij")
+    a = r * segments + s
+    b = r * segments + (s + 1) % segments
+    triangles = np.stack([a, b, a + segments, b, b + segments, a + segments], axis=-1).reshape(-1, 3)
+
+    gltf = {"asset": {"version": "2.0"}, "scenes": [{"nodes": [0]}], "nodes": [{"mesh": 0}]}
+    writer = BinWriter(views=gltf.setdefault("bufferViews", []), accessors=gltf.setdefault("accessors", []))
+    gltf["meshes"] = [{"primitives": [{
+        "attributes": {
+            "POSITION": writer.accessor((unit * radii).astype("<f4"), ARRAY_BUFFER, bounds=True),
+            "NORMAL": writer.accessor(normals.astype("<f4"), ARRAY_BUFFER),
+        },
+        "indices": writer.accessor(triangles.ravel().astype("<u4"), ELEMENT_ARRAY_BUFFER),
+    }]}]
+    binary = writer.binary()
+    gltf["buffers"] = [{"byteLength": len(binary)}]
+    return pack_glb(gltf, binary)
+
+
+def mesh_of(data: bytes):
+    glb = GLB(data)
+    primitive = glb.json["meshes"][0]["primitives"][0]
+    positions = glb.accessor(primitive["attributes"]["POSITION"]).astype(np.float64)
+    triangles = glb.accessor(primitive["indices"]).astype(np.int64).reshape(-1, 3)
+    return positions, triangles
+
+
+def all_outward(positions: np.ndarray, triangles: np.ndarray) -> bool:
+    """Whether every non-degenerate face's winding normal points away from the mesh centre"""
+    corners = positions[triangles]
+    face_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    # The unwelded pole rings of the source produce zero-area faces
+    solid = np.linalg.norm(face_normals, axis=1) > 1e-9
+    facing = np.einsum("ij,ij->i", face_normals, corners.mean(axis=1) - positions.mean(axis=0))
+    return bool((facing[solid] > 0).all())
+
+
+def test_lods_meet_their_budgets_without_flipping_faces():
+    source = ellipsoid_glb()
+    positions, triangles = mesh_of(source)
+    assert all_outward(positions, triangles)
+    original = len(triangles)
+
+    lods = build_lods(source)
+    assert len(lods) == len(LOD_LEVELS)
+    previous = original
+    for (lod, report), (ratio, _) in zip(lods, LOD_LEVELS):
+        positions, triangles = mesh_of(lod)
+        assert report["triangles"] == len(triangles) < previous
+        assert len(triangles) <= max(int(original * ratio), MIN_TRIANGLES)
+        assert triangles.min() >= 0 and triangles.max() < len(positions)
+        assert all_outward(positions, triangles)
+        previous = len(triangles)
@@ -0,0 +1,72 @@
+"""optimize_glb round trip: the optimized file parses back to the same surface"""
+import numpy as np
+
+from glb import GLB, BinWriter, pack_glb, world_matrices, ARRAY_BUFFER
+from glb_optimize import QUANTIZATION_EXTENSION, optimize_glb
+
+GRID = 24
+
+
+def soup_glb() -> bytes:
+    """A wavy height field exported as a triangle soup (every corner its own vertex), with normals and UVs"""
+    u, v = np.meshgrid(np.linspace(0, 1, GRID), np.linspace(0, 1, GRID), indexing="ij")
+    positions = np.stack([u * 4 - 1, np.sin(u * 6) * np.cos(v * 4) * 0.5, v * 3 + 2], axis=-1).reshape(-1, 3)
+    normals = np.tile([0.0, 1.0, 0.0], (len(positions), 1))
+    uvs = np.stack([u, v], axis=-1).reshape(-1, 2)
+    a = (np.arange(GRID - 1)[:, None] * GRID + np.arange(GRID - 1)[None, :]).ravel()
+    corners = np.stack([a, a + 1, a + GRID, a + 1, a + GRID + 1, a + GRID], axis=-1).reshape(-1)
+
+    gltf = {"asset": {"version": "2.0"}, "scenes": [{"nodes": [0]}], "nodes": [{"mesh": 0}]}
+    writer = BinWriter(views=gltf.setdefault("bufferViews", []), accessors=gltf.setdefault("accessors", []))
+    gltf["meshes"] = [{"primitives": [{"attributes": {
+        "POSITION": writer.accessor(positions[corners].astype("<f4"), ARRAY_BUFFER, bounds=True),
+        "NORMAL": writer.accessor(normals[corners].astype("<f4"), ARRAY_BUFFER),
+        "TEXCOORD_0": writer.accessor(uvs[corners].astype("<f4"), ARRAY_BUFFER),
+    }}]}]
+    binary = writer.binary()
+    gltf["buffers"] = [{"byteLength": len(binary)}]
+    return pack_glb(gltf, binary)
+
+
+def world_triangles(data: bytes) -> np.ndarray:
+    """Every triangle's corner positions in world space, shape (triangles, 3, 3)"""
+    glb = GLB(data)
+    matrices = world_matrices(glb.json)
+    out = []
+    for node_index, node in enumerate(glb.json["nodes"]):
+        if "mesh" not in node:
+            continue
+        for primitive in glb.json["meshes"][node["mesh"]]["primitives"]:
+            positions = glb.accessor(primitive["attributes"]["POSITION"]).astype(np.float64)
+            indices = (glb.accessor(primitive["indices"]).astype(np.int64) if "indices" in primitive
+                       else np.arange(len(positions)))
+            world = positions @ matrices[node_index][:3, :3].T + matrices[node_index][:3, 3]
+            out.append(world[indices.reshape(-1, 3)])
+    return np.concatenate(out)
+
+
+def test_optimized_glb_keeps_its_surface():
+    source = soup_glb()
+    optimized, report = optimize_glb(source)
+    assert report["bytes_after"] < report["bytes_before"]
+    assert QUANTIZATION_EXTENSION in GLB(optimized).json["extensionsUsed"]
+
+    before = GLB(source).inspect()
+    after = GLB(optimized).inspect()
+    # Welding leaves one vertex per grid point; no triangle is lost
+    assert after["vertex_count"] == report["vertices_after"] == GRID * GRID
+    assert after["triangle_count"] == before["triangle_count"] == 2 * (GRID - 1) ** 2
+
+    original, rewritten = world_triangles(source), world_triangles(optimized)
+    extent = np.ptp(original.reshape(-1, 3), axis=0).max()
+    step = extent / 65535
+    np.testing.assert_allclose(rewritten.reshape(-1, 3).min(axis=0), original.reshape(-1, 3).min(axis=0), atol=step)
+    np.testing.assert_allclose(rewritten.reshape(-1, 3).max(axis=0), original.reshape(-1, 3).max(axis=0), atol=step)
+
+    # Triangles are reordered, so compare the corner positions as sorted columns
+    assert len(rewritten) == len(original)
+    np.testing.assert_allclose(np.sort(rewritten.reshape(-1, 3), axis=0), np.sort(original.reshape(-1, 3), axis=0), atol=step)
+    # ...and the winding: the height field faces the same way before and after
+    def facing(triangles):
+        return np.sign(np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])[:, 1])
+    assert set(facing(rewritten)) == set(facing(original)) and len(set(facing(original))) == 1
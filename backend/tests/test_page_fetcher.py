@@ -0,0 +1,39 @@
+"""fetch_page's disk cache against a mocked site"""
+import asyncio
+
+import httpx
+import pytest
+
+import page_fetcher
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    monkeypatch.setattr(page_fetcher, "PAGE_CACHE_DIR", tmp_path)
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        agent = request.headers["user-agent"]
+        if request.headers.get("if-none-match") == f'"{agent}"':
+            return httpx.Response(304, headers={"cache-control": "no-cache"})
+        return httpx.Response(200, text=f"<p>{agent}</p>",
+                              headers={"etag": f'"{agent}"', "cache-control": "no-cache", "content-type": "text/html"})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(page_fetcher.http_pool, "get_client", lambda family: client)
+    return requests
+
+
+def fetch(user_agent=None):
+    return asyncio.run(page_fetcher.fetch_page("https://example.com/", user_agent=user_agent))
+
+
+def test_each_user_agent_gets_its_own_cache_entry(site):
+    assert fetch("Bot/1").text == "<p>Bot/1</p>"
+    desktop = fetch()
+    assert desktop.cache == "miss" and desktop.text == "<p>Mozilla/5.0</p>"
+
+    revalidated = fetch("Bot/1")
+    assert revalidated.cache == "revalidated" and revalidated.text == "<p>Bot/1</p>"
+    assert site[-1].headers["if-none-match"] == '"Bot/1"'
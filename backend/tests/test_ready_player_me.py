@@ -0,0 +1,91 @@
+"""The RPM router's GLB streaming and avatar lookup, against a mocked upstream"""
+import asyncio
+
+import httpx
+import pytest
+
+from app import ready_player_me as rpm
+
+
+class TrackedStream(httpx.AsyncByteStream):
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch):
+    monkeypatch.setattr(rpm, "RPM_CACHE_DIR", tmp_path)
+    stream = TrackedStream([b"glTF", b"-body"])
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, stream=stream)))
+    monkeypatch.setattr(rpm.http_pool, "get_client", lambda family: client)
+    return stream
+
+
+def serve_glb(disconnect_at=None) -> bytes:
+    """Stream a GLB through the ASGI response; the send call numbered disconnect_at fails like a dropped socket."""
+    sent = []
+
+    async def receive():
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if len(sent) == disconnect_at:
+            raise OSError("connection reset")
+        sent.append(message)
+
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+
+    async def run():
+        response = await rpm._stream_glb("https://models.example/a.glb", "abc")
+        try:
+            await response(scope, receive, send)
+        except Exception:
+            pass
+
+    asyncio.run(run())
+    return b"".join(m.get("body", b"") for m in sent)
+
+
+def test_streamed_glb_is_cached(upstream, tmp_path):
+    assert serve_glb() == b"glTF-body"
+    assert (tmp_path / "abc.glb").read_bytes() == b"glTF-body"
+    assert upstream.closed
+
+
+@pytest.mark.parametrize("disconnect_at", [0, 1])
+def test_disconnect_closes_upstream_and_removes_part_file(upstream, tmp_path, disconnect_at):
+    # 0: before the headers go out (the body never starts); 1: after the first chunk
+    serve_glb(disconnect_at)
+    assert upstream.closed
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unknown_avatar_id_is_not_polled(tmp_path, monkeypatch):
+    monkeypatch.setattr(rpm, "RPM_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(rpm, "avatar_poller", rpm.AvatarPoller())
+    with pytest.raises(rpm.HTTPException) as excinfo:
+        asyncio.run(rpm.rpm_avatar("someone-elses-avatar", if_none_match=None))
+    assert excinfo.value.status_code == 404
+    assert rpm.avatar_poller.stats()["outstanding_jobs"] == 0
+
+
+def test_avatar_created_here_is_served_after_its_job_finished(upstream, monkeypatch):
+    poller = rpm.AvatarPoller()
+    monkeypatch.setattr(rpm, "avatar_poller", poller)
+
+    async def finish_job():
+        now = asyncio.get_running_loop().time()
+        poller._finish(rpm._PollJob("abc", now, now + 1), glb_url="https://models.example/a.glb")
+        return await rpm.rpm_avatar("abc", if_none_match=None)
+
+    response = asyncio.run(finish_job())
+    assert response.headers["etag"] == '"abc"'
+    assert poller.knows("abc")
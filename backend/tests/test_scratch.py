@@ -0,0 +1,30 @@
+"""ScratchSpace directory lifecycle and quota accounting"""
+import asyncio
+import threading
+
+import scratch
+from scratch import ScratchSpace
+
+
+def test_directory_is_removed_off_the_event_loop(tmp_path, monkeypatch):
+    removed_on = []
+    remove_tree = scratch._remove_tree
+
+    def tracking_remove_tree(path):
+        removed_on.append(threading.get_ident())
+        return remove_tree(path)
+
+    monkeypatch.setattr(scratch, "_remove_tree", tracking_remove_tree)
+    space = ScratchSpace(tmp_path / "scratch", quota_bytes=1 << 20, reserve_bytes=1 << 10)
+
+    async def use():
+        async with space.directory() as path:
+            (path / "model.glb").write_bytes(b"x" * 5000)
+        await space.stop()
+        return path, threading.get_ident()
+
+    path, loop_thread = asyncio.run(use())
+    assert not path.exists()
+    assert removed_on and removed_on[0] != loop_thread
+    assert space.largest_bytes == 5000
+    assert space._reserved == 0
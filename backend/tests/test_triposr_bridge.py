@@ -0,0 +1,71 @@
+"""The Flask TripoSR bridge (app/main.py) against the stub server in app/triposr_stub.py"""
+import io
+import shlex
+import sys
+import threading
+
+import pytest
+from werkzeug.serving import make_server
+
+from app import main as bridge
+from app.triposr_stub import build_stub_glb, create_app
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(**options) -> str:
+        server = make_server("127.0.0.1", 0, create_app(**options), threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/generate"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def upload(client):
+    return client.post(
+        "/generate-3d-from-image",
+        data={"image": (io.BytesIO(b"\x89PNG not really"), "input.png")},
+        content_type="multipart/form-data",
+    )
+
+
+def test_http_mode_streams_the_stub_glb(monkeypatch, stub_server):
+    monkeypatch.setattr(bridge, "TRIPOSR_MODE", "http")
+    monkeypatch.setattr(bridge, "LOCAL_TRIPOSR_URL", stub_server())
+    response = upload(bridge.app.test_client())
+    assert response.status_code == 200
+    assert response.mimetype == "model/gltf-binary"
+    assert response.data == build_stub_glb()
+
+
+def test_http_mode_reports_upstream_failure(monkeypatch, stub_server):
+    monkeypatch.setattr(bridge, "TRIPOSR_MODE", "http")
+    monkeypatch.setattr(bridge, "LOCAL_TRIPOSR_URL", stub_server(fail=True))
+    response = upload(bridge.app.test_client())
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Failed to process image"}
+
+
+def test_cmd_mode_streams_the_command_output(monkeypatch, tmp_path):
+    glb = tmp_path / "model.glb"
+    glb.write_bytes(build_stub_glb())
+    copy = "import shutil, sys; shutil.copy(sys.argv[1], sys.argv[2])"
+    command = f"{shlex.quote(sys.executable)} -c {shlex.quote(copy)} {shlex.quote(str(glb))} {{output}}"
+    monkeypatch.setattr(bridge, "TRIPOSR_MODE", "cmd")
+    monkeypatch.setattr(bridge, "LOCAL_TRIPOSR_CMD", command)
+    response = upload(bridge.app.test_client())
+    assert response.status_code == 200
+    assert response.data == build_stub_glb()
+
+
+def test_cmd_mode_rejects_a_bad_template(monkeypatch):
+    monkeypatch.setattr(bridge, "TRIPOSR_MODE", "cmd")
+    monkeypatch.setattr(bridge, "LOCAL_TRIPOSR_CMD", "triposr {input} {unknown}")
+    response = upload(bridge.app.test_client())
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "LOCAL_TRIPOSR_CMD is not a valid template"}
@@ -66,7 +66,14 @@ def get_affiliate_url(partner_key: str) -> str:
     separator = "&" if "?" in url else "?"
     return f"{url}{separator}{utm}"
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_client = None
+
+def get_client() -> OpenAI:
+    """Create the OpenAI client on first use so offline modes run without an API key."""
+    global _client
+    if _client is None:
+        _client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
 
 def cloak_affiliate_link(url: str, link_text: str) -> str:
     """
@@ -115,17 +122,23 @@ def inject_affiliate_links(content: str, topic: str) -> str:
     
     return content
 
-def generate_content(trend_topic: str, model: str = "gpt-4", affiliates: list = None):
+SYSTEM_PROMPT = "You are a senior technical writer at a developer-focused publication. You write for an audience of developers, AI enthusiasts, and automation builders. Your tone is technical but accessible, like Hacker News or dev.to. You include specific details, code examples, and honest assessments. NEVER use dates, years, 'new', 'latest', 'trending', or hype language. Your content is evergreen and practical. Always output valid JSON."
+
+# Generation settings shared by the sync, async and batch code paths
+DEFAULT_MODEL = "gpt-4"
+MAX_TOKENS = 3000
+TEMPERATURE = 0.7
+
+def build_messages(trend_topic: str, affiliates: list = None) -> list:
     """
-    Generate a blog post about the trending topic using OpenAI.
+    Build the chat messages for an article about the topic.
     
     Args:
         trend_topic: The topic to write about
-        model: OpenAI model to use (gpt-4, gpt-4-turbo, gpt-3.5-turbo)
         affiliates: List of affiliate partner keys to include
     
     Returns:
-        Tuple of (slug, full_markdown_content)
+        List of chat messages (system + user)
     """
     # Build affiliate context for the prompt
     affiliate_context = ""
@@ -202,27 +215,109 @@ Output as JSON:
 
 REMEMBER: Include affiliate links naturally throughout the content where they add value."""
 
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": "You are a senior technical writer at a developer-focused publication. You write for an audience of developers, AI enthusiasts, and automation builders. Your tone is technical but accessible, like Hacker News or dev.to. You include specific details, code examples, and honest assessments. NEVER use dates, years, 'new', 'latest', 'trending', or hype language. Your content is evergreen and practical. Always output valid JSON."},
-            {"role": "user", "content": prompt}
-        ],
-        max_tokens=3000,
-        temperature=0.7
-    )
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
 
-    raw_content = response.choices[0].message.content.strip()
-    
-    # Extract JSON from response (handle markdown code blocks)
+# Output rules from the prompt, checked before a response is accepted
+REQUIRED_KEYS = ("title", "description", "tags", "content", "products")
+REQUIRED_SECTIONS = ("The Signal", "Key Features", "Use Cases", "Limitations & Trade-offs", "Getting Started", "The Verdict")
+# The prompt asks for 1000-1500 words; allow some slack either way
+MIN_WORDS = 850
+MAX_WORDS = 1900
+BANNED_PHRASES = ("this year", "recently", "latest", "trending", "best ever", "you won't believe", "must-have", "game-changer", "game changer")
+# Years as the prose uses them ("in 2023", "2023's", "March 2023"). A bare number in that range
+# is usually a quantity (2048 tokens, 1920 px), so both a plausible year and a date context are required.
+_YEAR = r'(?:199\d|20[0-3]\d)'
+_MONTHS = r'(?:january|february|march|april|may|june|july|august|september|october|november|december|jan|feb|mar|apr|jun|jul|aug|sept?|oct|nov|dec)'
+YEAR_PATTERN = re.compile(
+    rf"\b(?:(?:in|since|until|during|by|as of)\s+{_YEAR}\b(?!\s*(?:tokens?|px|pixels)\b)"
+    rf"|{_YEAR}['’]s\b"
+    rf"|{_MONTHS}\.?\s+{_YEAR}\b)",
+    re.IGNORECASE
+)
+
+def strip_code_fence(raw_content: str) -> str:
+    """Return the body of a markdown code block if the response is wrapped in one."""
+    raw_content = raw_content.strip()
     json_match = re.search(r'```(?:json)?\s*([\s\S]*?)\s*```', raw_content)
     if json_match:
-        raw_content = json_match.group(1)
-    
-    # Parse JSON
+        return json_match.group(1)
+    return raw_content
+
+def parse_article(raw_content: str):
+    """Parse the model's JSON article, or return None if it isn't a JSON object."""
     try:
-        data = json.loads(raw_content)
+        data = json.loads(strip_code_fence(raw_content))
     except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+def validate_article(raw_content: str) -> list:
+    """
+    Check a response against the prompt's output rules.
+    
+    Returns:
+        List of problem descriptions (empty when the article is acceptable)
+    """
+    data = parse_article(raw_content)
+    if data is None:
+        return ["response is not a JSON object"]
+    
+    problems = []
+    missing = [key for key in REQUIRED_KEYS if key not in data]
+    if missing:
+        problems.append(f"missing keys: {', '.join(missing)}")
+    
+    content = data.get("content") or ""
+    if not isinstance(content, str):
+        return problems + ["content is not a string"]
+    headings = {h.strip().lower() for h in re.findall(r'^##\s+(.+)$', content, re.MULTILINE)}
+    missing_sections = [section for section in REQUIRED_SECTIONS if section.lower() not in headings]
+    if missing_sections:
+        problems.append(f"missing sections: {', '.join(missing_sections)}")
+    
+    words = len(content.split())
+    if not MIN_WORDS <= words <= MAX_WORDS:
+        problems.append(f"word count {words} outside {MIN_WORDS}-{MAX_WORDS}")
+    
+    text = " ".join(str(data.get(key) or "") for key in ("title", "description")) + " " + content
+    lowered = text.lower()
+    banned = [phrase for phrase in BANNED_PHRASES if phrase in lowered]
+    # Years inside code blocks (versions, copyright lines in configs) are fine
+    prose = re.sub(r'```[\s\S]*?```', '', text)
+    if YEAR_PATTERN.search(prose):
+        banned.append("year references")
+    if banned:
+        problems.append(f"banned phrases: {', '.join(banned)}")
+    return problems
+
+def build_repair_messages(messages: list, raw_content: str, problems: list) -> list:
+    """Ask the model to fix its own response instead of writing a new one."""
+    fix_list = "\n".join(f"- {problem}" for problem in problems)
+    return messages + [
+        {"role": "assistant", "content": raw_content},
+        {"role": "user", "content": f"""Your response has these problems:
+{fix_list}
+
+Fix only these problems and keep everything else as it is. Output the complete corrected JSON object and nothing else."""}
+    ]
+
+def build_post(trend_topic: str, raw_content: str):
+    """
+    Turn a raw model response into the final markdown post.
+    
+    Args:
+        trend_topic: The topic the article was written about
+        raw_content: Text returned by the model (JSON, possibly in a code block)
+    
+    Returns:
+        Tuple of (slug, full_markdown_content, redirect_map)
+    """
+    data = parse_article(raw_content)
+    if data is None:
+        raw_content = strip_code_fence(raw_content)
         # Fallback if not valid JSON
         data = {
             "title": f"A Complete Guide to {trend_topic}",
@@ -281,50 +376,102 @@ affiliateLinks:
     
     return slug, full_content, redirect_map
 
-def save_redirect_map(redirect_map: dict, project_root: Path = None):
-    """Save redirect map to JSON file for Netlify redirects generation."""
-    if project_root is None:
-        project_root = Path(__file__).parent.parent
+def request_completion(messages: list, model: str = DEFAULT_MODEL) -> str:
+    """Send one chat completion request and return the response text."""
+    response = get_client().chat.completions.create(
+        model=model,
+        messages=messages,
+        max_tokens=MAX_TOKENS,
+        temperature=TEMPERATURE
+    )
+    return response.choices[0].message.content
+
+def fetch_completion(messages: list, model: str = DEFAULT_MODEL, use_cache: bool = False, request=None,
+                     validate=None) -> tuple:
+    """
+    Get the model's response text for a set of messages.
     
-    data_dir = project_root / "data"
-    data_dir.mkdir(exist_ok=True)
+    Args:
+        messages: Chat messages to send
+        model: OpenAI model to use
+        use_cache: Reuse and store responses in the local response cache
+        request: Callable (messages, model) -> response text (defaults to request_completion)
+        validate: Callable (response text) -> problems; only responses without problems are cached
     
-    redirects_file = data_dir / "redirects.json"
+    Returns:
+        Tuple of (raw response text, whether it was served from the cache)
+    """
+    cache = key = None
+    if use_cache:
+        from response_cache import ResponseCache, cache_key
+        cache = ResponseCache()
+        key = cache_key(model, messages, TEMPERATURE, MAX_TOKENS)
+        cached = cache.get(key)
+        if cached is not None and not (validate and validate(cached)):
+            cache.close()
+            return cached, True
     
-    # Load existing redirects and merge
-    existing = {}
-    if redirects_file.exists():
-        existing = json.loads(redirects_file.read_text(encoding="utf-8"))
+    try:
+        raw_content = (request or request_completion)(messages, model)
+        # A rejected response would be replayed (and rejected) on every rerun
+        if cache is not None and not (validate and validate(raw_content or "")):
+            cache.put(key, model, raw_content)
+        return raw_content, False
+    finally:
+        if cache is not None:
+            cache.close()
+
+def generate_content(trend_topic: str, model: str = None, affiliates: list = None, use_cache: bool = False,
+                     request=None):
+    """
+    Generate a blog post about the trending topic using OpenAI.
     
-    existing.update(redirect_map)
+    The response is validated against the prompt rules; by default a cheaper
+    model is tried first and a repair pass or a stronger model is used only
+    when validation fails (see model_router.py).
     
-    redirects_file.write_text(json.dumps(existing, indent=2), encoding="utf-8")
+    Args:
+        trend_topic: The topic to write about
+        model: Use only this model (gpt-4, gpt-4-turbo, gpt-3.5-turbo) instead of the cascade
+        affiliates: List of affiliate partner keys to include
+        use_cache: Reuse a cached response for an identical request (for prompt iteration)
+        request: Callable (messages, model) -> response text, for callers with their own client
     
-    # Also generate the _redirects file for Netlify
-    public_dir = project_root / "public"
-    public_dir.mkdir(exist_ok=True)
+    Returns:
+        Tuple of (slug, full_markdown_content, redirect_map)
+    """
+    from model_router import route
+    
+    raw_content = route(
+        build_messages(trend_topic, affiliates),
+        complete=lambda messages, m: fetch_completion(messages, m, use_cache, request, validate_article),
+        validate=validate_article,
+        repair_messages=build_repair_messages,
+        models=[model] if model else None
+    )
+    return build_post(trend_topic, raw_content)
+
+def save_redirect_map(redirect_map: dict, project_root: Path = None):
+    """Add redirects to the redirect store and refresh Netlify's _redirects file if they changed."""
+    from redirect_store import save_redirects
     
-    lines = [
-        "# Affiliate link redirects - auto-generated",
-        "# Do not edit manually",
-        ""
-    ]
-    for cloaked_path, actual_url in existing.items():
-        lines.append(f"{cloaked_path}  {actual_url}  302")
+    if project_root is None:
+        project_root = Path(__file__).parent.parent
     
-    (public_dir / "_redirects").write_text("\n".join(lines), encoding="utf-8")
+    save_redirects(redirect_map, project_root)
 
-def generate_and_save(trend_topic: str, output_dir: str = None, affiliates: list = None) -> str:
+def save_post(slug: str, content: str, redirect_map: dict = None, output_dir: str = None) -> str:
     """
-    Generate content and save to file.
+    Save a generated post (and its redirect map) to disk.
     
     Args:
-        trend_topic: Topic to write about
+        slug: Post slug used for the filename
+        content: Full markdown content with frontmatter
+        redirect_map: Cloaked path -> affiliate URL mappings for the post
         output_dir: Directory to save the markdown file
-        affiliates: List of affiliate partner keys to include
     
     Returns:
-        Path to the generated file
+        Path to the saved file
     """
     project_root = Path(__file__).parent.parent
     
@@ -335,8 +482,6 @@ def generate_and_save(trend_topic: str, output_dir: str = None, affiliates: list
     
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    slug, content, redirect_map = generate_content(trend_topic, affiliates=affiliates)
-    
     # Save redirect map for link cloaking
     if redirect_map:
         save_redirect_map(redirect_map, project_root)
@@ -352,22 +497,73 @@ def generate_and_save(trend_topic: str, output_dir: str = None, affiliates: list
     
     return str(filepath)
 
+def refresh_related_posts(output_dir: str = None):
+    """Post-save hook: posts written to the site's collection get related-post links right away."""
+    if output_dir is None:
+        from related_posts import update_related_posts
+        update_related_posts()
+
+def generate_and_save(trend_topic: str, output_dir: str = None, affiliates: list = None, use_cache: bool = False,
+                      allow_duplicate: bool = False) -> str:
+    """
+    Generate content and save to file.
+    
+    Args:
+        trend_topic: Topic to write about
+        output_dir: Directory to save the markdown file
+        affiliates: List of affiliate partner keys to include
+        use_cache: Reuse a cached response for an identical request
+        allow_duplicate: Skip the check against existing posts
+    
+    Returns:
+        Path to the generated file
+    
+    Raises:
+        DuplicateTopicError: An existing post already covers the topic (checked before any API call)
+    """
+    if not allow_duplicate:
+        from duplicate_check import find_duplicate, DuplicateTopicError
+        match = find_duplicate(trend_topic)
+        if match:
+            raise DuplicateTopicError(trend_topic, match)
+    
+    slug, content, redirect_map = generate_content(trend_topic, affiliates=affiliates, use_cache=use_cache)
+    filepath = save_post(slug, content, redirect_map, output_dir)
+    refresh_related_posts(output_dir)
+    return filepath
+
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="Generate SEO content for a topic")
     parser.add_argument("topic", nargs="?", default="Wireless Earbuds", help="Topic to write about")
-    parser.add_argument("--model", default="gpt-4", help="OpenAI model to use")
+    parser.add_argument("--model", help="Use only this OpenAI model instead of the cheap-first cascade")
     parser.add_argument("--output", "-o", help="Output directory for markdown file")
     parser.add_argument("--json", action="store_true", help="Output as JSON instead of saving file")
     parser.add_argument("--affiliates", "-a", nargs="+", help="Affiliate partners to include (runpod, bluehost, codecademy, jasper, creatify)")
+    parser.add_argument("--cache", action=argparse.BooleanOptionalAction, default=None,
+                        help="Use the local response cache (default: on with --json, off otherwise)")
+    parser.add_argument("--warm-cache", action="store_true", help="Fetch the responses for the topic into the cache without writing a post")
+    parser.add_argument("--purge-cache", action="store_true", help="Delete every cached response and exit")
+    parser.add_argument("--allow-duplicate", action="store_true", help="Write the post even if an existing post covers the topic")
     args = parser.parse_args()
     
     affiliates = args.affiliates or ["runpod", "bluehost", "codecademy", "jasper", "creatify"]
-    
-    if args.json:
-        slug, content, redirects = generate_content(args.topic, model=args.model, affiliates=affiliates)
+    use_cache = args.json if args.cache is None else args.cache
+    
+    if args.purge_cache:
+        from response_cache import ResponseCache
+        with ResponseCache() as cache:
+            print(f"Purged {cache.purge()} cached responses")
+    elif args.warm_cache:
+        from response_cache import ResponseCache
+        generate_content(args.topic, model=args.model, affiliates=affiliates, use_cache=True)
+        with ResponseCache() as cache:
+            print(f"Cached response for: {args.topic} ({cache.stats()['entries']} entries)")
+    elif args.json:
+        slug, content, redirects = generate_content(args.topic, model=args.model, affiliates=affiliates, use_cache=use_cache)
         print(json.dumps({"slug": slug, "content": content, "redirects": redirects}))
     else:
-        filepath = generate_and_save(args.topic, args.output, affiliates=affiliates)
+        filepath = generate_and_save(args.topic, args.output, affiliates=affiliates, use_cache=use_cache,
+                                     allow_duplicate=args.allow_duplicate)
         print(f"Generated: {filepath}")
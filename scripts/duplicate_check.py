@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Duplicate Check - Catches topics we've already written about before paying
+for a generation.
+
+Every post is reduced to hashed word unigram + bigram vectors, one for its
+headline (title and tags) and one for its description and body. Hashing
+needs no shared vocabulary, so new posts are appended to the persisted
+index in data/duplicate_index/ without touching existing rows. A topic is
+scored by TF-IDF cosine similarity against both vectors of every post, and
+anything above DUPLICATE_THRESHOLD counts as a duplicate.
+"""
+import os
+import json
+import uuid
+import zlib
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+from post_scanner import CONTENT_DIR, read_post, scan_posts
+from related_posts import CODE_BLOCK_PATTERN, tokenize
+
+PROJECT_ROOT = Path(__file__).parent.parent
+INDEX_DIR = PROJECT_ROOT / "data" / "duplicate_index"
+
+# Calibrated on the current posts: rewordings of an existing post's title
+# score 0.45-0.52, while the seed topics score at most 0.39 ("Stable Diffusion
+# Workflows" against the LoRA post, related but a different article). The
+# margin is narrow, so re-check with `duplicate_check.py <topics>` as the
+# corpus grows and adjust via the environment.
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.4"))
+# Bodies are long, so a topic matches them far more weakly than a headline
+BODY_WEIGHT = 0.5
+HASH_BITS = 20
+
+class DuplicateTopicError(Exception):
+    """Raised when a topic is too close to an existing post."""
+
+    def __init__(self, topic: str, match: dict):
+        self.topic = topic
+        self.match = match
+        super().__init__(f'"{topic}" duplicates {match["slug"]} ("{match["title"]}", score {match["score"]:.2f})')
+
+def normalize(token: str) -> str:
+    # Cheap plural folding so "guides" matches "guide"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def features(text: str) -> dict:
+    """Hashed unigram and bigram counts for a piece of text."""
+    tokens = [normalize(t) for t in tokenize(text)]
+    counts = {}
+    for gram in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+        col = zlib.crc32(gram.encode("utf-8")) & ((1 << HASH_BITS) - 1)
+        counts[col] = counts.get(col, 0) + 1
+    return counts
+
+def to_matrix(rows: list) -> sp.csr_matrix:
+    indptr, indices, values = [0], [], []
+    for counts in rows:
+        indices.extend(counts.keys())
+        values.extend(counts.values())
+        indptr.append(len(indices))
+    return sp.csr_matrix((np.array(values, dtype=np.float32), np.array(indices, dtype=np.int32), np.array(indptr)),
+                         shape=(len(rows), 1 << HASH_BITS))
+
+def read_post_text(path: Path):
+    """Return (title, headline, body) text for one post."""
+    frontmatter, body = read_post(path)
+    title = str(frontmatter.get("title") or "")
+    tags = " ".join(str(tag) for tag in frontmatter.get("tags") or []).replace("-", " ")
+    return title, f"{title} {tags}", f"{frontmatter.get('description') or ''} {CODE_BLOCK_PATTERN.sub(' ', body)}"
+
+class DuplicateIndex:
+    def __init__(self):
+        self.slugs = []
+        self.titles = []
+        self.hashes = {}
+        self.headlines = to_matrix([])
+        self.bodies = to_matrix([])
+
+    @classmethod
+    def load(cls, index_dir: Path = INDEX_DIR):
+        index_dir = Path(index_dir)
+        try:
+            meta = json.loads((index_dir / "index.json").read_text(encoding="utf-8"))
+            headlines = sp.load_npz(index_dir / "headlines.npz").tocsr()
+            bodies = sp.load_npz(index_dir / "bodies.npz").tocsr()
+        except (OSError, ValueError):
+            return None
+        index = cls()
+        index.slugs, index.titles, index.hashes = meta["slugs"], meta["titles"], meta["hashes"]
+        index.headlines, index.bodies = headlines, bodies
+        return index
+
+    def save(self, index_dir: Path = INDEX_DIR):
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        suffix = uuid.uuid4().hex
+        for name, matrix in (("headlines", self.headlines), ("bodies", self.bodies)):
+            sp.save_npz(index_dir / f"{name}.{suffix}.npz", matrix, compressed=False)
+            os.replace(index_dir / f"{name}.{suffix}.npz", index_dir / f"{name}.npz")
+        tmp = index_dir / f"index.{suffix}.json"
+        tmp.write_text(json.dumps({"slugs": self.slugs, "titles": self.titles, "hashes": self.hashes}), encoding="utf-8")
+        os.replace(tmp, index_dir / "index.json")
+
+    def add_posts(self, posts: list):
+        """Append (slug, sha256, path) posts."""
+        headlines, bodies = [], []
+        for slug, sha256, path in posts:
+            title, headline, body = read_post_text(path)
+            self.slugs.append(slug)
+            self.titles.append(title)
+            self.hashes[slug] = sha256
+            headlines.append(features(headline))
+            bodies.append(features(body))
+        self.headlines = sp.vstack([self.headlines, to_matrix(headlines)], format="csr")
+        self.bodies = sp.vstack([self.bodies, to_matrix(bodies)], format="csr")
+
+    @staticmethod
+    def _similarity(matrix: sp.csr_matrix, query: dict) -> np.ndarray:
+        """Cosine similarity of the query against every row, both TF-IDF weighted."""
+        n = matrix.shape[0]
+        if n == 0 or not query:
+            return np.zeros(n, dtype=np.float32)
+        cols = np.fromiter(query.keys(), dtype=np.int64)
+        # Only the query's columns matter for the dot product; norms need the whole row
+        df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+        idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+        weighted = matrix.copy()
+        weighted.data = (1 + np.log(weighted.data)) * idf[weighted.indices]
+        row_norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        row_norms[row_norms == 0] = 1
+        q = (1 + np.log(np.fromiter(query.values(), dtype=np.float32))) * idf[cols]
+        dots = weighted[:, cols] @ q
+        return dots / (row_norms * np.linalg.norm(q))
+
+    def search(self, text: str, limit: int = 5) -> list:
+        """Posts most similar to the text, best first."""
+        query = features(text)
+        scores = np.maximum(self._similarity(self.headlines, query), BODY_WEIGHT * self._similarity(self.bodies, query))
+        best = np.argsort(-scores)[:limit]
+        return [{"slug": self.slugs[i], "title": self.titles[i], "score": round(float(scores[i]), 4)} for i in best]
+
+def load_index(content_dir: Path = CONTENT_DIR, index_dir: Path = INDEX_DIR) -> DuplicateIndex:
+    """Load the index and bring it up to date with the posts on disk."""
+    content_dir = Path(content_dir)
+    manifest, _ = scan_posts(content_dir)
+    on_disk = {name[:-3]: entry["sha256"] for name, entry in manifest.items()}
+
+    index = DuplicateIndex.load(index_dir)
+    # Rows can't be removed from the hashed matrices, so edits and deletions rebuild (cheap: no pairwise step)
+    if index is None or any(on_disk.get(slug) != sha256 for slug, sha256 in index.hashes.items()):
+        index = DuplicateIndex()
+    added = [slug for slug in sorted(on_disk) if slug not in index.hashes]
+    if added:
+        index.add_posts([(slug, on_disk[slug], content_dir / f"{slug}.md") for slug in added])
+        index.save(index_dir)
+    return index
+
+def find_duplicate(topic: str, threshold: float = DUPLICATE_THRESHOLD, index: DuplicateIndex = None):
+    """Return the closest existing post if it is above the threshold, otherwise None."""
+    index = index or load_index()
+    matches = index.search(topic, limit=1)
+    if matches and matches[0]["score"] >= threshold:
+        return matches[0]
+    return None
+
+def filter_duplicates(topics: list, threshold: float = DUPLICATE_THRESHOLD, index: DuplicateIndex = None) -> tuple:
+    """
+    Split topics into new ones and ones an existing post already covers.
+
+    Returns:
+        Tuple of (new topics in order, dict of duplicate topic -> closest post)
+    """
+    index = index or load_index()
+    fresh, skipped = [], {}
+    for topic in topics:
+        match = find_duplicate(topic, threshold, index)
+        if match:
+            skipped[topic] = match
+        else:
+            fresh.append(topic)
+    return fresh, skipped
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check topics against existing posts")
+    parser.add_argument("topics", nargs="+", help="Topics to check")
+    parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD, help="Similarity that counts as a duplicate")
+    args = parser.parse_args()
+
+    index = load_index()
+    for topic in args.topics:
+        matches = index.search(topic, limit=3)
+        verdict = "DUPLICATE" if matches and matches[0]["score"] >= args.threshold else "ok"
+        print(f"{verdict:9} {topic}")
+        for match in matches:
+            print(f"          {match['score']:.2f}  {match['slug']}")
@@ -1,14 +1,36 @@
 #!/usr/bin/env python3
 """
 Batch content generator - Creates multiple SEO-optimized posts with affiliate links.
+
+Posts are generated concurrently on the async OpenAI client. A scheduler keeps
+requests/minute and tokens/minute under the account limits, retries 429/5xx
+responses with backoff and saves each post as soon as it is ready. Topics an
+existing post already covers are skipped, and every post goes through the
+same validated cascade, response cache and post-save hook as a single
+generate_and_save() run.
 """
+import os
 import sys
+import time
+import random
+import asyncio
+from collections import deque
 from pathlib import Path
 
 # Add scripts directory to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from content_generator import generate_and_save
+import openai
+from openai import AsyncOpenAI
+from content_generator import (
+    DEFAULT_MODEL,
+    MAX_TOKENS,
+    TEMPERATURE,
+    generate_content,
+    refresh_related_posts,
+    save_post,
+)
+from duplicate_check import filter_duplicates
 
 # Hot trend topics with affiliate integration
 TOPICS = [
@@ -21,21 +43,193 @@ TOPICS = [
 # All affiliates to embed
 AFFILIATES = ["runpod", "bluehost", "codecademy", "jasper", "creatify"]
 
-def main():
-    print(f"Generating {len(TOPICS)} posts with affiliates: {', '.join(AFFILIATES)}\n")
-    
-    generated = []
-    for i, topic in enumerate(TOPICS, 1):
-        print(f"[{i}/{len(TOPICS)}] Generating: {topic}")
+# Account limits for the model (see platform.openai.com/account/limits)
+REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TPM_LIMIT", "40000"))
+MAX_RETRIES = 6
+
+def estimate_tokens(messages: list, max_tokens: int) -> int:
+    """Rough token cost of a request: ~4 characters per prompt token plus the completion budget."""
+    prompt_chars = sum(len(m["content"]) for m in messages)
+    return prompt_chars // 4 + max_tokens
+
+class RateBudget:
+    """
+    Sliding one-minute window over requests and tokens.
+
+    Each request reserves its estimated tokens (prompt + max_tokens) before it
+    is sent; once the real usage is known the reservation is corrected so the
+    unused part of max_tokens becomes available again.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._window = deque()  # [timestamp, tokens] entries
+        self._lock = asyncio.Lock()
+
+    def _purge(self, now: float):
+        while self._window and now - self._window[0][0] >= 60:
+            self._window.popleft()
+
+    async def acquire(self, tokens: int) -> list:
+        # A single request larger than the whole budget would otherwise wait forever
+        tokens = min(tokens, self.tokens_per_minute)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._purge(now)
+                used = sum(entry[1] for entry in self._window)
+                if len(self._window) < self.requests_per_minute and used + tokens <= self.tokens_per_minute:
+                    entry = [now, tokens]
+                    self._window.append(entry)
+                    return entry
+                # Wait for the oldest reservation to leave the window
+                await asyncio.sleep(max(60 - (now - self._window[0][0]), 0.05))
+
+    def settle(self, entry: list, actual_tokens: int):
+        entry[1] = actual_tokens
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Honour Retry-After when the API sends it, otherwise exponential backoff with full jitter."""
+    response = getattr(error, "response", None)
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+    return random.uniform(0, min(60, 2 ** attempt))
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+async def request_completion(client: AsyncOpenAI, budget: RateBudget, topic: str, messages: list, model: str) -> str:
+    """Send one request through the rate budget, retrying rate limits and server errors."""
+    estimate = estimate_tokens(messages, MAX_TOKENS)
+
+    for attempt in range(MAX_RETRIES + 1):
+        entry = await budget.acquire(estimate)
         try:
-            filepath = generate_and_save(topic, affiliates=AFFILIATES)
-            generated.append(filepath)
-            print(f"  ✓ Saved: {filepath}\n")
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE
+            )
         except Exception as e:
-            print(f"  ✗ Error: {e}\n")
-    
+            if attempt == MAX_RETRIES or not is_retryable(e):
+                raise
+            delay = retry_delay(e, attempt)
+            print(f"  ↻ Retrying '{topic}' in {delay:.1f}s ({type(e).__name__})")
+            await asyncio.sleep(delay)
+            continue
+
+        if response.usage is not None:
+            budget.settle(entry, response.usage.total_tokens)
+        return response.choices[0].message.content
+
+async def generate_post(client: AsyncOpenAI, budget: RateBudget, topic: str, model: str, affiliates: list,
+                        use_cache: bool = False):
+    """
+    Generate one post through the validated model cascade (see model_router.py).
+
+    The cascade is synchronous, so it runs in a worker thread; its requests are
+    handed back to the event loop and go through the shared rate budget.
+    """
+    loop = asyncio.get_running_loop()
+
+    def request(messages: list, m: str) -> str:
+        return asyncio.run_coroutine_threadsafe(request_completion(client, budget, topic, messages, m), loop).result()
+
+    return await asyncio.to_thread(generate_content, topic, model, affiliates, use_cache, request)
+
+async def run_batch(topics: list, affiliates: list, model: str = None, concurrency: int = 5,
+                    requests_per_minute: int = REQUESTS_PER_MINUTE, tokens_per_minute: int = TOKENS_PER_MINUTE,
+                    output_dir: str = None, use_cache: bool = False, allow_duplicate: bool = False) -> list:
+    """
+    Generate posts for all topics concurrently, saving each one as it completes.
+
+    Args:
+        model: Use only this model instead of the cheap-first cascade
+        use_cache: Reuse a cached response for an identical request
+        allow_duplicate: Skip the check against existing posts
+
+    Returns:
+        List of saved file paths
+    """
+    if not allow_duplicate:
+        topics, skipped = filter_duplicates(topics)
+        for topic, match in skipped.items():
+            print(f"  - Skipping '{topic}': duplicates {match['slug']} (score {match['score']:.2f})")
+
+    # Retries are handled here so they go through the rate budget
+    client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    budget = RateBudget(requests_per_minute, tokens_per_minute)
+    semaphore = asyncio.Semaphore(concurrency)
+    generated = []
+
+    async def worker(i: int, topic: str):
+        async with semaphore:
+            print(f"[{i}/{len(topics)}] Generating: {topic}")
+            started = time.perf_counter()
+            try:
+                slug, content, redirect_map = await generate_post(client, budget, topic, model, affiliates, use_cache)
+            except Exception as e:
+                print(f"  ✗ Error ({topic}): {e}")
+                return
+        # Saving is synchronous, so concurrent workers never interleave redirect map updates
+        filepath = save_post(slug, content, redirect_map, output_dir)
+        generated.append(filepath)
+        print(f"  ✓ Saved in {time.perf_counter() - started:.1f}s: {filepath}")
+
+    try:
+        await asyncio.gather(*(worker(i, topic) for i, topic in enumerate(topics, 1)))
+    finally:
+        await client.close()
+    if generated:
+        refresh_related_posts(output_dir)
+    return generated
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a batch of posts concurrently")
+    parser.add_argument("--model", help="Use only this OpenAI model instead of the cheap-first cascade")
+    parser.add_argument("--concurrency", "-c", type=int, default=5, help="Generations in flight at once")
+    parser.add_argument("--rpm", type=int, default=REQUESTS_PER_MINUTE, help="Requests per minute budget")
+    parser.add_argument("--tpm", type=int, default=TOKENS_PER_MINUTE, help="Tokens per minute budget")
+    parser.add_argument("--output", "-o", help="Output directory for markdown files")
+    parser.add_argument("--batch-api", action="store_true", help="Submit through the OpenAI Batch API instead (slower, cheaper)")
+    parser.add_argument("--local-batch", action="store_true", help="With --batch-api, use the local file-based batch backend")
+    parser.add_argument("--cache", action="store_true", help="Use the local response cache")
+    parser.add_argument("--allow-duplicate", action="store_true", help="Generate even if an existing post covers the topic")
+    args = parser.parse_args()
+
+    print(f"Generating {len(TOPICS)} posts with affiliates: {', '.join(AFFILIATES)}\n")
+
+    started = time.perf_counter()
+    if args.batch_api:
+        from openai_batch import run_batch_api
+        generated = run_batch_api(TOPICS, AFFILIATES, model=args.model or DEFAULT_MODEL, local=args.local_batch,
+                                  output_dir=args.output, use_cache=args.cache, allow_duplicate=args.allow_duplicate)
+    else:
+        generated = asyncio.run(run_batch(
+            TOPICS, AFFILIATES,
+            model=args.model,
+            concurrency=args.concurrency,
+            requests_per_minute=args.rpm,
+            tokens_per_minute=args.tpm,
+            output_dir=args.output,
+            use_cache=args.cache,
+            allow_duplicate=args.allow_duplicate
+        ))
+
     print(f"\n{'='*50}")
-    print(f"Generated {len(generated)}/{len(TOPICS)} posts:")
+    print(f"Generated {len(generated)}/{len(TOPICS)} posts in {time.perf_counter() - started:.1f}s:")
     for path in generated:
         print(f"  - {path}")
 
@@ -1,103 +1,67 @@
 #!/usr/bin/env python3
 """
 Generate Netlify _redirects file for affiliate link cloaking.
-Scans all markdown posts for affiliate links and creates redirect rules.
+Scans markdown posts for cloaked affiliate links, checks them against the
+redirect store and writes the redirect rules.
 """
-import os
-import re
-import json
+import sys
 from pathlib import Path
 
-def extract_affiliate_links(content_dir: Path) -> dict:
-    """
-    Extract all affiliate links from markdown frontmatter.
-    Returns a dict mapping cloaked URLs to actual affiliate URLs.
-    """
-    redirects = {}
-    
-    for md_file in content_dir.glob("*.md"):
-        content = md_file.read_text(encoding="utf-8")
-        
-        # Extract frontmatter
-        frontmatter_match = re.match(r'^---\s*\n(.*?)\n---', content, re.DOTALL)
-        if not frontmatter_match:
-            continue
-        
-        frontmatter = frontmatter_match.group(1)
-        
-        # Find affiliateLinks section
-        links_match = re.search(r'affiliateLinks:\s*\n((?:\s+-.*\n?)+)', frontmatter)
-        if not links_match:
-            continue
-        
-        links_section = links_match.group(1)
-        
-        # Parse each link entry
-        current_text = None
-        current_url = None
-        
-        for line in links_section.split('\n'):
-            text_match = re.search(r'text:\s*["\']?([^"\']+)["\']?', line)
-            url_match = re.search(r'url:\s*["\']?([^"\']+)["\']?', line)
-            
-            if text_match:
-                current_text = text_match.group(1)
-            if url_match:
-                current_url = url_match.group(1)
-            
-            # If we have both, check if it's a cloaked URL
-            if current_text and current_url:
-                if current_url.startswith('/go/'):
-                    # This is a cloaked URL - we need to find the actual URL
-                    # For now, store it; actual URL will be in a separate data file
-                    pass
-                current_text = None
-                current_url = None
-    
-    return redirects
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent))
 
-def load_redirect_map(data_file: Path) -> dict:
-    """Load the redirect map from the data file."""
-    if data_file.exists():
-        return json.loads(data_file.read_text(encoding="utf-8"))
-    return {}
-
-def generate_redirects_file(output_dir: Path, redirect_map: dict):
+def extract_affiliate_links(content_dir: Path = None, workers: int = None) -> dict:
     """
-    Generate Netlify _redirects file.
-    Format: /go/slug  https://actual-url.com  302
+    Collect the cloaked affiliate links used in post frontmatter.
+    Only new or modified posts are parsed (see post_scanner.py).
+    Returns a dict mapping each cloaked /go/ path to the posts that link to it.
     """
-    redirects_file = output_dir / "_redirects"
-    
-    lines = [
-        "# Affiliate link redirects - auto-generated",
-        "# Do not edit manually",
-        ""
-    ]
+    from post_scanner import scan_posts, CONTENT_DIR
     
-    for cloaked_path, actual_url in redirect_map.items():
-        # Use 302 (temporary) redirect to avoid caching issues
-        lines.append(f"{cloaked_path}  {actual_url}  302")
+    manifest, changed = scan_posts(content_dir or CONTENT_DIR, workers=workers)
+    print(f"Scanned {len(manifest)} posts ({len(changed)} changed)")
     
-    redirects_file.write_text("\n".join(lines), encoding="utf-8")
-    print(f"Generated {len(redirect_map)} redirects to {redirects_file}")
+    links = {}
+    for name, entry in manifest.items():
+        if entry.get("error"):
+            print(f"  ✗ Skipping {name}: invalid frontmatter ({entry['error']})")
+        for link in entry["links"]:
+            if link["url"].startswith("/go/"):
+                links.setdefault(link["url"], []).append(name)
+    return links
 
 def main():
-    project_root = Path(__file__).parent.parent
-    content_dir = project_root / "src" / "content" / "posts"
-    public_dir = project_root / "public"
-    data_file = project_root / "data" / "redirects.json"
+    import argparse
+    from redirect_store import RedirectStore, compact_export_file, write_redirects_file, REDIRECTS_FILE
     
-    # Ensure public dir exists
-    public_dir.mkdir(exist_ok=True)
+    parser = argparse.ArgumentParser(description="Generate Netlify _redirects from the redirect store")
+    parser.add_argument("--workers", type=int, help="Processes used to parse changed posts")
+    args = parser.parse_args()
     
-    # Load existing redirect map
-    redirect_map = load_redirect_map(data_file)
+    linked = extract_affiliate_links(workers=args.workers)
     
-    if redirect_map:
-        generate_redirects_file(public_dir, redirect_map)
-    else:
-        print("No redirect map found. Run content generator first.")
+    # Opening the store also imports what was appended to data/redirects.jsonl (e.g. a fresh checkout)
+    store = RedirectStore()
+    try:
+        redirect_map = dict(store.items())
+        # Cloaked links in posts must resolve, or they 404 on the live site
+        for path, posts in sorted(linked.items()):
+            if path not in redirect_map:
+                print(f"  ✗ No redirect target for {path} (used in {', '.join(sorted(posts))})")
+        unused = len(set(redirect_map) - set(linked))
+        if unused:
+            print(f"  {unused} redirects are not linked from any post frontmatter")
+        
+        if redirect_map:
+            written = write_redirects_file(store)
+            print(f"Generated {written} redirects to {REDIRECTS_FILE}")
+            # Full rebuild anyway, so fold the append-only export back to one line per mapping
+            with store.lock():
+                compact_export_file(store)
+        else:
+            print("No redirect map found. Run content generator first.")
+    finally:
+        store.close()
 
 if __name__ == "__main__":
     main()
@@ -16,6 +16,7 @@ sys.path.insert(0, str(SCRIPTS_DIR))
 
 from trend_fetcher import select_best_topic, get_trending_topics
 from content_generator import generate_and_save
+from duplicate_check import DuplicateTopicError
 
 def log(message: str):
     """Print timestamped log message."""
@@ -42,11 +43,19 @@ def main():
             topic = "Best Tech Gadgets 2025"
             log(f"Using fallback topic: {topic}")
     
+    # Nothing new to write about is not a failure; the rest of the workflow still runs
+    if topic is None:
+        log("Every candidate topic is already covered by a post, skipping generation")
+        return 0
+    
     # Step 2: Generate content
     log(f"Generating content for: {topic}")
     try:
         filepath = generate_and_save(topic)
         log(f"Content saved to: {filepath}")
+    except DuplicateTopicError as e:
+        log(f"Skipping generation: {e}")
+        return 0
     except Exception as e:
         log(f"Error generating content: {e}")
         sys.exit(1)
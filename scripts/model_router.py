@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Model Router - Tries a cheaper model first and escalates only when needed.
+
+Each attempt is checked by a validator. A response with a couple of small
+problems gets a targeted repair pass on the same model; anything worse is
+escalated to the next (stronger) model in the cascade. Latency and acceptance
+rates per model are kept in data/model_stats.json, and a model that keeps
+failing validation is skipped (apart from occasional re-checks) until its
+acceptance rate recovers. Parallel runs share the file: each save re-reads
+it under a file lock and replays only that run's new samples onto it.
+"""
+import os
+import sys
+import json
+import time
+import random
+import uuid
+from pathlib import Path
+
+from redirect_store import file_lock
+
+STATS_FILE = Path(__file__).parent.parent / "data" / "model_stats.json"
+
+# Cheapest first; the last model is the strongest
+MODEL_CASCADE = [m.strip() for m in os.getenv("CONTENT_MODEL_CASCADE", "gpt-3.5-turbo,gpt-4").split(",") if m.strip()]
+# Responses with at most this many problems are repaired rather than regenerated
+MAX_REPAIR_PROBLEMS = 2
+# A model is skipped once it has this much history and accepts less than MIN_ACCEPT_RATE
+MIN_SAMPLES = 10
+MIN_ACCEPT_RATE = float(os.getenv("CONTENT_MIN_ACCEPT_RATE", "0.3"))
+# Share of runs that still try a skipped model, so it can earn its place back
+EXPLORE_RATE = 0.1
+# Weight of the newest sample in the latency moving average
+LATENCY_ALPHA = 0.2
+
+class ModelStats:
+    """Per-model attempt, acceptance and latency counters persisted as JSON."""
+
+    def __init__(self, path: Path = STATS_FILE):
+        self.path = Path(path)
+        self.data = self._load()
+        # Samples recorded since the last save, replayed onto the file's current counts
+        self._pending = []
+
+    def _load(self) -> dict:
+        if self.path.exists():
+            try:
+                return json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                pass
+        return {}
+
+    def _entry(self, model: str) -> dict:
+        return self.data.setdefault(model, {"attempts": 0, "accepted": 0, "repairs": 0, "repaired": 0, "latency_ms": None})
+
+    def record(self, model: str, accepted: bool, latency_ms: float = None, repair: bool = False):
+        self._pending.append((model, accepted, latency_ms, repair))
+        self._apply(model, accepted, latency_ms, repair)
+
+    def _apply(self, model: str, accepted: bool, latency_ms: float = None, repair: bool = False):
+        entry = self._entry(model)
+        if repair:
+            entry["repairs"] += 1
+            entry["repaired"] += int(accepted)
+        else:
+            entry["attempts"] += 1
+            entry["accepted"] += int(accepted)
+        if latency_ms is not None:
+            previous = entry["latency_ms"]
+            entry["latency_ms"] = round(latency_ms if previous is None else previous + LATENCY_ALPHA * (latency_ms - previous), 1)
+
+    def accept_rate(self, model: str):
+        """Share of first attempts that passed validation, or None without enough history."""
+        entry = self.data.get(model)
+        if not entry or entry["attempts"] < MIN_SAMPLES:
+            return None
+        return entry["accepted"] / entry["attempts"]
+
+    def save(self):
+        """Merge this run's samples into the file, so concurrent runs don't overwrite each other's counts."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path.with_name(self.path.name + ".lock")):
+            self.data = self._load()
+            for sample in self._pending:
+                self._apply(*sample)
+            tmp = self.path.with_name(f"{self.path.name}.{uuid.uuid4().hex}.tmp")
+            tmp.write_text(json.dumps(self.data, indent=2), encoding="utf-8")
+            os.replace(tmp, self.path)
+        self._pending = []
+
+def plan_cascade(models: list, stats: ModelStats) -> list:
+    """Drop models whose acceptance rate is too low; the strongest model always stays."""
+    planned = []
+    for model in models[:-1]:
+        rate = stats.accept_rate(model)
+        if rate is not None and rate < MIN_ACCEPT_RATE and random.random() >= EXPLORE_RATE:
+            continue
+        planned.append(model)
+    return planned + models[-1:]
+
+def route(messages: list, complete, validate, repair_messages, models: list = None,
+          stats: ModelStats = None) -> str:
+    """
+    Run the cascade and return the first response that passes validation.
+
+    Args:
+        messages: Chat messages for the generation request
+        complete: Callable (messages, model) -> (response text, whether it was served from a cache)
+        validate: Callable (response text) -> list of problem descriptions (empty when valid)
+        repair_messages: Callable (messages, response text, problems) -> messages for a repair pass
+        models: Models to try, cheapest first (defaults to MODEL_CASCADE)
+        stats: Stats store to read and update (defaults to STATS_FILE); cached replays are not recorded
+
+    Returns:
+        Response text; if nothing validates, the attempt with the fewest problems
+    """
+    stats = stats or ModelStats()
+    cascade = plan_cascade(models or MODEL_CASCADE, stats)
+    best = None  # (problem count, response text)
+
+    def attempt(model: str, attempt_messages: list, repair: bool):
+        started = time.perf_counter()
+        text, cached = complete(attempt_messages, model)
+        latency_ms = (time.perf_counter() - started) * 1000
+        problems = validate(text)
+        # A replayed response says nothing new about the model
+        if not cached:
+            stats.record(model, not problems, latency_ms, repair=repair)
+        return text, problems
+
+    try:
+        for i, model in enumerate(cascade):
+            is_last = i == len(cascade) - 1
+            text, problems = attempt(model, messages, repair=False)
+            if not problems:
+                return text
+            # stderr keeps --json output on stdout parseable
+            print(f"  ✗ {model} failed validation: {'; '.join(problems)}", file=sys.stderr)
+            # Small problems are cheaper to patch than to regenerate with a bigger model
+            if len(problems) <= MAX_REPAIR_PROBLEMS or is_last:
+                repaired, repair_problems = attempt(model, repair_messages(messages, text, problems), repair=True)
+                if not repair_problems:
+                    return repaired
+                print(f"  ✗ {model} repair failed: {'; '.join(repair_problems)}", file=sys.stderr)
+                if len(repair_problems) < len(problems):
+                    text, problems = repaired, repair_problems
+            if best is None or len(problems) < best[0]:
+                best = (len(problems), text)
+    finally:
+        stats.save()
+    return best[1]
+
+if __name__ == "__main__":
+    stats = ModelStats()
+    for model, entry in stats.data.items():
+        rate = stats.accept_rate(model)
+        print(f"{model}: {entry['accepted']}/{entry['attempts']} accepted"
+              f"{'' if rate is None else f' ({rate:.0%})'}, {entry['repaired']}/{entry['repairs']} repairs,"
+              f" ~{entry['latency_ms'] or 0:.0f}ms")
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Offline batch mode - Generates posts through the OpenAI Batch API.
+
+All prompts for a run are written to one JSONL file, submitted as a batch
+and polled until the output is ready; each result then goes through the
+normal build_post / save_post path (affiliate links, frontmatter, redirects).
+Topics an existing post already covers are left out of the batch (and listed
+under "skipped" in the run's state.json); results that fail validate_article
+are regenerated through the interactive cascade.
+Batch requests are billed at a discount and don't count against the
+interactive rate limits, which makes this the cheap option for nightly runs
+and large backfills.
+
+LocalBatchBackend implements the same upload/create/retrieve/download flow
+on the local filesystem so the whole pipeline can be exercised offline.
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+from pathlib import Path
+from datetime import datetime
+
+# Add scripts directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from content_generator import (
+    DEFAULT_MODEL,
+    MAX_TOKENS,
+    REQUIRED_SECTIONS,
+    TEMPERATURE,
+    build_messages,
+    build_post,
+    generate_content,
+    refresh_related_posts,
+    save_post,
+    validate_article,
+)
+from duplicate_check import filter_duplicates
+
+PROJECT_ROOT = Path(__file__).parent.parent
+BATCH_DIR = PROJECT_ROOT / "data" / "batches"
+CHAT_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+# Stand-in prose for LocalBatchBackend articles, repeated up to the validator's word range
+OFFLINE_PARAGRAPH = " ".join(["This paragraph stands in for generated text in an offline run."] * 15)
+
+def write_batch_file(topics: list, affiliates: list, model: str, path: Path) -> dict:
+    """
+    Write one chat completion request per topic to a Batch API JSONL file.
+
+    Returns:
+        Mapping of custom_id -> topic
+    """
+    manifest = {}
+    with open(path, "w", encoding="utf-8") as f:
+        for i, topic in enumerate(topics):
+            custom_id = f"post-{i}"
+            manifest[custom_id] = topic
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": CHAT_ENDPOINT,
+                "body": {
+                    "model": model,
+                    "messages": build_messages(topic, affiliates),
+                    "max_tokens": MAX_TOKENS,
+                    "temperature": TEMPERATURE
+                }
+            }) + "\n")
+    return manifest
+
+class OpenAIBatchBackend:
+    """Submits batches through the OpenAI Files + Batches API."""
+
+    def __init__(self):
+        from openai import OpenAI
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    def upload(self, path: Path) -> str:
+        with open(path, "rb") as f:
+            return self.client.files.create(file=f, purpose="batch").id
+
+    def create(self, input_file_id: str) -> str:
+        batch = self.client.batches.create(
+            input_file_id=input_file_id,
+            endpoint=CHAT_ENDPOINT,
+            completion_window="24h"
+        )
+        return batch.id
+
+    def retrieve(self, batch_id: str) -> dict:
+        batch = self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "status": batch.status,
+            "output_file_id": batch.output_file_id,
+            "error_file_id": batch.error_file_id,
+            "completed": counts.completed if counts else 0,
+            "failed": counts.failed if counts else 0,
+            "total": counts.total if counts else 0
+        }
+
+    def download(self, file_id: str) -> str:
+        return self.client.files.content(file_id).text
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for the Batch API.
+
+    Files and batches live under a local directory; a batch "completes" on its
+    first retrieve by answering every request with a canned article built from
+    the prompt, in the same output format the Batch API uses. Requests that
+    _complete() rejects go to an error file, as failed requests do in the API.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        (self.root / "files").mkdir(parents=True, exist_ok=True)
+        (self.root / "batches").mkdir(parents=True, exist_ok=True)
+
+    def upload(self, path: Path) -> str:
+        file_id = f"file-local-{uuid.uuid4().hex[:12]}"
+        (self.root / "files" / file_id).write_bytes(Path(path).read_bytes())
+        return file_id
+
+    def create(self, input_file_id: str) -> str:
+        batch_id = f"batch-local-{uuid.uuid4().hex[:12]}"
+        self._save(batch_id, {"status": "validating", "input_file_id": input_file_id})
+        return batch_id
+
+    def retrieve(self, batch_id: str) -> dict:
+        batch = json.loads((self.root / "batches" / f"{batch_id}.json").read_text(encoding="utf-8"))
+        if batch["status"] not in TERMINAL_STATUSES:
+            batch = self._process(batch_id, batch)
+        return {
+            "status": batch["status"],
+            "output_file_id": batch.get("output_file_id"),
+            "error_file_id": batch.get("error_file_id"),
+            "completed": batch.get("completed", 0),
+            "failed": batch.get("failed", 0),
+            "total": batch.get("completed", 0) + batch.get("failed", 0)
+        }
+
+    def download(self, file_id: str) -> str:
+        return (self.root / "files" / file_id).read_text(encoding="utf-8")
+
+    def _save(self, batch_id: str, batch: dict):
+        (self.root / "batches" / f"{batch_id}.json").write_text(json.dumps(batch), encoding="utf-8")
+
+    def _complete(self, body: dict) -> dict:
+        """Answer one chat completion request body; raises ValueError for requests the API would reject"""
+        if not body.get("messages"):
+            raise ValueError("'messages' is a required property")
+        prompt = body["messages"][-1]["content"]
+        match = re.search(r'article about: "([^"]+)"', prompt)
+        topic = match.group(1) if match else "Untitled"
+        article = {
+            "title": f"{topic}: An Offline Draft",
+            "description": f"Offline batch draft about {topic} generated by the local batch backend.",
+            "tags": ["offline", "draft"],
+            "content": "\n\n".join(f"## {section}\n\n{OFFLINE_PARAGRAPH}" for section in REQUIRED_SECTIONS),
+            "products": []
+        }
+        return {
+            "object": "chat.completion",
+            "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": json.dumps(article)}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 50, "total_tokens": len(prompt) // 4 + 50}
+        }
+
+    def _write_file(self, lines: list):
+        if not lines:
+            return None
+        file_id = f"file-local-{uuid.uuid4().hex[:12]}"
+        (self.root / "files" / file_id).write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return file_id
+
+    def _process(self, batch_id: str, batch: dict) -> dict:
+        outputs, errors = [], []
+        for line in self.download(batch["input_file_id"]).splitlines():
+            request = json.loads(line)
+            result = {"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": request["custom_id"]}
+            try:
+                body = self._complete(request["body"])
+            except ValueError as e:
+                errors.append(json.dumps(dict(result, response=None, error={"code": "invalid_request", "message": str(e)})))
+                continue
+            outputs.append(json.dumps(dict(result, response={"status_code": 200, "body": body}, error=None)))
+        batch.update({
+            "status": "completed",
+            "output_file_id": self._write_file(outputs),
+            "error_file_id": self._write_file(errors),
+            "completed": len(outputs),
+            "failed": len(errors)
+        })
+        self._save(batch_id, batch)
+        return batch
+
+def save_state(state_file: Path, state: dict):
+    """Replace a run's state.json atomically, so a crash never leaves it half-written."""
+    tmp_file = state_file.with_name(state_file.name + ".tmp")
+    tmp_file.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp_file, state_file)
+
+def submit_run(topics: list, affiliates: list, backend, model: str = DEFAULT_MODEL,
+               allow_duplicate: bool = False) -> Path:
+    """
+    Write the batch file for a run, submit it and record the run state.
+
+    Topics an existing post already covers are not submitted; they are listed
+    under "skipped" in state.json. If nothing is left, no batch is created and
+    the state's batch_id is None.
+
+    Returns:
+        Path to the run directory (holds batch.jsonl and state.json)
+    """
+    # The random suffix keeps runs started in the same second apart
+    run_dir = BATCH_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    run_dir.mkdir(parents=True)
+
+    skipped = {}
+    if not allow_duplicate:
+        topics, skipped = filter_duplicates(topics)
+        for topic, match in skipped.items():
+            print(f"  - Skipping '{topic}': duplicates {match['slug']} (score {match['score']:.2f})")
+
+    state = {"batch_id": None, "input_file_id": None, "model": model, "affiliates": affiliates,
+             "manifest": {}, "skipped": skipped, "saved": []}
+    if topics:
+        state["manifest"] = write_batch_file(topics, affiliates, model, run_dir / "batch.jsonl")
+        state["input_file_id"] = backend.upload(run_dir / "batch.jsonl")
+        state["batch_id"] = backend.create(state["input_file_id"])
+        print(f"Submitted batch {state['batch_id']} with {len(topics)} requests ({run_dir})")
+    else:
+        print(f"Nothing to submit: every topic duplicates an existing post ({run_dir})")
+    save_state(run_dir / "state.json", state)
+    return run_dir
+
+def wait_for_batch(backend, batch_id: str, poll_interval: float = 60.0, timeout: float = 24 * 3600) -> dict:
+    """Poll until the batch reaches a terminal status."""
+    started = time.monotonic()
+    while True:
+        info = backend.retrieve(batch_id)
+        print(f"  Batch {batch_id}: {info['status']} ({info['completed']}/{info['total']} done, {info['failed']} failed)")
+        if info["status"] in TERMINAL_STATUSES:
+            return info
+        if time.monotonic() - started > timeout:
+            raise TimeoutError(f"Batch {batch_id} still {info['status']} after {timeout:.0f}s")
+        time.sleep(poll_interval)
+
+def report_failures(run_dir: Path, backend, info: dict, state: dict) -> dict:
+    """
+    Download a batch's error file and print the requests that failed.
+
+    Returns:
+        Mapping of custom_id -> error message (also stored in state["failed"])
+    """
+    failed = {}
+    if info.get("error_file_id"):
+        errors = backend.download(info["error_file_id"])
+        (Path(run_dir) / "errors.jsonl").write_text(errors, encoding="utf-8")
+        for line in errors.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            error = result.get("error") or {}
+            response = result.get("response") or {}
+            message = error.get("message") or f"HTTP {response.get('status_code')}"
+            failed[result["custom_id"]] = message
+            print(f"  ✗ {state['manifest'].get(result['custom_id'], result['custom_id'])}: {message}")
+    state["failed"] = failed
+    return failed
+
+def collect_results(run_dir: Path, backend, poll_interval: float = 60.0, output_dir: str = None,
+                    use_cache: bool = False) -> list:
+    """
+    Wait for a submitted run and save every successful result as a post.
+
+    Failed requests are printed and recorded in state.json under "failed".
+    A result that fails validate_article is regenerated through the
+    interactive cascade (model_router.py), with the response cache when
+    use_cache is set. state.json is updated after every saved post, so a
+    collect that crashes partway can be resumed without saving any post twice.
+
+    Returns:
+        List of saved file paths
+    """
+    state_file = Path(run_dir) / "state.json"
+    state = json.loads(state_file.read_text(encoding="utf-8"))
+    if state["batch_id"] is None:
+        return []
+    info = wait_for_batch(backend, state["batch_id"], poll_interval)
+
+    report_failures(run_dir, backend, info, state)
+    save_state(state_file, state)
+    if not info.get("output_file_id"):
+        raise RuntimeError(f"Batch {state['batch_id']} ended as {info['status']} without output")
+
+    output = backend.download(info["output_file_id"])
+    (Path(run_dir) / "output.jsonl").write_text(output, encoding="utf-8")
+
+    saved = []
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        custom_id = result["custom_id"]
+        topic = state["manifest"].get(custom_id)
+        # Skip results already saved by an earlier collect of the same run
+        if custom_id in state["saved"] or topic is None:
+            continue
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            print(f"  ✗ {topic}: {result.get('error') or response.get('status_code')}")
+            continue
+        raw_content = response["body"]["choices"][0]["message"]["content"]
+        problems = validate_article(raw_content or "")
+        if problems:
+            print(f"  ✗ {topic} failed validation ({'; '.join(problems)}); regenerating")
+            try:
+                slug, content, redirect_map = generate_content(topic, affiliates=state.get("affiliates"), use_cache=use_cache)
+            except Exception as e:
+                print(f"  ✗ {topic}: {e}")
+                state["failed"][custom_id] = str(e)
+                save_state(state_file, state)
+                continue
+        else:
+            slug, content, redirect_map = build_post(topic, raw_content)
+        filepath = save_post(slug, content, redirect_map, output_dir)
+        saved.append(filepath)
+        state["saved"].append(custom_id)
+        save_state(state_file, state)
+        print(f"  ✓ Saved: {filepath}")
+
+    if state["failed"]:
+        print(f"  {len(state['failed'])} requests failed; see {Path(run_dir) / 'errors.jsonl'}")
+    if saved:
+        refresh_related_posts(output_dir)
+    return saved
+
+def run_batch_api(topics: list, affiliates: list, model: str = DEFAULT_MODEL, local: bool = False,
+                  poll_interval: float = 60.0, output_dir: str = None, use_cache: bool = False,
+                  allow_duplicate: bool = False) -> list:
+    """Submit a run and block until its posts are saved."""
+    backend = LocalBatchBackend(BATCH_DIR / "local") if local else OpenAIBatchBackend()
+    run_dir = submit_run(topics, affiliates, backend, model, allow_duplicate)
+    return collect_results(run_dir, backend, poll_interval, output_dir, use_cache)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate posts through the OpenAI Batch API")
+    parser.add_argument("topics", nargs="*", help="Topics to write about")
+    parser.add_argument("--topics-file", help="File with one topic per line")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="OpenAI model to use")
+    parser.add_argument("--output", "-o", help="Output directory for markdown files")
+    parser.add_argument("--affiliates", "-a", nargs="+", help="Affiliate partners to include (runpod, bluehost, codecademy, jasper, creatify)")
+    parser.add_argument("--poll-interval", type=float, default=60.0, help="Seconds between batch status checks")
+    parser.add_argument("--resume", help="Run directory of an already submitted batch to collect")
+    parser.add_argument("--local", action="store_true", help="Use the local file-based batch backend (no API calls)")
+    parser.add_argument("--cache", action="store_true", help="Use the local response cache when regenerating invalid results")
+    parser.add_argument("--allow-duplicate", action="store_true", help="Submit topics even if an existing post covers them")
+    args = parser.parse_args()
+
+    backend = LocalBatchBackend(BATCH_DIR / "local") if args.local else OpenAIBatchBackend()
+
+    if args.resume:
+        run_dir = Path(args.resume)
+    else:
+        topics = list(args.topics)
+        if args.topics_file:
+            topics += [t.strip() for t in Path(args.topics_file).read_text(encoding="utf-8").splitlines() if t.strip()]
+        if not topics:
+            parser.error("no topics given")
+        affiliates = args.affiliates or ["runpod", "bluehost", "codecademy", "jasper", "creatify"]
+        run_dir = submit_run(topics, affiliates, backend, args.model, args.allow_duplicate)
+
+    saved = collect_results(run_dir, backend, args.poll_interval, args.output, args.cache)
+    print(f"\nSaved {len(saved)} posts from {run_dir}")
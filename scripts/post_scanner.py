@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Post Scanner - Incremental frontmatter index of src/content/posts.
+
+Each post's frontmatter is parsed once with a YAML loader and the result is
+kept in data/post_manifest.json together with the file's mtime, size and
+content hash. Later scans only re-read files whose mtime or size changed,
+and only re-parse files whose content hash changed. When many files change
+at once (first run, bulk imports) they are parsed in a process pool.
+"""
+import os
+import re
+import json
+import uuid
+import hashlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+
+PROJECT_ROOT = Path(__file__).parent.parent
+CONTENT_DIR = PROJECT_ROOT / "src" / "content" / "posts"
+MANIFEST_FILE = PROJECT_ROOT / "data" / "post_manifest.json"
+# Below this many changed files a process pool costs more than it saves
+POOL_THRESHOLD = 32
+
+FRONTMATTER_PATTERN = re.compile(r'^---\s*\n(.*?)\n---', re.DOTALL)
+# libyaml's loader is several times faster when PyYAML was built with it
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def parse_post(path: str, known_sha256: str = None):
+    """
+    Read one post and extract the frontmatter fields the scripts use.
+
+    Args:
+        path: Post file
+        known_sha256: Content hash of the cached entry, if any
+
+    Returns:
+        Dict with sha256, title, description, tags and affiliate links
+        (plus an error message if the frontmatter could not be parsed),
+        or None if the content still matches known_sha256
+    """
+    raw = Path(path).read_bytes()
+    sha256 = hashlib.sha256(raw).hexdigest()
+    if sha256 == known_sha256:
+        return None
+    entry = {"sha256": sha256, "title": "", "description": "", "tags": [], "links": []}
+    match = FRONTMATTER_PATTERN.match(raw.decode("utf-8", errors="replace"))
+    if not match:
+        return entry
+    try:
+        frontmatter = yaml.load(match.group(1), Loader=YamlLoader) or {}
+    except yaml.YAMLError as e:
+        entry["error"] = str(e).splitlines()[0]
+        return entry
+    if not isinstance(frontmatter, dict):
+        return entry
+
+    entry["title"] = str(frontmatter.get("title") or "")
+    entry["description"] = str(frontmatter.get("description") or "")
+    entry["tags"] = [str(tag) for tag in frontmatter.get("tags") or []]
+    for link in frontmatter.get("affiliateLinks") or []:
+        if isinstance(link, dict) and link.get("url"):
+            entry["links"].append({"text": str(link.get("text") or ""), "url": str(link["url"])})
+    return entry
+
+def read_post(path: Path):
+    """
+    Read a post and split it into frontmatter and body.
+
+    Returns:
+        Tuple of (frontmatter dict, markdown body); the dict is empty if the frontmatter is missing or invalid
+    """
+    text = Path(path).read_text(encoding="utf-8", errors="replace")
+    match = FRONTMATTER_PATTERN.match(text)
+    if not match:
+        return {}, text
+    try:
+        frontmatter = yaml.load(match.group(1), Loader=YamlLoader) or {}
+    except yaml.YAMLError:
+        frontmatter = {}
+    return (frontmatter if isinstance(frontmatter, dict) else {}), text[match.end():]
+
+def load_manifest(manifest_file: Path = MANIFEST_FILE) -> dict:
+    try:
+        return json.loads(Path(manifest_file).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(manifest: dict, manifest_file: Path = MANIFEST_FILE):
+    manifest_file = Path(manifest_file)
+    manifest_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = manifest_file.with_name(f"{manifest_file.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(manifest, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, manifest_file)
+
+def scan_posts(content_dir: Path = CONTENT_DIR, manifest_file: Path = MANIFEST_FILE, workers: int = None):
+    """
+    Bring the manifest up to date with the posts on disk.
+
+    Args:
+        content_dir: Directory with the markdown posts
+        manifest_file: Where the manifest is cached
+        workers: Process pool size for parsing changed files (default: CPU count)
+
+    Returns:
+        Tuple of (manifest, changed) where manifest maps post filename -> entry
+        and changed lists filenames that were added, modified or removed
+    """
+    content_dir = Path(content_dir)
+    previous = load_manifest(manifest_file)
+    manifest = {}
+    to_parse = []
+
+    with os.scandir(content_dir) as entries:
+        for dir_entry in entries:
+            if not dir_entry.name.endswith(".md") or not dir_entry.is_file():
+                continue
+            stat = dir_entry.stat()
+            cached = previous.get(dir_entry.name)
+            if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+                manifest[dir_entry.name] = cached
+            else:
+                to_parse.append((dir_entry.name, dir_entry.path, stat))
+
+    def parsed_entries():
+        paths = [path for _, path, _ in to_parse]
+        known = [(previous.get(name) or {}).get("sha256") for name, _, _ in to_parse]
+        if len(paths) >= POOL_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                yield from pool.map(parse_post, paths, known, chunksize=16)
+        else:
+            yield from map(parse_post, paths, known)
+
+    changed = []
+    for (name, _, stat), entry in zip(to_parse, parsed_entries()):
+        if entry is None:
+            # Touched but identical content (checkout, copy) is not a change
+            entry = dict(previous[name])
+        else:
+            changed.append(name)
+        entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+        manifest[name] = entry
+
+    changed.extend(name for name in previous if name not in manifest)
+    if to_parse or changed:
+        save_manifest(manifest, manifest_file)
+    return manifest, changed
+
+if __name__ == "__main__":
+    import time
+
+    started = time.perf_counter()
+    manifest, changed = scan_posts()
+    print(f"Scanned {len(manifest)} posts in {time.perf_counter() - started:.2f}s ({len(changed)} changed)")
+    for name, entry in sorted(manifest.items()):
+        if entry.get("error"):
+            print(f"  ✗ {name}: {entry['error']}")
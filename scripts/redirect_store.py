@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Redirect Store - Cloaked affiliate paths and their target URLs.
+
+Mappings live in a SQLite file, so saving a post only upserts that post's
+rows instead of rewriting the whole map. SQLite serialises concurrent
+writers (parallel batch runs included). When a save only adds new paths,
+their rules are appended to public/_redirects; a changed target (or a fresh
+import) rebuilds it in a single streaming pass. Both run under an exclusive
+file lock, and rebuilds are published with an atomic rename, so readers
+never see a partial file and the last writer always writes the latest state.
+
+The SQLite file is a local index and is not committed. data/redirects.jsonl
+is the copy kept in git: an append-only log with one {"path", "url"} line
+per new or changed mapping (later lines win), so saving a post appends a
+line or two instead of rewriting the map. The store imports whatever was
+appended since it last read the log (a fresh checkout, a pull that brought
+new mappings), and `redirect_store.py --compact` rewrites the log to one
+line per mapping before it is committed.
+"""
+import os
+import json
+import uuid
+import sqlite3
+from pathlib import Path
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: rely on the atomic rename alone
+    fcntl = None
+
+PROJECT_ROOT = Path(__file__).parent.parent
+STORE_FILE = PROJECT_ROOT / "data" / "redirects.sqlite3"
+# The map as committed to git (the store itself is gitignored)
+EXPORT_FILE = PROJECT_ROOT / "data" / "redirects.jsonl"
+# The JSON map used before the log; imported once when no log exists yet
+LEGACY_FILE = PROJECT_ROOT / "data" / "redirects.json"
+REDIRECTS_FILE = PROJECT_ROOT / "public" / "_redirects"
+
+REDIRECTS_HEADER = [
+    "# Affiliate link redirects - auto-generated",
+    "# Do not edit manually",
+    ""
+]
+# Bytes before the import offset that must still match for the log to count as only appended to
+EXPORT_TAIL_BYTES = 64
+
+class RedirectStore:
+    def __init__(self, path: Path = STORE_FILE, export_file: Path = EXPORT_FILE):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.export_file = Path(export_file) if export_file else None
+        # Wait for other writers instead of failing with "database is locked"
+        self.conn = sqlite3.connect(self.path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS redirects (path TEXT PRIMARY KEY, url TEXT NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+        self.imported = 0
+        if self.export_file:
+            with self.lock():
+                self.imported = self._import_export_file()
+
+    def lock(self):
+        """Exclusive lock shared by everything that writes the export log or _redirects."""
+        return file_lock(self.path.with_name(self.path.name + ".lock"))
+
+    def _import_export_file(self) -> int:
+        """Upsert log lines appended since the last import; a rewritten log is read from the start."""
+        legacy_file = self.export_file.with_name(LEGACY_FILE.name)
+        if not self.export_file.exists():
+            if not legacy_file.exists():
+                return 0
+            imported = self.add(json.loads(legacy_file.read_text(encoding="utf-8")))
+            compact_export_file(self)
+            return imported
+
+        offset = int(self.get_meta("export_offset") or 0)
+        with open(self.export_file, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            tail_start = max(offset - EXPORT_TAIL_BYTES, 0)
+            f.seek(tail_start)
+            # Shorter than before or changed before the offset: compacted or replaced by a checkout
+            if size < offset or f.read(offset - tail_start).hex() != (self.get_meta("export_tail") or ""):
+                offset = 0
+                f.seek(0)
+            mappings = {}
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # A writer is mid-append (or crashed); read the line next time
+                    break
+                offset += len(line)
+                if line.strip():
+                    entry = json.loads(line)
+                    mappings[entry["path"]] = entry["url"]
+        imported = self.add(mappings)
+        self._mark_exported(offset)
+        return imported
+
+    def _mark_exported(self, offset: int):
+        """Record how much of the log the store already holds."""
+        with open(self.export_file, "rb") as f:
+            tail_start = max(offset - EXPORT_TAIL_BYTES, 0)
+            f.seek(tail_start)
+            tail = f.read(offset - tail_start)
+        self.set_meta("export_offset", str(offset))
+        self.set_meta("export_tail", tail.hex())
+
+    def get_meta(self, key: str):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def upsert(self, redirect_map: dict) -> dict:
+        """
+        Insert or update mappings.
+
+        Returns:
+            Dict of the rows that actually changed: path -> (url, whether the path is new)
+        """
+        changed = {}
+        with self.conn:
+            for cloaked_path, url in redirect_map.items():
+                row = self.conn.execute("SELECT url FROM redirects WHERE path = ?", (cloaked_path,)).fetchone()
+                if row is None:
+                    self.conn.execute("INSERT INTO redirects (path, url) VALUES (?, ?)", (cloaked_path, url))
+                    changed[cloaked_path] = (url, True)
+                elif row[0] != url:
+                    self.conn.execute("UPDATE redirects SET url = ? WHERE path = ?", (url, cloaked_path))
+                    changed[cloaked_path] = (url, False)
+        return changed
+
+    def add(self, redirect_map: dict) -> int:
+        """Insert or update mappings; returns how many rows actually changed."""
+        return len(self.upsert(redirect_map))
+
+    def items(self):
+        """Yield (path, url) pairs in the order they were first added."""
+        yield from self.conn.execute("SELECT path, url FROM redirects ORDER BY rowid")
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM redirects").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+@contextmanager
+def file_lock(lock_path: Path):
+    """Exclusive advisory lock held for the duration of the block."""
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _replace_atomic(path: Path, write):
+    """Write a sibling temp file with write(f) and rename it over path."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            write(f)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+def _redirect_rule(cloaked_path: str, actual_url: str) -> str:
+    # Use 302 (temporary) redirect to avoid caching issues
+    return f"{cloaked_path}  {actual_url}  302\n"
+
+def _export_line(cloaked_path: str, actual_url: str) -> str:
+    return json.dumps({"path": cloaked_path, "url": actual_url}) + "\n"
+
+def write_redirects_file(store: RedirectStore, redirects_file: Path = REDIRECTS_FILE) -> int:
+    """
+    Rebuild the Netlify _redirects file from the store.
+    Format: /go/slug  https://actual-url.com  302
+
+    Returns:
+        Number of redirect rules written
+    """
+    written = 0
+
+    def write(f):
+        nonlocal written
+        f.write("\n".join(REDIRECTS_HEADER) + "\n")
+        for cloaked_path, actual_url in store.items():
+            f.write(_redirect_rule(cloaked_path, actual_url))
+            written += 1
+
+    with store.lock():
+        _replace_atomic(Path(redirects_file), write)
+    return written
+
+def append_redirects_file(store: RedirectStore, new_rules: dict, redirects_file: Path = REDIRECTS_FILE):
+    """Append rules for paths that are not in _redirects yet (a changed target needs a rebuild instead)."""
+    with store.lock():
+        with open(redirects_file, "a", encoding="utf-8") as f:
+            for cloaked_path, actual_url in new_rules.items():
+                f.write(_redirect_rule(cloaked_path, actual_url))
+
+def append_export_file(store: RedirectStore, changed: dict):
+    """Append new or changed mappings to data/redirects.jsonl (the committed copy of the store)."""
+    store.export_file.parent.mkdir(parents=True, exist_ok=True)
+    with store.lock():
+        # The store already holds anything other writers appended, so skipping past it is safe
+        with open(store.export_file, "a", encoding="utf-8") as f:
+            for cloaked_path, actual_url in changed.items():
+                f.write(_export_line(cloaked_path, actual_url))
+        store._mark_exported(store.export_file.stat().st_size)
+
+def compact_export_file(store: RedirectStore) -> int:
+    """
+    Rewrite data/redirects.jsonl with one line per mapping (run before committing).
+
+    Callers opening a store hold its lock already; this does not take it again.
+
+    Returns:
+        Number of mappings written
+    """
+    written = 0
+
+    def write(f):
+        nonlocal written
+        for cloaked_path, actual_url in store.items():
+            f.write(_export_line(cloaked_path, actual_url))
+            written += 1
+
+    _replace_atomic(store.export_file, write)
+    store._mark_exported(store.export_file.stat().st_size)
+    return written
+
+def save_redirects(redirect_map: dict, project_root: Path = PROJECT_ROOT) -> int:
+    """
+    Add a post's mappings to the store, the export log and _redirects.
+
+    Returns:
+        Number of mappings that were new or changed
+    """
+    project_root = Path(project_root)
+    redirects_file = project_root / REDIRECTS_FILE.relative_to(PROJECT_ROOT)
+    store = RedirectStore(project_root / STORE_FILE.relative_to(PROJECT_ROOT),
+                          project_root / EXPORT_FILE.relative_to(PROJECT_ROOT))
+    try:
+        changed = store.upsert(redirect_map)
+        if changed:
+            append_export_file(store, {path: url for path, (url, _) in changed.items()})
+        if store.imported or not redirects_file.exists() or not all(is_new for _, is_new in changed.values()):
+            write_redirects_file(store, redirects_file)
+        elif changed:
+            append_redirects_file(store, {path: url for path, (url, _) in changed.items()}, redirects_file)
+        return len(changed)
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain the redirect export log")
+    parser.add_argument("--compact", action="store_true", help="Rewrite data/redirects.jsonl to one line per mapping")
+    args = parser.parse_args()
+
+    store = RedirectStore()
+    try:
+        if args.compact:
+            with store.lock():
+                print(f"Compacted {compact_export_file(store)} redirects into {EXPORT_FILE}")
+        else:
+            print(f"{store.count()} redirects in {store.path}")
+    finally:
+        store.close()
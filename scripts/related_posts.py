@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Related Posts - Precomputed "related reading" links for every post.
+
+Posts are turned into sparse TF-IDF vectors (title and tags weighted above
+the body) and each post's nearest neighbours by cosine similarity are
+written to src/data/related-posts.json, which the post layout reads at build
+time. Term counts, vocabulary and neighbour lists are kept in
+data/related_index/, so adding a post only scores the new post against the
+corpus instead of recomputing every pair. IDF weights drift slightly as
+posts are added; the index is rebuilt from scratch once the corpus has
+grown by REBUILD_GROWTH, or when a post is edited or deleted. The index is
+a local cache (not committed); without it the next run does a full build.
+"""
+import os
+import re
+import json
+import uuid
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+from post_scanner import CONTENT_DIR, read_post, scan_posts
+
+PROJECT_ROOT = Path(__file__).parent.parent
+INDEX_DIR = PROJECT_ROOT / "data" / "related_index"
+OUTPUT_FILE = PROJECT_ROOT / "src" / "data" / "related-posts.json"
+
+TOP_K = 5
+# Pairs below this cosine similarity are not worth linking
+MIN_SCORE = 0.05
+# Full rebuild once the corpus is this much larger than at the last build
+REBUILD_GROWTH = 1.25
+# Rows scored per block during a full build (bounds the dense similarity block)
+BLOCK_SIZE = 512
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9+#]+")
+CODE_BLOCK_PATTERN = re.compile(r"```[\s\S]*?```")
+STOPWORDS = frozenset("""
+a about above after again all also an and any are as at be because been before being below between both but by
+can could did do does doing down during each few for from further had has have having here how if in into is it
+its itself just more most no nor not now of off on once only or other our out over own same should so some such
+than that the their them then there these they this those through to too under until up very was we were what
+when where which while who whom why will with would you your yours
+""".split())
+
+def tokenize(text: str) -> list:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+def read_post_tokens(path: Path) -> list:
+    """Tokens for one post; title, tags and description count extra."""
+    frontmatter, body = read_post(path)
+    tags = " ".join(str(tag) for tag in frontmatter.get("tags") or []).replace("-", " ")
+    body = CODE_BLOCK_PATTERN.sub(" ", body)
+    return (tokenize(str(frontmatter.get("title") or "")) * 3 + tokenize(tags) * 2
+            + tokenize(str(frontmatter.get("description") or "")) * 2 + tokenize(body))
+
+class RelatedIndex:
+    """Term counts for every post plus the current neighbour lists."""
+
+    def __init__(self):
+        self.slugs = []
+        self.hashes = {}
+        self.vocab = {}
+        self.counts = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.neighbors = {}
+        self.built_docs = 0
+
+    @classmethod
+    def load(cls, index_dir: Path = INDEX_DIR):
+        index_dir = Path(index_dir)
+        try:
+            meta = json.loads((index_dir / "index.json").read_text(encoding="utf-8"))
+            counts = sp.load_npz(index_dir / "counts.npz").tocsr()
+        except (OSError, ValueError):
+            return None
+        index = cls()
+        index.slugs = meta["slugs"]
+        index.hashes = meta["hashes"]
+        index.vocab = {term: i for i, term in enumerate(meta["vocab"])}
+        index.counts = counts
+        index.neighbors = {slug: [tuple(pair) for pair in pairs] for slug, pairs in meta["neighbors"].items()}
+        index.built_docs = meta["built_docs"]
+        return index
+
+    def save(self, index_dir: Path = INDEX_DIR):
+        index_dir = Path(index_dir)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        suffix = uuid.uuid4().hex
+        # Uncompressed: zlib would dominate the cost of an incremental update
+        sp.save_npz(index_dir / f"counts.{suffix}.npz", self.counts, compressed=False)
+        os.replace(index_dir / f"counts.{suffix}.npz", index_dir / "counts.npz")
+        vocab = [None] * len(self.vocab)
+        for term, i in self.vocab.items():
+            vocab[i] = term
+        meta = {
+            "slugs": self.slugs,
+            "hashes": self.hashes,
+            "vocab": vocab,
+            "neighbors": self.neighbors,
+            "built_docs": self.built_docs
+        }
+        tmp = index_dir / f"index.{suffix}.json"
+        tmp.write_text(json.dumps(meta, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp, index_dir / "index.json")
+
+    def add_documents(self, docs: list) -> list:
+        """Append (slug, sha256, tokens) documents; returns their row numbers."""
+        rows, cols, values = [], [], []
+        for row, (_, _, tokens) in enumerate(docs):
+            counts = {}
+            for token in tokens:
+                col = self.vocab.setdefault(token, len(self.vocab))
+                counts[col] = counts.get(col, 0) + 1
+            rows.extend([row] * len(counts))
+            cols.extend(counts.keys())
+            values.extend(counts.values())
+        new = sp.csr_matrix((values, (rows, cols)), shape=(len(docs), len(self.vocab)), dtype=np.float32)
+        old = self.counts
+        old.resize((old.shape[0], len(self.vocab)))
+        self.counts = sp.vstack([old, new], format="csr")
+        first = len(self.slugs)
+        for slug, sha256, _ in docs:
+            self.slugs.append(slug)
+            self.hashes[slug] = sha256
+        return list(range(first, len(self.slugs)))
+
+    def vectors(self) -> sp.csr_matrix:
+        """L2-normalised TF-IDF rows (sublinear term frequency, smoothed IDF)."""
+        n = self.counts.shape[0]
+        df = np.bincount(self.counts.indices, minlength=self.counts.shape[1])
+        idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+        tfidf = self.counts.copy()
+        tfidf.data = 1 + np.log(tfidf.data)
+        tfidf = tfidf.multiply(idf).tocsr()
+        norms = np.sqrt(np.asarray(tfidf.multiply(tfidf).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sp.diags(1 / norms).dot(tfidf).tocsr()
+
+    def _top(self, scores: np.ndarray, exclude: int, top_k: int) -> list:
+        scores[exclude] = -1
+        k = min(top_k, len(scores) - 1)
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.slugs[i], round(float(scores[i]), 4)) for i in best if scores[i] >= MIN_SCORE]
+
+    def rebuild_neighbors(self, top_k: int = TOP_K):
+        vectors = self.vectors()
+        transposed = vectors.T.tocsc()
+        self.neighbors = {}
+        for start in range(0, vectors.shape[0], BLOCK_SIZE):
+            block = (vectors[start:start + BLOCK_SIZE] @ transposed).toarray()
+            for offset, scores in enumerate(block):
+                row = start + offset
+                self.neighbors[self.slugs[row]] = self._top(scores, row, top_k)
+        self.built_docs = len(self.slugs)
+
+    def update_neighbors(self, rows: list, top_k: int = TOP_K):
+        """Score only the new rows against the corpus and merge them into existing lists."""
+        vectors = self.vectors()
+        block = (vectors[rows] @ vectors.T.tocsc()).toarray()
+        new_slugs = {self.slugs[row] for row in rows}
+        for offset, row in enumerate(rows):
+            self.neighbors[self.slugs[row]] = self._top(block[offset].copy(), row, top_k)
+        for col, slug in enumerate(self.slugs):
+            if slug in new_slugs:
+                continue
+            candidates = [(self.slugs[row], round(float(block[offset, col]), 4)) for offset, row in enumerate(rows)]
+            merged = self.neighbors.get(slug, []) + [c for c in candidates if c[1] >= MIN_SCORE]
+            self.neighbors[slug] = sorted(merged, key=lambda pair: -pair[1])[:top_k]
+
+def write_related_file(index: RelatedIndex, output_file: Path = OUTPUT_FILE):
+    """Write slug -> related slugs in a compact form for the Astro layout."""
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    related = {slug: [other for other, _ in index.neighbors.get(slug, [])] for slug in sorted(index.slugs)}
+    tmp = output_file.with_name(f".{output_file.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(related, separators=(",", ":")) + "\n", encoding="utf-8")
+    os.replace(tmp, output_file)
+
+def update_related_posts(content_dir: Path = CONTENT_DIR, index_dir: Path = INDEX_DIR,
+                         output_file: Path = OUTPUT_FILE, rebuild: bool = False) -> dict:
+    """
+    Bring the index and related-posts file up to date with the posts on disk.
+
+    Returns:
+        Dict with the number of posts, how many were added and whether a full rebuild ran
+    """
+    content_dir = Path(content_dir)
+    manifest, _ = scan_posts(content_dir)
+    on_disk = {name[:-3]: entry["sha256"] for name, entry in manifest.items()}
+
+    index = None if rebuild else RelatedIndex.load(index_dir)
+    if index is not None:
+        stale = any(on_disk.get(slug) != sha256 for slug, sha256 in index.hashes.items())
+        added = [slug for slug in sorted(on_disk) if slug not in index.hashes]
+        if stale or len(index.slugs) + len(added) > max(index.built_docs, 1) * REBUILD_GROWTH:
+            index = None
+    if index is not None:
+        if added:
+            rows = index.add_documents([(slug, on_disk[slug], read_post_tokens(content_dir / f"{slug}.md")) for slug in added])
+            index.update_neighbors(rows)
+        full = False
+    else:
+        index = RelatedIndex()
+        added = sorted(on_disk)
+        index.add_documents([(slug, on_disk[slug], read_post_tokens(content_dir / f"{slug}.md")) for slug in added])
+        index.rebuild_neighbors()
+        full = True
+
+    if full or added or not Path(output_file).exists():
+        index.save(index_dir)
+        write_related_file(index, output_file)
+    return {"posts": len(index.slugs), "added": len(added), "rebuilt": full}
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Update the related-posts index")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute every post's neighbours from scratch")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    result = update_related_posts(rebuild=args.rebuild)
+    print(f"Indexed {result['posts']} posts ({result['added']} added, "
+          f"{'full rebuild' if result['rebuilt'] else 'incremental'}) in {time.perf_counter() - started:.2f}s")
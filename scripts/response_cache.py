@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Response Cache - Persists chat completion responses keyed by the exact request.
+
+Used while iterating on templates and prompts so reruns for the same topic
+don't pay for another GPT-4 call. Entries are stored in a local SQLite file
+with a TTL and an entry/byte budget (least recently used entries go first).
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from pathlib import Path
+
+CACHE_FILE = Path(__file__).parent.parent / "data" / "response_cache.sqlite3"
+CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "500"))
+CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+def cache_key(model: str, messages: list, temperature: float, max_tokens: int) -> str:
+    """Hash of everything that determines the response: model, system + user prompt and sampling settings."""
+    system_prompt = "\n".join(m["content"] for m in messages if m["role"] == "system")
+    user_prompt = "\n".join(m["content"] for m in messages if m["role"] != "system")
+    payload = json.dumps([model, system_prompt, user_prompt, temperature, max_tokens])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    def __init__(self, path: Path = CACHE_FILE, ttl: int = CACHE_TTL,
+                 max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, content TEXT,"
+            " size INTEGER, created_at REAL, accessed_at REAL)"
+        )
+        self.conn.commit()
+
+    def get(self, key: str):
+        """Return the cached response text, or None if missing or expired."""
+        now = time.time()
+        row = self.conn.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        content, created_at = row
+        if now - created_at > self.ttl:
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.conn.commit()
+            return None
+        self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        return content
+
+    def put(self, key: str, model: str, content: str):
+        # Responses without text (refusals, tool calls) are not worth replaying
+        if content is None:
+            return
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, content, size, created_at, accessed_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, model, content, len(content.encode("utf-8")), now, now)
+        )
+        self._evict(now)
+        self.conn.commit()
+
+    def _evict(self, now: float):
+        self.conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        # Drop least recently used entries until both budgets are met
+        while True:
+            count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self.conn.execute(
+                "DELETE FROM responses WHERE key = (SELECT key FROM responses ORDER BY accessed_at LIMIT 1)"
+            )
+
+    def purge(self) -> int:
+        """Delete every entry; returns how many were removed."""
+        removed = self.conn.execute("DELETE FROM responses").rowcount
+        self.conn.commit()
+        self.conn.execute("VACUUM")
+        return removed
+
+    def stats(self) -> dict:
+        count, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": count, "bytes": total, "path": str(self.path)}
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or purge the response cache")
+    parser.add_argument("--purge", action="store_true", help="Delete all cached responses")
+    args = parser.parse_args()
+
+    with ResponseCache() as cache:
+        if args.purge:
+            print(f"Purged {cache.purge()} cached responses")
+        print(json.dumps(cache.stats()))
@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# The scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+EXISTING_POST = """---
+title: "Choosing a Game Engine: Unity vs Godot"
+description: "Unity and Godot compared for indie developers."
+tags:
+  - "game-engine"
+---
+
+Unity and Godot both ship 2D and 3D tooling.
+"""
+
+
+@pytest.fixture
+def existing_post(tmp_path, monkeypatch):
+    """Check duplicates against one known post instead of the site's collection."""
+    import duplicate_check
+
+    post = tmp_path / "choosing-game-engine.md"
+    post.write_text(EXISTING_POST, encoding="utf-8")
+    index = duplicate_check.DuplicateIndex()
+    index.add_posts([("choosing-game-engine", "0" * 64, post)])
+    monkeypatch.setattr(duplicate_check, "load_index", lambda: index)
+    return post
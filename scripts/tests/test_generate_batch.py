@@ -0,0 +1,58 @@
+"""generate_batch.py run_batch: duplicate filtering, the validated cascade and the post-save hook"""
+import json
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+import content_generator
+import generate_batch
+import model_router
+from openai_batch import LocalBatchBackend
+
+
+class FakeAsyncOpenAI:
+    """Answers like LocalBatchBackend, except the first request for each topic breaks the JSON."""
+
+    def __init__(self, **kwargs):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        FakeAsyncOpenAI.instance = self
+
+    async def create(self, model, messages, max_tokens, temperature):
+        self.requests.append(messages)
+        body = LocalBatchBackend._complete(None, {"model": model, "messages": messages[:2]})
+        content = body["choices"][0]["message"]["content"]
+        if len(messages) == 2:
+            content = content[:-1]
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=None)
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def batch_env(tmp_path, monkeypatch, existing_post):
+    monkeypatch.setattr(generate_batch, "AsyncOpenAI", FakeAsyncOpenAI)
+    monkeypatch.setattr(content_generator, "save_redirect_map", lambda redirect_map, project_root=None: None)
+    monkeypatch.setattr(model_router.ModelStats.__init__, "__defaults__", (tmp_path / "model_stats.json",))
+    refreshed = []
+    monkeypatch.setattr(generate_batch, "refresh_related_posts", refreshed.append)
+    return tmp_path, refreshed
+
+
+def test_run_batch_skips_duplicates_repairs_invalid_responses_and_runs_the_hook(batch_env):
+    tmp_path, refreshed = batch_env
+    topics = ["Vector Databases", "Choosing a Game Engine: Godot vs Unity"]
+    saved = asyncio.run(generate_batch.run_batch(
+        topics, ["runpod"], model="gpt-4", output_dir=str(tmp_path / "posts")))
+
+    assert len(saved) == 1
+    assert "Vector Databases: An Offline Draft" in Path(saved[0]).read_text(encoding="utf-8")
+    # The broken first response went through a repair pass, not straight to disk
+    requests = FakeAsyncOpenAI.instance.requests
+    assert len(requests) == 2 and "problems" in requests[1][-1]["content"]
+    stats = json.loads((tmp_path / "model_stats.json").read_text(encoding="utf-8"))
+    assert stats["gpt-4"]["attempts"] == 1 and stats["gpt-4"]["repaired"] == 1
+    assert refreshed == [str(tmp_path / "posts")]
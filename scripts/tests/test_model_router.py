@@ -0,0 +1,46 @@
+"""model_router.py stats persistence and the cache/validation interplay in fetch_completion"""
+import json
+from functools import partial
+
+import content_generator
+import response_cache
+from model_router import ModelStats
+
+
+def test_concurrent_runs_merge_their_stats(tmp_path):
+    path = tmp_path / "model_stats.json"
+    first, second = ModelStats(path), ModelStats(path)
+    first.record("gpt-3.5-turbo", accepted=True, latency_ms=100)
+    second.record("gpt-3.5-turbo", accepted=False, latency_ms=300)
+    second.record("gpt-4", accepted=True)
+    first.save()
+    second.save()
+    # Saving again adds nothing twice
+    first.save()
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["gpt-3.5-turbo"]["attempts"] == 2
+    assert data["gpt-3.5-turbo"]["accepted"] == 1
+    assert data["gpt-3.5-turbo"]["latency_ms"] == 140.0
+    assert data["gpt-4"]["accepted"] == 1
+
+
+def test_only_valid_responses_are_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, "ResponseCache", partial(response_cache.ResponseCache, tmp_path / "cache.sqlite3"))
+    responses = iter(["not json", "still not json", '{"ok": true}', "unused"])
+    requests = []
+
+    def request(messages, model):
+        requests.append(model)
+        return next(responses)
+
+    def validate(text):
+        return [] if text.startswith("{") else ["response is not a JSON object"]
+
+    messages = [{"role": "user", "content": "hello"}]
+    fetch = partial(content_generator.fetch_completion, messages, "gpt-4", True, request, validate)
+    assert fetch() == ("not json", False)
+    assert fetch() == ("still not json", False)
+    assert fetch() == ('{"ok": true}', False)
+    assert fetch() == ('{"ok": true}', True)
+    assert len(requests) == 3
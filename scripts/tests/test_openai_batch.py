@@ -0,0 +1,126 @@
+"""openai_batch.py submit/collect against LocalBatchBackend, the offline stand-in for the Batch API"""
+import json
+from pathlib import Path
+
+import pytest
+
+import content_generator
+import openai_batch
+from openai_batch import LocalBatchBackend, collect_results, submit_run
+
+TOPICS = ["Vector Databases", "Local LLM Inference"]
+
+
+@pytest.fixture
+def run_env(tmp_path, monkeypatch, existing_post):
+    monkeypatch.setattr(openai_batch, "BATCH_DIR", tmp_path / "batches")
+    # Keep the project's redirect store out of it
+    redirects = []
+    monkeypatch.setattr(content_generator, "save_redirect_map", lambda redirect_map, project_root=None: redirects.append(redirect_map))
+    return tmp_path / "posts", LocalBatchBackend(tmp_path / "backend")
+
+
+def state_of(run_dir: Path) -> dict:
+    return json.loads((run_dir / "state.json").read_text(encoding="utf-8"))
+
+
+def test_run_saves_one_post_per_topic(run_env):
+    posts, backend = run_env
+    run_dir = submit_run(TOPICS, ["runpod"], backend)
+    saved = collect_results(run_dir, backend, poll_interval=0, output_dir=str(posts))
+    assert len(saved) == 2
+    assert "title: \"Vector Databases: An Offline Draft\"" in Path(saved[0]).read_text(encoding="utf-8")
+    assert sorted(state_of(run_dir)["saved"]) == ["post-0", "post-1"]
+    # Collecting the same run again saves nothing new
+    assert collect_results(run_dir, backend, poll_interval=0, output_dir=str(posts)) == []
+    assert len(list(posts.iterdir())) == 2
+
+
+def test_resume_after_crash_does_not_duplicate_posts(run_env, monkeypatch):
+    posts, backend = run_env
+    run_dir = submit_run(TOPICS, ["runpod"], backend)
+    real_save_post = openai_batch.save_post
+    calls = []
+
+    def crash_on_second_post(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return real_save_post(*args)
+
+    monkeypatch.setattr(openai_batch, "save_post", crash_on_second_post)
+    with pytest.raises(KeyboardInterrupt):
+        collect_results(run_dir, backend, poll_interval=0, output_dir=str(posts))
+    assert state_of(run_dir)["saved"] == ["post-0"]
+
+    monkeypatch.setattr(openai_batch, "save_post", real_save_post)
+    assert len(collect_results(run_dir, backend, poll_interval=0, output_dir=str(posts))) == 1
+    assert len(list(posts.iterdir())) == 2
+
+
+def test_failed_requests_are_reported(run_env, capsys):
+    posts, _ = run_env
+
+    class RejectingBackend(LocalBatchBackend):
+        def _complete(self, body):
+            if "Local LLM Inference" in body["messages"][-1]["content"]:
+                raise ValueError("context_length_exceeded")
+            return super()._complete(body)
+
+    backend = RejectingBackend(posts.parent / "backend")
+    run_dir = submit_run(TOPICS, ["runpod"], backend)
+    saved = collect_results(run_dir, backend, poll_interval=0, output_dir=str(posts))
+    assert len(saved) == 1
+    assert state_of(run_dir)["failed"] == {"post-1": "context_length_exceeded"}
+    assert (run_dir / "errors.jsonl").exists()
+    assert "Local LLM Inference: context_length_exceeded" in capsys.readouterr().out
+
+
+def test_runs_started_in_the_same_second_get_their_own_directories(run_env):
+    _, backend = run_env
+    assert submit_run(TOPICS, ["runpod"], backend) != submit_run(TOPICS, ["runpod"], backend)
+
+
+def test_duplicate_topics_are_not_submitted(run_env):
+    posts, backend = run_env
+    run_dir = submit_run(TOPICS + ["Choosing a Game Engine: Godot vs Unity"], ["runpod"], backend)
+    state = state_of(run_dir)
+    assert sorted(state["manifest"].values()) == sorted(TOPICS)
+    assert state["skipped"]["Choosing a Game Engine: Godot vs Unity"]["slug"] == "choosing-game-engine"
+    assert len(collect_results(run_dir, backend, poll_interval=0, output_dir=str(posts))) == 2
+
+
+def test_run_with_only_duplicates_submits_nothing(run_env):
+    posts, backend = run_env
+    run_dir = submit_run(["Choosing a Game Engine: Godot vs Unity"], ["runpod"], backend)
+    assert state_of(run_dir)["batch_id"] is None
+    assert not (run_dir / "batch.jsonl").exists()
+    assert collect_results(run_dir, backend, poll_interval=0, output_dir=str(posts)) == []
+
+
+def test_invalid_results_are_regenerated_and_posts_refresh_related_links(run_env, monkeypatch):
+    posts, _ = run_env
+
+    class SloppyBackend(LocalBatchBackend):
+        def _complete(self, body):
+            result = super()._complete(body)
+            if "Local LLM Inference" in body["messages"][-1]["content"]:
+                result["choices"][0]["message"]["content"] = "not json"
+            return result
+
+    regenerated, refreshed = [], []
+
+    def fake_generate_content(topic, affiliates=None, use_cache=False):
+        regenerated.append((topic, affiliates))
+        return content_generator.build_post(topic, LocalBatchBackend._complete(backend, {
+            "model": "gpt-4", "messages": [{"role": "user", "content": f'article about: "{topic}"'}]
+        })["choices"][0]["message"]["content"])
+
+    monkeypatch.setattr(openai_batch, "generate_content", fake_generate_content)
+    monkeypatch.setattr(openai_batch, "refresh_related_posts", refreshed.append)
+    backend = SloppyBackend(posts.parent / "backend")
+    run_dir = submit_run(TOPICS, ["runpod"], backend)
+    saved = collect_results(run_dir, backend, poll_interval=0, output_dir=str(posts))
+    assert len(saved) == 2
+    assert regenerated == [("Local LLM Inference", ["runpod"])]
+    assert refreshed == [str(posts)]
@@ -0,0 +1,83 @@
+"""post_scanner.py: the manifest only re-reads changed files and only reports real changes"""
+import os
+
+import pytest
+
+import post_scanner
+from post_scanner import scan_posts
+
+
+def write_post(directory, name, title, tags=("ai",)):
+    tag_lines = "".join(f'  - "{tag}"\n' for tag in tags)
+    (directory / name).write_text(f'---\ntitle: "{title}"\ndescription: "About {title}"\ntags:\n{tag_lines}---\n\nBody.\n',
+                                  encoding="utf-8")
+
+
+@pytest.fixture
+def posts(tmp_path, monkeypatch):
+    content = tmp_path / "posts"
+    content.mkdir()
+    for i in range(3):
+        write_post(content, f"post-{i}.md", f"Post {i}")
+    parsed = []
+    real_parse_post = post_scanner.parse_post
+
+    def counting_parse_post(path, known_sha256=None):
+        parsed.append(os.path.basename(path))
+        return real_parse_post(path, known_sha256)
+
+    monkeypatch.setattr(post_scanner, "parse_post", counting_parse_post)
+    return content, tmp_path / "manifest.json", parsed
+
+
+def test_unchanged_files_are_not_read_again(posts):
+    content, manifest_file, parsed = posts
+    manifest, changed = scan_posts(content, manifest_file)
+    assert sorted(changed) == ["post-0.md", "post-1.md", "post-2.md"]
+    assert manifest["post-1.md"]["title"] == "Post 1" and manifest["post-1.md"]["tags"] == ["ai"]
+    saved_at = manifest_file.stat().st_mtime_ns
+
+    parsed.clear()
+    again, changed = scan_posts(content, manifest_file)
+    assert parsed == [] and changed == []
+    assert again == manifest
+    # Nothing changed, so the manifest is not rewritten either
+    assert manifest_file.stat().st_mtime_ns == saved_at
+
+
+def test_touched_but_identical_files_are_not_changes(posts):
+    content, manifest_file, parsed = posts
+    scan_posts(content, manifest_file)
+    stat = (content / "post-0.md").stat()
+    os.utime(content / "post-0.md", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    parsed.clear()
+    manifest, changed = scan_posts(content, manifest_file)
+    assert parsed == ["post-0.md"] and changed == []
+    assert manifest["post-0.md"]["mtime_ns"] == stat.st_mtime_ns + 10 ** 9
+
+
+def test_edits_additions_and_removals_are_reported(posts):
+    content, manifest_file, parsed = posts
+    scan_posts(content, manifest_file)
+    write_post(content, "post-0.md", "Post 0, revised", tags=("ai", "gpu"))
+    write_post(content, "post-3.md", "Post 3")
+    (content / "post-2.md").unlink()
+    (content / "broken.md").write_text("---\ntitle: [unclosed\n---\n", encoding="utf-8")
+
+    parsed.clear()
+    manifest, changed = scan_posts(content, manifest_file)
+    assert sorted(parsed) == ["broken.md", "post-0.md", "post-3.md"]
+    assert sorted(changed) == ["broken.md", "post-0.md", "post-2.md", "post-3.md"]
+    assert manifest["post-0.md"]["tags"] == ["ai", "gpu"]
+    assert "post-2.md" not in manifest
+    assert manifest["broken.md"]["error"]
+
+
+def test_process_pool_gives_the_same_manifest(tmp_path, monkeypatch):
+    for i in range(4):
+        write_post(tmp_path, f"post-{i}.md", f"Post {i}")
+    serial, _ = scan_posts(tmp_path, tmp_path / "serial.json")
+    monkeypatch.setattr(post_scanner, "POOL_THRESHOLD", 1)
+    pooled, changed = scan_posts(tmp_path, tmp_path / "pooled.json", workers=2)
+    assert pooled == serial and len(changed) == 4
@@ -0,0 +1,82 @@
+"""redirect_store.py: the append-only export log and incremental _redirects updates"""
+import json
+from pathlib import Path
+
+from redirect_store import RedirectStore, compact_export_file, save_redirects
+
+
+def log_lines(root: Path) -> list:
+    return [json.loads(line) for line in (root / "data" / "redirects.jsonl").read_text(encoding="utf-8").splitlines()]
+
+
+def rules(root: Path) -> list:
+    return [line for line in (root / "public" / "_redirects").read_text(encoding="utf-8").splitlines()
+            if line.startswith("/go/")]
+
+
+def test_new_paths_are_appended_not_rewritten(tmp_path):
+    assert save_redirects({"/go/a": "https://a"}, tmp_path) == 1
+    redirects_inode = (tmp_path / "public" / "_redirects").stat().st_ino
+    assert save_redirects({"/go/b": "https://b"}, tmp_path) == 1
+    # Saving the same mappings again changes nothing
+    assert save_redirects({"/go/b": "https://b"}, tmp_path) == 0
+
+    assert log_lines(tmp_path) == [{"path": "/go/a", "url": "https://a"}, {"path": "/go/b", "url": "https://b"}]
+    assert rules(tmp_path) == ["/go/a  https://a  302", "/go/b  https://b  302"]
+    # Appended in place rather than replaced by a rebuilt file
+    assert (tmp_path / "public" / "_redirects").stat().st_ino == redirects_inode
+
+
+def test_changed_target_rebuilds_redirects(tmp_path):
+    save_redirects({"/go/a": "https://a", "/go/b": "https://b"}, tmp_path)
+    assert save_redirects({"/go/a": "https://a2"}, tmp_path) == 1
+    assert rules(tmp_path) == ["/go/a  https://a2  302", "/go/b  https://b  302"]
+    # The log keeps history; the later line wins on import
+    assert log_lines(tmp_path)[-1] == {"path": "/go/a", "url": "https://a2"}
+
+
+def test_fresh_checkout_rebuilds_the_store_from_the_log(tmp_path):
+    save_redirects({"/go/a": "https://a"}, tmp_path)
+    save_redirects({"/go/a": "https://a2", "/go/b": "https://b"}, tmp_path)
+    (tmp_path / "data" / "redirects.sqlite3").unlink()
+
+    store = RedirectStore(tmp_path / "data" / "redirects.sqlite3", tmp_path / "data" / "redirects.jsonl")
+    try:
+        assert dict(store.items()) == {"/go/a": "https://a2", "/go/b": "https://b"}
+    finally:
+        store.close()
+
+
+def test_store_reads_only_lines_appended_elsewhere(tmp_path):
+    save_redirects({"/go/a": "https://a"}, tmp_path)
+    # Another checkout appended a mapping and the log was pulled
+    with open(tmp_path / "data" / "redirects.jsonl", "a", encoding="utf-8") as f:
+        f.write(json.dumps({"path": "/go/c", "url": "https://c"}) + "\n")
+
+    save_redirects({"/go/b": "https://b"}, tmp_path)
+    assert rules(tmp_path) == ["/go/a  https://a  302", "/go/c  https://c  302", "/go/b  https://b  302"]
+
+
+def test_compacted_log_is_reimported(tmp_path):
+    save_redirects({"/go/a": "https://a"}, tmp_path)
+    save_redirects({"/go/a": "https://a2"}, tmp_path)
+    store = RedirectStore(tmp_path / "data" / "redirects.sqlite3", tmp_path / "data" / "redirects.jsonl")
+    try:
+        with store.lock():
+            assert compact_export_file(store) == 1
+    finally:
+        store.close()
+    assert log_lines(tmp_path) == [{"path": "/go/a", "url": "https://a2"}]
+
+    # A rewritten log (compaction, a checkout) is read from the start
+    (tmp_path / "data" / "redirects.jsonl").write_text(json.dumps({"path": "/go/z", "url": "https://z"}) + "\n")
+    save_redirects({}, tmp_path)
+    assert rules(tmp_path) == ["/go/a  https://a2  302", "/go/z  https://z  302"]
+
+
+def test_legacy_json_map_is_imported_once(tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "redirects.json").write_text(json.dumps({"/go/old": "https://old"}))
+    save_redirects({"/go/new": "https://new"}, tmp_path)
+    assert log_lines(tmp_path) == [{"path": "/go/old", "url": "https://old"}, {"path": "/go/new", "url": "https://new"}]
+    assert rules(tmp_path) == ["/go/old  https://old  302", "/go/new  https://new  302"]
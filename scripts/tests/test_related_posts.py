@@ -0,0 +1,76 @@
+"""related_posts.py: incremental updates agree with a full rebuild"""
+import json
+from functools import partial
+
+import pytest
+
+import related_posts
+from post_scanner import scan_posts
+from related_posts import update_related_posts
+
+TOPICS = {
+    "gpu": "cloud gpu training cluster cuda vram runpod lambda rental",
+    "sql": "sql database query index join schema postgres sqlite",
+    "engine": "godot unity unreal engine scene shader physics sprite",
+}
+
+
+def write_post(content, slug, topic, variant):
+    words = TOPICS[topic].split()
+    # Each post leans on a different part of its topic's vocabulary
+    body = " ".join(words[(variant + i) % len(words)] for i in range(40))
+    (content / f"{slug}.md").write_text(
+        f'---\ntitle: "{words[variant % len(words)]} {words[(variant + 3) % len(words)]} notes"\n'
+        f'description: "{" ".join(words[variant:variant + 4])}"\ntags:\n  - "{topic}"\n---\n\n{body}\n',
+        encoding="utf-8")
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    content = tmp_path / "posts"
+    content.mkdir()
+    # Keep the project's post manifest out of it
+    monkeypatch.setattr(related_posts, "scan_posts", partial(scan_posts, manifest_file=tmp_path / "manifest.json"))
+    for topic in TOPICS:
+        for variant in range(3):
+            write_post(content, f"{topic}-{variant}", topic, variant)
+    return content, partial(update_related_posts, content, tmp_path / "index", tmp_path / "related.json"), tmp_path
+
+
+def neighbours(index_dir):
+    meta = json.loads((index_dir / "index.json").read_text(encoding="utf-8"))
+    return {slug: dict(pairs) for slug, pairs in meta["neighbors"].items()}
+
+
+def test_incremental_update_matches_a_full_rebuild(site):
+    content, update, tmp_path = site
+    assert update()["rebuilt"]
+    write_post(content, "gpu-3", "gpu", 3)
+    write_post(content, "sql-3", "sql", 3)
+    assert update() == {"posts": 11, "added": 2, "rebuilt": False}
+    incremental = neighbours(tmp_path / "index")
+    incremental_file = (tmp_path / "related.json").read_text(encoding="utf-8")
+
+    assert update(rebuild=True)["rebuilt"]
+    rebuilt = neighbours(tmp_path / "index")
+    assert incremental.keys() == rebuilt.keys()
+    for slug, pairs in rebuilt.items():
+        # Same neighbours; scores only drift by the IDF change since the last full build
+        assert incremental[slug].keys() == pairs.keys(), slug
+        for other, score in pairs.items():
+            assert incremental[slug][other] == pytest.approx(score, abs=0.05)
+    assert set(rebuilt["gpu-3"]) == {"gpu-0", "gpu-1", "gpu-2"}
+    assert json.loads(incremental_file).keys() == json.loads((tmp_path / "related.json").read_text()).keys()
+
+
+def test_edits_and_growth_trigger_a_full_rebuild(site):
+    content, update, _ = site
+    update()
+    # No change: nothing to do
+    assert update() == {"posts": 9, "added": 0, "rebuilt": False}
+    write_post(content, "sql-0", "sql", 5)
+    assert update()["rebuilt"]
+    for variant in range(3, 6):
+        write_post(content, f"engine-{variant}", "engine", variant)
+    # 12 posts is more than REBUILD_GROWTH over the 9 of the last build, so every post is re-indexed
+    assert update() == {"posts": 12, "added": 12, "rebuilt": True}
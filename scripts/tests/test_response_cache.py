@@ -0,0 +1,58 @@
+"""response_cache.py: keys, TTL expiry and the LRU entry/byte budgets"""
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, cache_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_key_covers_model_prompt_and_sampling():
+    messages = [{"role": "system", "content": "rules"}, {"role": "user", "content": "topic"}]
+    key = cache_key("gpt-4", messages, 0.7, 2000)
+    assert key == cache_key("gpt-4", [dict(m) for m in messages], 0.7, 2000)
+    assert key != cache_key("gpt-3.5-turbo", messages, 0.7, 2000)
+    assert key != cache_key("gpt-4", messages, 0.2, 2000)
+    assert key != cache_key("gpt-4", messages[:1] + [{"role": "user", "content": "other"}], 0.7, 2000)
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    with ResponseCache(tmp_path / "cache.sqlite3", ttl=60) as cache:
+        cache.put("a", "gpt-4", "article")
+        clock[0] += 59
+        assert cache.get("a") == "article"
+        # Reading does not extend the lifetime
+        clock[0] += 2
+        assert cache.get("a") is None
+        assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_goes_first(tmp_path, clock):
+    with ResponseCache(tmp_path / "cache.sqlite3", max_entries=2) as cache:
+        cache.put("a", "gpt-4", "first")
+        clock[0] += 1
+        cache.put("b", "gpt-4", "second")
+        clock[0] += 1
+        assert cache.get("a") == "first"
+        clock[0] += 1
+        cache.put("c", "gpt-4", "third")
+        assert cache.get("b") is None
+        assert cache.get("a") == "first" and cache.get("c") == "third"
+
+
+def test_byte_budget_evicts_until_it_fits(tmp_path, clock):
+    with ResponseCache(tmp_path / "cache.sqlite3", max_bytes=25) as cache:
+        for key in "abc":
+            cache.put(key, "gpt-4", key * 10)
+            clock[0] += 1
+        assert cache.stats() == {"entries": 2, "bytes": 20, "path": str(tmp_path / "cache.sqlite3")}
+        assert cache.get("a") is None
+        cache.put("big", "gpt-4", "x" * 30)
+        # An entry over the whole budget cannot be kept either
+        assert cache.stats()["entries"] == 0
+        assert cache.purge() == 0
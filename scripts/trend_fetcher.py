@@ -8,6 +8,7 @@ import json
 import requests
 from pathlib import Path
 from datetime import datetime
+from typing import Optional
 from pytrends.request import TrendReq
 
 # AI/Tech focused keywords for trend discovery
@@ -143,21 +144,53 @@ def get_trending_topics(filter_niche: bool = False, max_results: int = 10):
     
     return results
 
-def select_best_topic(filter_niche: bool = True) -> str:
+def select_best_topic(filter_niche: bool = True, skip_duplicates: bool = True) -> Optional[str]:
     """
     Select the best trending topic and record it in history.
     
+    Args:
+        filter_niche: Only consider topics matching the niche keywords
+        skip_duplicates: Pass over topics an existing post already covers
+    
     Returns:
-        The selected topic string
+        The selected topic string, or None if every candidate (and every
+        seed topic) is already covered by a post
     """
+    import random
+    
     topics = get_trending_topics(filter_niche=filter_niche)
+    candidates = [t["topic"] for t in topics] or random.sample(AI_TECH_SEED_TOPICS, len(AI_TECH_SEED_TOPICS))
+    
+    if skip_duplicates:
+        from duplicate_check import load_index, find_duplicate
+        index = load_index()
+        
+        def uncovered(topics):
+            fresh = []
+            for candidate in topics:
+                match = find_duplicate(candidate, index=index)
+                if match:
+                    print(f"Skipping '{candidate}': already covered by {match['slug']} (score {match['score']:.2f})")
+                else:
+                    fresh.append(candidate)
+            return fresh
+        
+        fresh = uncovered(candidates)
+        if not fresh:
+            # Every trend is covered: fall back to the evergreen seeds, unused ones first
+            used_topics = set(load_history().get("topics", []))
+            seeds = [t for t in AI_TECH_SEED_TOPICS if t not in candidates]
+            seeds.sort(key=lambda t: t in used_topics)
+            fresh = uncovered(seeds)
+        if not fresh:
+            return None
+        candidates = fresh
     
     if not topics:
-        import random
-        return random.choice(AI_TECH_SEED_TOPICS)
+        return candidates[0]
     
     # Select the top result
-    selected = topics[0]["topic"]
+    selected = candidates[0]
     
     # Update history
     history = load_history()